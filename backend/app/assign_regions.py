@@ -0,0 +1,176 @@
+# backend/app/assign_regions.py
+"""
+Bulk region assignment for flights that are already in the database
+(replaces batch_update_regions.ps1). Run from backend/ with the API's DB
+settings (DATABASE_URL or PG*/DB_* variables, see app/db.py):
+
+    python -m app.assign_regions                       # whole table
+    python -m app.assign_regions --state assign.state  # resumable
+    python -m app.assign_regions --within 0            # no nearest-region fallback
+
+The table is walked in keyset ranges of --batch ids (id > last ORDER BY id on
+the primary key). Each range is one set-based UPDATE, committed on its own:
+points are matched with ST_Intersects against regions_subdivided (GiST; on
+overlap the smallest gid wins, like app.regions), and points inside no region
+fall back to the nearest piece by KNN (<->) if it is within --within metres.
+
+Only NULL region ids are filled, so the command is idempotent and can be
+re-run after an interrupted run or a regions reload (clear the ids first).
+--state stores the last committed id and the next run starts after it;
+--from-id does the same by hand.
+"""
+import os
+import sys
+import time
+import argparse
+
+DEFAULT_BATCH = int(os.environ.get("ASSIGN_REGIONS_BATCH", "50000"))
+DEFAULT_WITHIN_M = float(os.environ.get("ASSIGN_REGIONS_WITHIN_M", "1000"))
+
+# upper id of the next keyset range (index-only scan of flights_pkey)
+NEXT_RANGE_SQL = "SELECT max(id) FROM (SELECT id FROM flights WHERE id > %s ORDER BY id LIMIT %s) s"
+
+_INSIDE = ("(SELECT min(r.gid) FROM public.regions_subdivided r "
+           "WHERE ST_Intersects(r.geom, c.{col}_geom))")
+_NEAREST = ("(SELECT n.gid FROM (SELECT r.gid, r.geom FROM public.regions_subdivided r "
+            "ORDER BY r.geom <-> i.{col}_geom LIMIT 1) n "
+            "WHERE ST_DWithin(n.geom::geography, i.{col}_geom::geography, %(within)s))")
+
+ASSIGN_SQL = f"""
+WITH chunk AS (
+    SELECT id, start_geom, end_geom,
+           start_region_id IS NULL AND start_geom IS NOT NULL AS need_start,
+           end_region_id IS NULL AND end_geom IS NOT NULL AS need_end
+    FROM flights
+    WHERE id > %(lo)s AND id <= %(hi)s
+      AND ((start_region_id IS NULL AND start_geom IS NOT NULL)
+        OR (end_region_id IS NULL AND end_geom IS NOT NULL))
+), inside AS (
+    SELECT c.*,
+           CASE WHEN c.need_start THEN {_INSIDE.format(col="start")} END AS start_in,
+           CASE WHEN c.need_end THEN {_INSIDE.format(col="end")} END AS end_in
+    FROM chunk c
+), resolved AS (
+    SELECT i.id, i.start_in, i.end_in,
+           COALESCE(i.start_in, CASE WHEN i.need_start AND %(within)s > 0
+                                     THEN {_NEAREST.format(col="start")} END) AS start_gid,
+           COALESCE(i.end_in, CASE WHEN i.need_end AND %(within)s > 0
+                                   THEN {_NEAREST.format(col="end")} END) AS end_gid
+    FROM inside i
+), updated AS (
+    UPDATE flights f
+    SET start_region_id = COALESCE(f.start_region_id, r.start_gid),
+        end_region_id = COALESCE(f.end_region_id, r.end_gid)
+    FROM resolved r
+    WHERE f.id = r.id AND (r.start_gid IS NOT NULL OR r.end_gid IS NOT NULL)
+    RETURNING r.start_in, r.start_gid, r.end_in, r.end_gid
+)
+SELECT (SELECT count(*) FROM chunk),
+       count(*),
+       count(*) FILTER (WHERE start_in IS NOT NULL),
+       count(*) FILTER (WHERE start_in IS NULL AND start_gid IS NOT NULL),
+       count(*) FILTER (WHERE end_in IS NOT NULL),
+       count(*) FILTER (WHERE end_in IS NULL AND end_gid IS NOT NULL)
+FROM updated
+"""
+
+STAT_KEYS = ("candidates", "updated", "start_inside", "start_nearest", "end_inside", "end_nearest")
+
+SUMMARY_SQL = """
+SELECT count(*),
+       count(*) FILTER (WHERE start_region_id IS NOT NULL),
+       count(*) FILTER (WHERE end_region_id IS NOT NULL)
+FROM flights
+"""
+
+
+def read_state(path: str) -> int:
+    """Last committed id from a --state file (0 if there is none yet)."""
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as fh:
+        text = fh.read().strip()
+    return int(text) if text else 0
+
+
+def write_state(path: str, last_id: int):
+    if not path:
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        fh.write(f"{last_id}\n")
+    os.replace(tmp, path)     # a crash never leaves a half-written id
+
+
+def assign(conn, from_id: int = 0, batch: int = DEFAULT_BATCH, within_m: float = DEFAULT_WITHIN_M,
+           state_path: str = None, log=print) -> dict:
+    """
+    Walk flights from `from_id` in keyset ranges of `batch` ids, one committed
+    UPDATE per range. Returns totals (STAT_KEYS plus batches, last_id, seconds).
+    """
+    totals = dict.fromkeys(STAT_KEYS, 0)
+    totals.update(batches=0, last_id=from_id)
+    lo = from_id
+    started = time.monotonic()
+    cur = conn.cursor()
+    try:
+        while True:
+            cur.execute(NEXT_RANGE_SQL, (lo, batch))
+            hi = cur.fetchone()[0]
+            if hi is None:
+                break
+            t0 = time.monotonic()
+            cur.execute(ASSIGN_SQL, {"lo": lo, "hi": hi, "within": within_m})
+            stats = dict(zip(STAT_KEYS, cur.fetchone()))
+            conn.commit()
+            write_state(state_path, hi)
+
+            elapsed = time.monotonic() - t0
+            for key in STAT_KEYS:
+                totals[key] += stats[key]
+            totals["batches"] += 1
+            totals["last_id"] = lo = hi
+            log(f"ids <= {hi}: {stats['candidates']} candidates, {stats['updated']} updated "
+                f"(start {stats['start_inside']}+{stats['start_nearest']} nearest, "
+                f"end {stats['end_inside']}+{stats['end_nearest']} nearest) "
+                f"in {elapsed:.2f}s, {stats['candidates'] / elapsed if elapsed > 0 else 0:.0f} rows/s")
+    finally:
+        cur.close()
+    totals["seconds"] = round(time.monotonic() - started, 3)
+    return totals
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Fill flights.start_region_id / end_region_id in set-based passes")
+    ap.add_argument("--batch", type=int, default=DEFAULT_BATCH, help="flights ids per UPDATE")
+    ap.add_argument("--within", type=float, default=DEFAULT_WITHIN_M,
+                    help="nearest-region fallback radius in metres, 0 = off")
+    ap.add_argument("--from-id", type=int, default=None, help="start after this flights.id")
+    ap.add_argument("--state", help="file with the last committed id (read on start, updated per batch)")
+    args = ap.parse_args(argv)
+
+    from_id = args.from_id if args.from_id is not None else read_state(args.state)
+
+    from app import db
+    db.init_pool()
+    try:
+        with db.connection() as conn:
+            print(f"assigning regions after id {from_id} (batch={args.batch}, within={args.within:g} m)")
+            totals = assign(conn, from_id, args.batch, args.within, args.state)
+            cur = conn.cursor()
+            cur.execute(SUMMARY_SQL)
+            total, with_start, with_end = cur.fetchone()
+            cur.close()
+            conn.rollback()
+    finally:
+        db.close_pool()
+
+    rate = totals["updated"] / totals["seconds"] if totals["seconds"] else 0
+    print(f"done: {totals['batches']} batches, {totals['candidates']} candidates, {totals['updated']} rows updated "
+          f"in {totals['seconds']:.1f}s ({rate:.0f} rows/s), last id {totals['last_id']}")
+    print(f"flights: {total}, with start region: {with_start}, with end region: {with_end}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+# backend/app/async_db.py
+"""
+asyncio-native data access for the /api/v1/* endpoints (psycopg 3 + psycopg_pool).
+
+Handlers await fetch_all()/fetch_one() directly on the event loop instead of
+running sync psycopg2 code in the Starlette threadpool, so slow aggregation
+queries only cost a coroutine each. Set DB_ASYNC=0 to fall back to the
+threaded psycopg2 pool from app.db (e.g. for benchmarking both modes).
+"""
+import os
+import time
+import weakref
+
+from fastapi.concurrency import run_in_threadpool
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from app import db
+from app.db import DATABASE_URL, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT, DB_POOL_CHECK_IDLE
+
+DB_ASYNC = os.environ.get("DB_ASYNC", "1").lower() in ("1", "true", "yes", "on")
+# async connections are cheap to multiplex, so allow a larger pool by default
+DB_ASYNC_POOL_MAX = int(os.environ.get("DB_ASYNC_POOL_MAX", str(max(DB_POOL_MAX, 20))))
+
+_pool = None
+
+
+_returned_at = weakref.WeakKeyDictionary()   # connection -> when it went back to the pool
+
+
+async def _mark_returned(conn):
+    _returned_at[conn] = time.monotonic()
+
+
+async def _check_idle(conn):
+    # same policy as the sync pool: only connections idle for DB_POOL_CHECK_IDLE
+    # seconds are pinged, so a busy API does not pay a round trip per request;
+    # check_connection pings in autocommit and leaves no transaction open
+    returned_at = _returned_at.get(conn)
+    if returned_at is not None and time.monotonic() - returned_at < DB_POOL_CHECK_IDLE:
+        return
+    await AsyncConnectionPool.check_connection(conn)
+
+
+async def init_pool() -> AsyncConnectionPool:
+    global _pool
+    if _pool is None:
+        _pool = AsyncConnectionPool(
+            DATABASE_URL,
+            min_size=DB_POOL_MIN,
+            max_size=DB_ASYNC_POOL_MAX,
+            timeout=DB_POOL_TIMEOUT,
+            max_idle=max(DB_POOL_CHECK_IDLE, 60.0),
+            kwargs={"row_factory": dict_row},
+            check=_check_idle,
+            reset=_mark_returned,
+            open=False,
+        )
+        await _pool.open(wait=False)
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        await pool.close()
+
+
+def get_pool() -> AsyncConnectionPool:
+    if _pool is None:
+        raise RuntimeError("async pool is not initialised (app startup did not run)")
+    return _pool
+
+
+def stats() -> dict:
+    return get_pool().get_stats() if _pool is not None else {}
+
+
+async def fetch_all(sql: str, params=None) -> list:
+    """
+    Run a query and return rows as dicts; the transaction is committed on exit.
+    With DB_ASYNC=0 the query runs on the sync pool in the threadpool instead.
+    """
+    if not DB_ASYNC:
+        return await run_in_threadpool(db.fetch_all, sql, params)
+    async with get_pool().connection() as conn:
+        cur = await conn.execute(sql, params)
+        return await cur.fetchall() if cur.description else []
+
+
+async def fetch_one(sql: str, params=None):
+    if not DB_ASYNC:
+        return await run_in_threadpool(db.fetch_one, sql, params)
+    async with get_pool().connection() as conn:
+        cur = await conn.execute(sql, params)
+        return await cur.fetchone() if cur.description else None
+
@@ -0,0 +1,129 @@
+# backend/app/columnar.py
+"""
+Columnar (Parquet) form of the parser output, an alternative to parsed.ndjson.
+
+Each normalize_batch() result is written as one row group with typed columns
+(timestamps, ints, doubles, dictionary-encoded strings), so nothing is
+JSON-encoded except the small raw_payload, and the file is several times
+smaller than NDJSON. app.importer loads it straight into flights through a
+typed staging table (no jsonb round trip of whole rows).
+
+Needs pyarrow (optional: only the Parquet path imports it).
+"""
+import json
+from typing import Iterator, Optional, Tuple
+
+from app.parser import NORMALIZED_FIELDS, PARSER_VERSION
+
+PARQUET_MAGIC = b"PAR1"
+PARQUET_COMPRESSION = "zstd"
+ISO_FORMAT = "%Y-%m-%dT%H:%M:%SZ"     # parser.combine_dof_time_iso output
+# columns besides NORMALIZED_FIELDS; region ids are filled by app.regions (null otherwise)
+EXTRA_FIELDS = ("parser_version", "start_region_id", "end_region_id")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+def schema():
+    pa = _pyarrow()
+    ts = pa.timestamp("s", tz="UTC")
+    types = {
+        "start_time": ts, "end_time": ts, "duration_seconds": pa.int32(),
+        "start_lat": pa.float64(), "start_lon": pa.float64(), "end_lat": pa.float64(), "end_lon": pa.float64(),
+        "parser_version": pa.int16(), "start_region_id": pa.int32(), "end_region_id": pa.int32(),
+    }
+    return pa.schema([(f, types.get(f, pa.string())) for f in NORMALIZED_FIELDS + EXTRA_FIELDS])
+
+
+def _timestamps(pa, values):
+    parsed = pa.compute.strptime(pa.array(values, type=pa.string()), format=ISO_FORMAT, unit="s")
+    return parsed.cast(pa.timestamp("s", tz="UTC"))
+
+
+def batch_to_table(batch: dict, schema_=None):
+    """
+    parser.normalize_batch() result -> pyarrow.Table (raw_payload as a JSON string,
+    every row stamped with the current parser.PARSER_VERSION, region ids if the
+    batch has them).
+    """
+    pa = _pyarrow()
+    schema_ = schema_ or schema()
+    rows = len(batch[NORMALIZED_FIELDS[0]])
+    arrays = []
+    for field in schema_:
+        if field.name == "parser_version":
+            values = [PARSER_VERSION] * rows
+        else:
+            values = batch.get(field.name) or [None] * rows
+        if field.name == "raw_payload":
+            values = [None if v is None else json.dumps(v, ensure_ascii=False) for v in values]
+        if pa.types.is_timestamp(field.type):
+            arrays.append(_timestamps(pa, values))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema_)
+
+
+class ParquetBatchWriter:
+    """Append normalize_batch() results to a Parquet file, one row group per batch."""
+
+    def __init__(self, path: str, compression: str = PARQUET_COMPRESSION):
+        pa = _pyarrow()
+        self.schema = schema()
+        self._writer = pa.parquet.ParquetWriter(path, self.schema, compression=compression)
+        self.rows = 0
+
+    def write_batch(self, batch: dict):
+        self.write_table(batch_to_table(batch, self.schema))
+
+    def write_table(self, table):
+        """Write a batch_to_table() result (e.g. built in a parser process)."""
+        self._writer.write_table(table, row_group_size=max(1, table.num_rows))
+        self.rows += table.num_rows
+
+    def close(self):
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def is_parquet(path: str) -> bool:
+    with open(path, "rb") as fh:
+        return fh.read(len(PARQUET_MAGIC)) == PARQUET_MAGIC
+
+
+def row_group_sizes(path: str) -> list:
+    """(rows, compressed bytes) per row group, read from the footer only."""
+    meta = _pyarrow().parquet.ParquetFile(path).metadata
+    out = []
+    for i in range(meta.num_row_groups):
+        rg = meta.row_group(i)
+        out.append((rg.num_rows, sum(rg.column(c).total_compressed_size for c in range(rg.num_columns))))
+    return out
+
+
+def iter_columns(path: str, columns=None, row_groups: Optional[list] = None,
+                 batch_size: int = 10000) -> Iterator[Tuple[int, dict]]:
+    """
+    (rows, {column: python values}) per record batch, optionally limited to some
+    row groups. Requested columns the file does not have (written by an older
+    version) come back as all-None.
+    """
+    pf = _pyarrow().parquet.ParquetFile(path)
+    names = list(columns or pf.schema_arrow.names)
+    present = [name for name in names if name in pf.schema_arrow.names]
+    for rb in pf.iter_batches(batch_size=batch_size, row_groups=row_groups, columns=present):
+        yield rb.num_rows, {name: rb.column(name).to_pylist() if name in present else [None] * rb.num_rows
+                            for name in names}
@@ -0,0 +1,289 @@
+# backend/app/db.py
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.extras
+
+# -----------------------
+# Config
+# -----------------------
+# DATABASE_URL support: full URI or libpq-style build from parts
+DATABASE_URL = os.environ.get("DATABASE_URL")
+if not DATABASE_URL:
+    pg_host = os.environ.get("PGHOST", os.environ.get("DB_HOST", "db"))
+    pg_port = os.environ.get("PGPORT", os.environ.get("DB_PORT", "5432"))
+    pg_db = os.environ.get("PGDATABASE", os.environ.get("DB_NAME", "gis"))
+    pg_user = os.environ.get("PGUSER", os.environ.get("DB_USER", "postgres"))
+    pg_pass = os.environ.get("PGPASSWORD", os.environ.get("DB_PASS", "postgres"))
+    DATABASE_URL = f"host={pg_host} dbname={pg_db} user={pg_user} password={pg_pass} port={pg_port}"
+
+DB_POOL_MIN = int(os.environ.get("DB_POOL_MIN", "2"))
+DB_POOL_MAX = int(os.environ.get("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "10"))
+# idle connections older than this are pinged with SELECT 1 before reuse
+DB_POOL_CHECK_IDLE = float(os.environ.get("DB_POOL_CHECK_IDLE", "30"))
+
+
+class PoolTimeout(Exception):
+    """No connection became available within the acquisition timeout."""
+
+
+class PoolClosed(Exception):
+    """The pool was closed (application shutdown)."""
+
+
+# -----------------------
+# Pool
+# -----------------------
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool shared by all API handlers.
+
+    Unlike psycopg2.pool.ThreadedConnectionPool it blocks (up to `timeout`)
+    when all connections are busy instead of failing immediately, health-checks
+    connections that sat idle for `check_idle` seconds and keeps counters
+    for the /api/v1/db/pool endpoint.
+    """
+
+    def __init__(self, dsn: str, minconn: int = 1, maxconn: int = 10,
+                 timeout: float = 10.0, check_idle: float = 30.0):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("expected 0 <= minconn <= maxconn and maxconn >= 1")
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.check_idle = check_idle
+
+        self._cond = threading.Condition()
+        self._idle = deque()      # (conn, returned_at)
+        self._in_use = set()
+        self._opening = 0         # connections being created outside the lock
+        self._closed = False
+        self._stats = {
+            "connections_opened": 0,
+            "connections_closed": 0,
+            "requests": 0,
+            "requests_waited": 0,
+            "wait_time_ms": 0.0,
+            "timeouts": 0,
+            "health_checks": 0,
+            "health_check_failures": 0,
+        }
+
+    # --- lifecycle ---
+    def open(self):
+        for _ in range(self.minconn - self._size()):
+            conn = self._connect()
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def close(self):
+        """Close idle connections now; busy ones are closed when returned."""
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._disconnect(conn)
+
+    # --- acquire / release ---
+    def getconn(self, timeout: float = None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+        while True:
+            conn = None
+            create = False
+            with self._cond:
+                if self._closed:
+                    raise PoolClosed("connection pool is closed")
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                elif self._size() < self.maxconn:
+                    self._opening += 1
+                    create = True
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"no database connection available within {timeout:.1f}s "
+                            f"(pool max={self.maxconn})")
+                    waited = True
+                    self._cond.wait(remaining)
+                    continue
+
+            if create:
+                try:
+                    conn = self._connect()
+                finally:
+                    with self._cond:
+                        self._opening -= 1
+                        if conn is None:
+                            self._cond.notify()
+            elif not self._is_healthy(conn, returned_at):
+                self._disconnect(conn)
+                continue
+
+            with self._cond:
+                self._in_use.add(conn)
+                self._stats["requests"] += 1
+                if waited:
+                    self._stats["requests_waited"] += 1
+                self._stats["wait_time_ms"] += (time.monotonic() - started) * 1000.0
+            return conn
+
+    def putconn(self, conn, discard: bool = False):
+        with self._cond:
+            self._in_use.discard(conn)
+            closed = self._closed
+        if not discard and not closed and not conn.closed:
+            try:
+                # never hand out a connection with an open/aborted transaction
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        if discard or closed or conn.closed:
+            self._disconnect(conn)
+            with self._cond:
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout: float = None):
+        conn = self.getconn(timeout)
+        broken = False
+        try:
+            yield conn
+        except psycopg2.OperationalError:
+            broken = True
+            raise
+        finally:
+            self.putconn(conn, discard=broken)
+
+    # --- stats ---
+    def stats(self) -> dict:
+        with self._cond:
+            out = dict(self._stats)
+            out.update({
+                "min": self.minconn,
+                "max": self.maxconn,
+                "timeout_s": self.timeout,
+                "size": self._size(),
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "closed": self._closed,
+            })
+        out["wait_time_ms"] = round(out["wait_time_ms"], 3)
+        return out
+
+    # --- internals ---
+    def _size(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        with self._cond:
+            self._stats["connections_opened"] += 1
+        return conn
+
+    def _disconnect(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._stats["connections_closed"] += 1
+
+    def _is_healthy(self, conn, returned_at: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.check_idle:
+            return True
+        with self._cond:
+            self._stats["health_checks"] += 1
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self._cond:
+                self._stats["health_check_failures"] += 1
+            return False
+
+
+# -----------------------
+# Application-wide pool
+# -----------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_pool() -> ConnectionPool:
+    """Create (or return) the application pool. Called on app startup."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            pool = ConnectionPool(
+                DATABASE_URL,
+                minconn=DB_POOL_MIN,
+                maxconn=DB_POOL_MAX,
+                timeout=DB_POOL_TIMEOUT,
+                check_idle=DB_POOL_CHECK_IDLE,
+            )
+            try:
+                pool.open()
+            except psycopg2.OperationalError as e:
+                # DB may still be starting (docker compose); connections are opened lazily
+                print(f"[db] could not pre-open {DB_POOL_MIN} connections: {e}")
+            _pool = pool
+        return _pool
+
+
+def close_pool():
+    """Drain the application pool. Called on app shutdown."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def get_pool() -> ConnectionPool:
+    return _pool if _pool is not None else init_pool()
+
+
+def connection(timeout: float = None):
+    """`with db.connection() as conn:` — borrow a pooled connection."""
+    return get_pool().connection(timeout)
+
+
+def fetch_all(sql: str, params=None) -> list:
+    """Sync counterpart of async_db.fetch_all: rows as dicts, commit on success."""
+    with connection() as conn:
+        cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
+        cur.execute(sql, params)
+        rows = cur.fetchall() if cur.description else []
+        cur.close()
+        conn.commit()
+        return rows
+
+
+def fetch_one(sql: str, params=None):
+    rows = fetch_all(sql, params)
+    return rows[0] if rows else None
@@ -0,0 +1,551 @@
+# backend/app/importer.py
+"""
+Single NDJSON -> staging_raw -> flights loader used by both import paths
+(/api/v1/import_from_upload and the background /api/v1/import job).
+
+The file is streamed through `COPY staging_raw(raw) FROM STDIN`, the
+transform script (load_from_staging.sql) runs in the same transaction and
+everything is committed once. The transform only touches the rows it inserts
+(tagged with the import job id), so its cost follows the batch size.
+
+import_ndjson_parallel() splits one large file into byte ranges on line
+boundaries and loads them concurrently, one connection per partition.
+
+Parquet files written by full_runner.py (app/columnar.py) skip the jsonb
+staging: typed columns are COPYed into a temporary staging_flights table and
+load_from_staging_columns.sql inserts them (import_parquet / _parallel, which
+partitions by row group). import_file() / import_file_parallel() pick the path
+by the file's magic bytes, so uploads need no particular extension.
+
+CLI (from backend/, uses the API DB settings):
+    python -m app.importer /data/parsed.ndjson --workers 8
+    python -m app.importer /data/parsed.parquet --workers 8
+"""
+import os
+import sys
+import json
+import time
+import struct
+import argparse
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from app import columnar
+
+LOAD_SQL_PATH = os.environ.get("LOAD_SQL_PATH", "/data/load_from_staging.sql")
+LOAD_COLUMNS_SQL_PATH = os.environ.get("LOAD_COLUMNS_SQL_PATH", "/data/load_from_staging_columns.sql")
+IMPORT_WORKERS = int(os.environ.get("IMPORT_WORKERS", "1"))
+# every partition holds a pool connection until it commits, and the progress
+# writer and the job heartbeat need one more each: more partitions than
+# DB_POOL_MAX - 2 would end in PoolTimeout halfway through an import
+IMPORT_MAX_WORKERS = int(os.environ.get(
+    "IMPORT_MAX_WORKERS", str(max(1, int(os.environ.get("DB_POOL_MAX", "10")) - 2))))
+IMPORT_COPY_FORMAT = os.environ.get("IMPORT_COPY_FORMAT", "csv")          # csv | binary
+IMPORT_VALIDATE_JSON = os.environ.get("IMPORT_VALIDATE_JSON", "0").lower() in ("1", "true", "yes", "on")
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# COPY FORMAT text would unescape the backslashes of JSON strings ("\n", "\""),
+# so lines are sent as CSV whose quote/delimiter are control bytes that cannot
+# appear unescaped in valid JSON: every line reaches Postgres verbatim.
+COPY_SQL = {
+    "csv": "COPY staging_raw(raw) FROM STDIN WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')",
+    "binary": "COPY staging_raw(raw) FROM STDIN WITH (FORMAT binary)",
+}
+
+_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_BINARY_TRAILER = struct.pack("!h", -1)
+_JSONB_VERSION = b"\x01"
+
+
+class NdjsonCopyStream:
+    """
+    File-like object for cursor.copy_expert(): reads an NDJSON file line by line
+    and yields COPY data in `fmt` (csv or binary jsonb tuples). Blank lines are
+    skipped; with validate=True lines that are not JSON objects are counted in
+    `bad_lines` (and passed to on_bad_line) instead of aborting the COPY.
+    Counter deltas go to `progress` (see jobqueue.ProgressReporter) after every read().
+    """
+
+    def __init__(self, fh, fmt: str = "csv", validate: bool = False, on_bad_line=None, progress=None):
+        if fmt not in COPY_SQL:
+            raise ValueError(f"unsupported COPY format: {fmt}")
+        self.fh = fh
+        self.fmt = fmt
+        self.validate = validate
+        self.on_bad_line = on_bad_line
+        self.bytes_read = 0
+        self.lines = 0
+        self.rows = 0
+        self.bad_lines = 0
+        self.progress = progress
+        self._reported = (0, 0, 0)
+        self._buf = bytearray(_BINARY_HEADER if fmt == "binary" else b"")
+        self._eof = False
+
+    def _encode(self, line: bytes) -> bytes:
+        if self.fmt == "binary":
+            return struct.pack("!hi", 1, len(line) + 1) + _JSONB_VERSION + line
+        return line + b"\n"
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = COPY_BUFFER_SIZE
+        while len(self._buf) < size and not self._eof:
+            raw = self.fh.readline()
+            if not raw:
+                self._eof = True
+                if self.fmt == "binary":
+                    self._buf += _BINARY_TRAILER
+                break
+            self.bytes_read += len(raw)
+            self.lines += 1
+            line = raw.strip()
+            if not line:
+                continue
+            if self.validate:
+                try:
+                    ok = isinstance(json.loads(line), dict)
+                except ValueError:
+                    ok = False
+                if not ok:
+                    self.bad_lines += 1
+                    if self.on_bad_line:
+                        self.on_bad_line(self.lines, line)
+                    continue
+            self._buf += self._encode(line)
+            self.rows += 1
+        out = bytes(self._buf[:size])
+        del self._buf[:size]
+        if self.progress is not None:
+            self._report()
+        return out
+
+    def _report(self):
+        current = (self.bytes_read, self.rows, self.bad_lines)
+        b, r, f = (c - p for c, p in zip(current, self._reported))
+        self._reported = current
+        if b or r or f:
+            self.progress.add(bytes_read=b, lines_loaded=r, rows_failed=f)
+
+
+class RangeReader:
+    """readline() over the [start, end) byte range of a file; both ends sit on line starts."""
+
+    def __init__(self, fh, start: int, end: int):
+        self.fh = fh
+        self.end = end
+        fh.seek(start)
+
+    def readline(self) -> bytes:
+        if self.fh.tell() >= self.end:
+            return b""
+        return self.fh.readline()
+
+
+def split_ranges(path: str, parts: int) -> list:
+    """
+    Split a file into at most `parts` contiguous (start, end) byte ranges whose
+    boundaries fall right after a newline, so every line lands in exactly one range.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    parts = max(1, min(parts, size))
+    bounds = [0]
+    with open(path, "rb") as fh:
+        for i in range(1, parts):
+            target = max(size * i // parts, bounds[-1])
+            if target > 0:
+                fh.seek(target - 1)
+                if fh.read(1) != b"\n":
+                    fh.readline()      # move to the start of the next line
+            pos = fh.tell()
+            if bounds[-1] < pos < size:
+                bounds.append(pos)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def copy_to_staging(cur, path: str, fmt: str = None, validate: bool = None, on_bad_line=None,
+                    byte_range: tuple = None, truncate: bool = True, progress=None) -> dict:
+    """TRUNCATE staging_raw and COPY the NDJSON file (or one byte range of it) into it (no commit)."""
+    fmt = fmt or IMPORT_COPY_FORMAT
+    validate = IMPORT_VALIDATE_JSON if validate is None else validate
+    started = time.perf_counter()
+    if truncate:
+        cur.execute("TRUNCATE staging_raw;")
+    with open(path, "rb") as fh:
+        src = RangeReader(fh, *byte_range) if byte_range else fh
+        stream = NdjsonCopyStream(src, fmt=fmt, validate=validate, on_bad_line=on_bad_line, progress=progress)
+        cur.copy_expert(COPY_SQL[fmt], stream, size=COPY_BUFFER_SIZE)
+    elapsed = time.perf_counter() - started
+    return {
+        "format": fmt,
+        "validated": validate,
+        "bytes": stream.bytes_read,
+        "staging_rows": stream.rows,
+        "bad_lines": stream.bad_lines,
+        "copy_seconds": round(elapsed, 3),
+        "copy_rows_per_sec": round(stream.rows / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def _run_sql_file(cur, path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as fh:
+        sql = fh.read()
+    started = time.perf_counter()
+    cur.execute(sql)
+    return round(time.perf_counter() - started, 3)
+
+
+def run_transform(cur, load_sql_path: str = LOAD_SQL_PATH, job_id: int = None) -> dict:
+    """
+    Execute load_from_staging.sql (staging_raw -> flights) if it exists (no commit).
+    New rows are tagged with `job_id` (session setting app.import_job_id); the
+    script's final SELECT reports how many rows it inserted and their id range.
+    """
+    cur.execute("SELECT set_config('app.import_job_id', %s, true)", ("" if job_id is None else str(job_id),))
+    seconds = _run_sql_file(cur, load_sql_path)
+    if seconds is None:
+        return {"transformed": False, "note": f"{load_sql_path} not found; run load script in DB manually (or place it in /data)"}
+    out = {"transformed": True, "transform_seconds": seconds}
+    row = cur.fetchone() if cur.description else None
+    if row is not None and len(row) == 3:
+        out.update({"inserted_rows": int(row[0] or 0), "first_id": row[1], "last_id": row[2]})
+    return out
+
+
+def _report_transform(progress, stats: dict):
+    # rows that reached staging but were not inserted hit ON CONFLICT (duplicates)
+    if progress is not None and "inserted_rows" in stats:
+        progress.add(rows_inserted=stats["inserted_rows"],
+                     rows_skipped=stats["staging_rows"] - stats["inserted_rows"])
+
+
+def _import_once(conn, copy, bytes_total, load_sql_path, job_id, progress) -> dict:
+    """copy(cur) fills the staging table; then transform and one commit (rollback on error)."""
+    started = time.perf_counter()
+    if progress is not None:
+        progress.start(bytes_total)
+    cur = conn.cursor()
+    try:
+        stats = copy(cur)
+        if progress is not None:
+            progress.set_phase("transform")
+        stats.update(run_transform(cur, load_sql_path, job_id))
+        _report_transform(progress, stats)
+        if progress is not None:
+            progress.set_phase("commit")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    elapsed = time.perf_counter() - started
+    stats["seconds"] = round(elapsed, 3)
+    stats["rows_per_sec"] = round(stats["staging_rows"] / elapsed, 1) if elapsed > 0 else None
+    if progress is not None:
+        progress.set_phase("done")
+    return stats
+
+
+def import_ndjson(conn, path: str, fmt: str = None, validate: bool = None,
+                  load_sql_path: str = LOAD_SQL_PATH, job_id: int = None, on_bad_line=None,
+                  progress=None) -> dict:
+    """
+    COPY `path` into staging_raw, run the transform and commit once.
+    Returns load statistics incl. overall rows/sec; rolls back on error.
+    `progress` (jobqueue.ProgressReporter) receives live counters and phases.
+    """
+    def copy(cur):
+        return copy_to_staging(cur, path, fmt=fmt, validate=validate, on_bad_line=on_bad_line,
+                               progress=progress)
+    return _import_once(conn, copy, os.path.getsize(path), load_sql_path, job_id, progress)
+
+
+# -----------------------
+# Parallel partitioned import
+# -----------------------
+DEADLOCK_RETRIES = 3
+
+
+def _load_partition(connection, copy, load_sql_path, job_id, progress=None) -> dict:
+    """
+    Load one partition on its own connection: copy(cur) creates a TEMP staging
+    table (not WAL-logged, dropped at commit; a temp staging_raw shadows
+    public.staging_raw, so the unmodified transform script only sees this
+    partition's rows) and fills it; then transform and commit.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        with connection() as conn:
+            cur = conn.cursor()
+            stats = None
+            try:
+                started = time.perf_counter()
+                stats = copy(cur)
+                stats.update(run_transform(cur, load_sql_path, job_id))
+                conn.commit()
+                _report_transform(progress, stats)
+                stats["seconds"] = round(time.perf_counter() - started, 3)
+                return stats
+            except Exception as e:
+                conn.rollback()
+                # the same (flight_id, start_time) in two partitions can deadlock
+                # the concurrent ON CONFLICT inserts; the loser simply retries
+                if getattr(e, "pgcode", None) == "40P01" and attempt < DEADLOCK_RETRIES:
+                    if progress is not None and stats is not None:
+                        # the partition is copied again: take back what this attempt reported
+                        progress.add(bytes_read=-stats["bytes"], lines_loaded=-stats["staging_rows"],
+                                     rows_failed=-stats["bad_lines"])
+                    continue
+                raise
+            finally:
+                cur.close()
+
+
+def clamp_workers(workers: int, limit: int = None) -> int:
+    """Partition count actually used: 1..min(IMPORT_MAX_WORKERS, limit)."""
+    cap = IMPORT_MAX_WORKERS if limit is None else min(IMPORT_MAX_WORKERS, limit)
+    return max(1, min(int(workers), cap))
+
+
+def _run_partitions(connection, copies, bytes_total, load_sql_path, job_id, progress) -> tuple:
+    """Run _load_partition for every copy callable concurrently; (partitions, seconds)."""
+    started = time.perf_counter()
+    if progress is not None:
+        progress.start(bytes_total, phase="load")
+    with ThreadPoolExecutor(max_workers=max(1, len(copies))) as pool:
+        futures = [pool.submit(_load_partition, connection, copy, load_sql_path, job_id, progress)
+                   for copy in copies]
+        partitions = [f.result() for f in futures]
+    if progress is not None:
+        progress.set_phase("done")
+    return partitions, time.perf_counter() - started
+
+
+def _merge_partitions(partitions, elapsed: float, fmt: str) -> dict:
+    rows = sum(p["staging_rows"] for p in partitions)
+    return {
+        "workers": len(partitions),
+        "format": partitions[0]["format"] if partitions else fmt,
+        "bytes": sum(p["bytes"] for p in partitions),
+        "staging_rows": rows,
+        "bad_lines": sum(p["bad_lines"] for p in partitions),
+        "transformed": bool(partitions) and all(p["transformed"] for p in partitions),
+        "inserted_rows": sum(p.get("inserted_rows", 0) for p in partitions),
+        "partitions": partitions,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def import_ndjson_parallel(connection, path: str, workers: int = IMPORT_WORKERS, fmt: str = None,
+                           validate: bool = None, load_sql_path: str = LOAD_SQL_PATH,
+                           job_id: int = None, progress=None) -> dict:
+    """
+    Load `path` with `workers` concurrent partitions (at most IMPORT_MAX_WORKERS).
+    `connection` is a callable returning a context manager that yields a psycopg2
+    connection (e.g. db.connection).
+
+    Each partition commits on its own (re-running an import is safe thanks to
+    ON CONFLICT DO NOTHING). Partitions copy and transform concurrently, so
+    `progress` stays in the "load" phase until all of them have committed.
+    """
+    def partition(byte_range):
+        def copy(cur):
+            cur.execute("CREATE TEMP TABLE staging_raw (LIKE public.staging_raw) ON COMMIT DROP;")
+            stats = copy_to_staging(cur, path, fmt=fmt, validate=validate,
+                                    byte_range=byte_range, truncate=False, progress=progress)
+            stats["range"] = list(byte_range)
+            return stats
+        return copy
+
+    copies = [partition(r) for r in split_ranges(path, clamp_workers(workers))]
+    partitions, elapsed = _run_partitions(connection, copies, os.path.getsize(path), load_sql_path, job_id,
+                                          progress)
+    return _merge_partitions(partitions, elapsed, fmt or IMPORT_COPY_FORMAT)
+
+
+# -----------------------
+# Parquet import (columnar parser output, see app/columnar.py)
+# -----------------------
+STAGING_COLUMNS = (
+    "flight_id", "uav_type", "start_time", "end_time", "duration_seconds",
+    "start_lat", "start_lon", "end_lat", "end_lon", "fingerprint", "raw_payload", "parser_version",
+    "start_region_id", "end_region_id",
+)
+STAGING_FLIGHTS_DDL = """
+    CREATE TEMP TABLE staging_flights (
+        flight_id text, uav_type text, start_time timestamptz, end_time timestamptz, duration_seconds int,
+        start_lat double precision, start_lon double precision, end_lat double precision, end_lon double precision,
+        fingerprint text, raw_payload jsonb, parser_version smallint, start_region_id int, end_region_id int
+    ) ON COMMIT DROP
+"""
+COPY_COLUMNS_SQL = f"COPY staging_flights ({', '.join(STAGING_COLUMNS)}) FROM STDIN"
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def _copy_text(value) -> str:
+    """One value in COPY text format."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, str):
+        return value.translate(_COPY_ESCAPES)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class ParquetCopyStream:
+    """
+    File-like object for cursor.copy_expert(COPY_COLUMNS_SQL): Parquet row groups
+    -> COPY text lines of STAGING_COLUMNS. `bytes_read` counts the compressed
+    size of finished row groups; deltas go to `progress` like NdjsonCopyStream.
+    """
+
+    def __init__(self, path: str, row_groups=None, progress=None):
+        self.path = path
+        sizes = columnar.row_group_sizes(path)
+        self.row_groups = list(range(len(sizes))) if row_groups is None else list(row_groups)
+        self.bytes_total = sum(sizes[g][1] for g in self.row_groups)
+        self.bytes_read = 0
+        self.rows = 0
+        self.bad_lines = 0
+        self.progress = progress
+        self._reported = (0, 0)
+        self._chunks = self._encode(sizes)
+        self._buf = bytearray()
+
+    def _encode(self, sizes):
+        for g in self.row_groups:
+            for n, cols in columnar.iter_columns(self.path, STAGING_COLUMNS, row_groups=[g]):
+                rows = zip(*(cols[c] for c in STAGING_COLUMNS))
+                self.rows += n
+                yield "".join("\t".join(map(_copy_text, row)) + "\n" for row in rows).encode("utf-8")
+            self.bytes_read += sizes[g][1]
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = COPY_BUFFER_SIZE
+        while len(self._buf) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buf += chunk
+        out = bytes(self._buf[:size])
+        del self._buf[:size]
+        if self.progress is not None:
+            current = (self.bytes_read, self.rows)
+            b, r = (c - p for c, p in zip(current, self._reported))
+            self._reported = current
+            if b or r:
+                self.progress.add(bytes_read=b, lines_loaded=r)
+        return out
+
+
+def copy_parquet_to_staging(cur, path: str, row_groups=None, progress=None) -> dict:
+    """Create the temp staging_flights and COPY the Parquet file (or some row groups) into it (no commit)."""
+    started = time.perf_counter()
+    cur.execute(STAGING_FLIGHTS_DDL)
+    stream = ParquetCopyStream(path, row_groups=row_groups, progress=progress)
+    cur.copy_expert(COPY_COLUMNS_SQL, stream, size=COPY_BUFFER_SIZE)
+    elapsed = time.perf_counter() - started
+    return {
+        "format": "parquet",
+        "validated": False,
+        "bytes": stream.bytes_total,
+        "staging_rows": stream.rows,
+        "bad_lines": 0,
+        "copy_seconds": round(elapsed, 3),
+        "copy_rows_per_sec": round(stream.rows / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def import_parquet(conn, path: str, load_sql_path: str = LOAD_COLUMNS_SQL_PATH, job_id: int = None,
+                   progress=None) -> dict:
+    """import_ndjson() for a Parquet file: typed COPY into staging_flights, transform, one commit."""
+    def copy(cur):
+        return copy_parquet_to_staging(cur, path, progress=progress)
+    bytes_total = sum(b for _, b in columnar.row_group_sizes(path))
+    return _import_once(conn, copy, bytes_total, load_sql_path, job_id, progress)
+
+
+def split_row_groups(path: str, parts: int) -> list:
+    """Contiguous lists of row group indexes with roughly equal row counts."""
+    sizes = columnar.row_group_sizes(path)
+    parts = max(1, min(parts, len(sizes)))
+    total = sum(n for n, _ in sizes)
+    out, current, done = [], [], 0
+    for i, (n, _) in enumerate(sizes):
+        current.append(i)
+        done += n
+        if len(out) < parts - 1 and done >= total * (len(out) + 1) / parts:
+            out.append(current)
+            current = []
+    if current:
+        out.append(current)
+    return out
+
+
+def import_parquet_parallel(connection, path: str, workers: int = IMPORT_WORKERS,
+                            load_sql_path: str = LOAD_COLUMNS_SQL_PATH, job_id: int = None,
+                            progress=None) -> dict:
+    """import_ndjson_parallel() for a Parquet file; partitions are runs of row groups."""
+    def partition(groups):
+        def copy(cur):
+            stats = copy_parquet_to_staging(cur, path, row_groups=groups, progress=progress)
+            stats["row_groups"] = [groups[0], groups[-1]]
+            return stats
+        return copy
+
+    copies = [partition(g) for g in split_row_groups(path, clamp_workers(workers))]
+    bytes_total = sum(b for _, b in columnar.row_group_sizes(path))
+    partitions, elapsed = _run_partitions(connection, copies, bytes_total, load_sql_path, job_id, progress)
+    return _merge_partitions(partitions, elapsed, "parquet")
+
+
+def import_file(conn, path: str, job_id: int = None, progress=None, **ndjson_options) -> dict:
+    """import_parquet() or import_ndjson() depending on the file contents."""
+    if columnar.is_parquet(path):
+        return import_parquet(conn, path, job_id=job_id, progress=progress)
+    return import_ndjson(conn, path, job_id=job_id, progress=progress, **ndjson_options)
+
+
+def import_file_parallel(connection, path: str, workers: int = IMPORT_WORKERS, job_id: int = None,
+                         progress=None, **ndjson_options) -> dict:
+    if columnar.is_parquet(path):
+        return import_parquet_parallel(connection, path, workers=workers, job_id=job_id, progress=progress)
+    return import_ndjson_parallel(connection, path, workers=workers, job_id=job_id, progress=progress,
+                                  **ndjson_options)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Import an NDJSON or Parquet file into flights")
+    ap.add_argument("path")
+    ap.add_argument("--workers", type=int, default=IMPORT_WORKERS)
+    ap.add_argument("--format", choices=sorted(COPY_SQL), default=IMPORT_COPY_FORMAT, help="COPY format for NDJSON")
+    ap.add_argument("--validate", action="store_true", default=IMPORT_VALIDATE_JSON)
+    args = ap.parse_args(argv)
+
+    from app import db
+    db.init_pool()
+    try:
+        if args.workers > 1:
+            stats = import_file_parallel(db.connection, args.path, workers=args.workers,
+                                         fmt=args.format, validate=args.validate)
+        else:
+            with db.connection() as conn:
+                stats = import_file(conn, args.path, fmt=args.format, validate=args.validate)
+    finally:
+        db.close_pool()
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+# backend/app/jobqueue.py
+"""
+Durable import job queue on top of the import_jobs table.
+
+Lifecycle: pending -> running (claimed by one worker, heartbeat_at refreshed
+while it runs) -> success | failed. A failed attempt goes back to pending with
+an exponential back-off until max_attempts is reached; a running job whose
+heartbeat is older than JOB_STALE_AFTER (worker crashed/restarted) is put back
+to pending by recover_stale(). Workers claim with FOR UPDATE SKIP LOCKED, so
+any number of them can poll the same table.
+
+All functions take a psycopg2 connection and commit themselves.
+
+ProgressReporter writes live import counters (bytes read, rows loaded/
+inserted/skipped/failed, phase, rows/sec) into the job row while the import
+transaction is still open; see eta_seconds() for the estimate shown by the API.
+"""
+import os
+import json
+import time
+import datetime
+import threading
+
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF = float(os.environ.get("JOB_RETRY_BACKOFF", "30"))     # seconds, doubled per attempt
+JOB_HEARTBEAT_INTERVAL = float(os.environ.get("JOB_HEARTBEAT_INTERVAL", "15"))
+JOB_STALE_AFTER = float(os.environ.get("JOB_STALE_AFTER", "120"))
+JOB_PROGRESS_INTERVAL = float(os.environ.get("JOB_PROGRESS_INTERVAL", "2"))   # min seconds between progress writes
+
+class JobDeferred(Exception):
+    """Raised by a job runner that cannot start yet; the worker requeues the job via defer()."""
+
+    def __init__(self, reason: str, delay: float = None):
+        super().__init__(reason)
+        self.delay = JOB_RETRY_BACKOFF if delay is None else delay
+
+
+JOB_COLUMNS = "id, file_url, file_hash, status, attempts, max_attempts, options"
+
+
+def _one(conn, sql, params):
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, params)
+        row = cur.fetchone() if cur.description else None
+        conn.commit()
+        if row is None:
+            return None
+        return dict(zip([d[0] for d in cur.description], row))
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+# params: (file_url, file_hash, options_json, max_attempts); also used by the async API handler
+ENQUEUE_SQL = (
+    "INSERT INTO import_jobs (file_url, file_hash, status, options, max_attempts, run_after, created_at, updated_at) "
+    "VALUES (%s, %s, 'pending', %s::jsonb, %s, now(), now(), now()) RETURNING id"
+)
+
+# params: (file_hash, job_id, job_id); the latest successful import of the same
+# content, else an older job that is still queued/running (so it is not loaded
+# twice; the older one wins, two jobs never wait for each other)
+FIND_IMPORTED_SQL = """
+    SELECT id, status, result, finished_at FROM import_jobs
+    WHERE file_hash = %s AND id <> %s
+      AND (status = 'success' OR (status IN ('pending', 'running') AND id < %s))
+    ORDER BY (status = 'success') DESC, finished_at DESC NULLS LAST, id DESC
+    LIMIT 1
+"""
+
+
+def enqueue(conn, file_url: str, options: dict = None, max_attempts: int = JOB_MAX_ATTEMPTS,
+            file_hash: str = None) -> int:
+    row = _one(conn, ENQUEUE_SQL, (file_url, file_hash, json.dumps(options or {}), max_attempts))
+    return row["id"]
+
+
+NEW_JOB = 2 ** 31 - 1   # job_id for FIND_IMPORTED_SQL when the job does not exist yet
+
+
+def find_imported(conn, file_hash: str, job_id: int = NEW_JOB):
+    """Job that already imported (or is importing) a file with this content hash, or None."""
+    if not file_hash:
+        return None
+    return _one(conn, FIND_IMPORTED_SQL, (file_hash, job_id, job_id))
+
+
+def set_file_hash(conn, job_id: int, file_hash: str):
+    _one(conn, "UPDATE import_jobs SET file_hash = %s, updated_at = now() WHERE id = %s", (file_hash, job_id))
+
+
+def claim(conn, worker_id: str):
+    """Atomically take the oldest due pending job, or return None."""
+    return _one(conn, f"""
+        UPDATE import_jobs j
+        SET status = 'running', locked_by = %s, attempts = j.attempts + 1,
+            heartbeat_at = now(), started_at = now(), updated_at = now(), error = NULL
+        WHERE j.id = (
+            SELECT id FROM import_jobs
+            WHERE status = 'pending' AND run_after <= now()
+            ORDER BY run_after, id
+            FOR UPDATE SKIP LOCKED
+            LIMIT 1
+        )
+        RETURNING {JOB_COLUMNS}
+    """, (worker_id,))
+
+
+def heartbeat(conn, job_ids, worker_id: str) -> int:
+    """Refresh heartbeat_at for the jobs this worker still owns; returns how many."""
+    if not job_ids:
+        return 0
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "UPDATE import_jobs SET heartbeat_at = now() "
+            "WHERE id = ANY(%s) AND locked_by = %s AND status = 'running'",
+            (list(job_ids), worker_id),
+        )
+        n = cur.rowcount
+        conn.commit()
+        return n
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+def complete(conn, job_id: int, worker_id: str, result: dict = None) -> bool:
+    """Mark the job successful and keep the loader statistics in `result`."""
+    row = _one(conn, """
+        UPDATE import_jobs SET status = 'success', locked_by = NULL, finished_at = now(), updated_at = now(),
+            result = %s::jsonb
+        WHERE id = %s AND locked_by = %s
+        RETURNING id
+    """, (json.dumps(result, default=str) if result is not None else None, job_id, worker_id))
+    return row is not None
+
+
+def fail(conn, job_id: int, worker_id: str, error: str, backoff: float = JOB_RETRY_BACKOFF):
+    """Record a failed attempt: back to pending with back-off, or failed when out of attempts."""
+    return _one(conn, """
+        UPDATE import_jobs
+        SET status = CASE WHEN attempts < max_attempts THEN 'pending' ELSE 'failed' END,
+            run_after = now() + make_interval(secs => %s * power(2, GREATEST(attempts - 1, 0))),
+            finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE now() END,
+            locked_by = NULL, error = %s, updated_at = now()
+        WHERE id = %s AND locked_by = %s
+        RETURNING id, status, attempts
+    """, (backoff, error, job_id, worker_id))
+
+
+def defer(conn, job_id: int, worker_id: str, delay: float, reason: str = None):
+    """Put a claimed job back to pending without using up an attempt."""
+    return _one(conn, """
+        UPDATE import_jobs
+        SET status = 'pending', attempts = GREATEST(attempts - 1, 0), locked_by = NULL,
+            run_after = now() + make_interval(secs => %s), error = %s, updated_at = now()
+        WHERE id = %s AND locked_by = %s
+        RETURNING id
+    """, (delay, reason, job_id, worker_id))
+
+
+def recover_stale(conn, stale_after: float = JOB_STALE_AFTER) -> int:
+    """Requeue running jobs whose worker stopped heartbeating (or fail them if out of attempts)."""
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            UPDATE import_jobs
+            SET status = CASE WHEN attempts < max_attempts THEN 'pending' ELSE 'failed' END,
+                error = 'worker ' || COALESCE(locked_by, '?') || ' stopped heartbeating',
+                finished_at = CASE WHEN attempts < max_attempts THEN NULL ELSE now() END,
+                locked_by = NULL, run_after = now(), updated_at = now()
+            WHERE status = 'running'
+              AND COALESCE(heartbeat_at, updated_at) < now() - make_interval(secs => %s)
+        """, (stale_after,))
+        n = cur.rowcount
+        conn.commit()
+        return n
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+# -----------------------
+# Progress reporting
+# -----------------------
+PROGRESS_COUNTERS = ("bytes_read", "lines_loaded", "rows_inserted", "rows_skipped", "rows_failed")
+
+PROGRESS_SQL = """
+    UPDATE import_jobs
+    SET bytes_total = %(bytes_total)s, bytes_read = %(bytes_read)s, lines_loaded = %(lines_loaded)s,
+        rows_inserted = %(rows_inserted)s, rows_skipped = %(rows_skipped)s, rows_failed = %(rows_failed)s,
+        phase = %(phase)s, rows_per_sec = %(rows_per_sec)s, progress_at = now(),
+        progress_started_at = CASE WHEN %(restart)s THEN now() ELSE progress_started_at END
+    WHERE id = %(id)s
+"""
+
+
+class ProgressReporter:
+    """
+    Thread-safe progress sink passed to app.importer (`progress=`). Counters are
+    added as deltas (parallel partitions report into one reporter) and written
+    at most every `interval` seconds on a short-lived connection of their own,
+    so the values are visible while the import transaction is uncommitted.
+    Phase changes are written immediately. Write errors are logged, never raised:
+    progress must not fail an import.
+    """
+
+    def __init__(self, connection, job_id: int, interval: float = JOB_PROGRESS_INTERVAL, clock=time.monotonic):
+        self.connection = connection
+        self.job_id = job_id
+        self.interval = interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._restart = False
+        self._reset(None)
+
+    def _reset(self, bytes_total):
+        self.values = dict.fromkeys(PROGRESS_COUNTERS, 0)
+        self.values.update(bytes_total=bytes_total, phase="queued", rows_per_sec=None)
+        self._started = self.clock()
+        self._last_write = None
+
+    def start(self, bytes_total: int = None, phase: str = "copy"):
+        """
+        Reset the counters (a retried attempt starts from zero), enter `phase` and
+        stamp progress_started_at, the time eta_seconds() measures the rate from.
+        """
+        with self._lock:
+            self._reset(bytes_total)
+            self.values["phase"] = phase
+            self._restart = True
+        self.flush(force=True)
+
+    def add(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self.values[key] += delta
+        self.flush()
+
+    def set_phase(self, phase: str):
+        with self._lock:
+            self.values["phase"] = phase
+        self.flush(force=True)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self) -> dict:
+        out = dict(self.values)
+        elapsed = self.clock() - self._started
+        if elapsed > 0:
+            out["rows_per_sec"] = round(out["lines_loaded"] / elapsed, 1)
+        return out
+
+    def flush(self, force: bool = False):
+        with self._lock:
+            now = self.clock()
+            if not force and self._last_write is not None and now - self._last_write < self.interval:
+                return
+            self._last_write = now
+            values = self._snapshot()
+            restart = self._restart
+        try:
+            with self.connection() as conn:
+                cur = conn.cursor()
+                try:
+                    cur.execute(PROGRESS_SQL, dict(values, id=self.job_id, restart=restart))
+                    conn.commit()
+                    if restart:
+                        with self._lock:
+                            self._restart = False
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    cur.close()
+        except Exception as e:
+            print(f"[jobqueue] progress write for job {self.job_id} failed: {e}", flush=True)
+
+
+def eta_seconds(job: dict, now: datetime.datetime = None):
+    """
+    Remaining seconds of a running import, extrapolated from the COPY byte rate
+    since progress_started_at (not started_at: the worker hashes the file between
+    claim and the first read). None when unknown (not running, nothing read yet,
+    or all bytes read and only the transform/commit is left).
+    """
+    total, done, started = job.get("bytes_total"), job.get("bytes_read"), job.get("progress_started_at")
+    if job.get("status") != "running" or not total or not done or started is None or done >= total:
+        return None
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    elapsed = (now - started).total_seconds()
+    if elapsed <= 0:
+        return None
+    return round((total - done) * elapsed / done, 1)
@@ -1,13 +1,15 @@
 # backend/app/main.py
 import os
 import json
+import asyncio
 import datetime
 from typing import Optional, List
 
 from fastapi import (
-    FastAPI, Form, HTTPException, Header, File, UploadFile, Query, Depends, BackgroundTasks
+    FastAPI, Form, HTTPException, Header, File, UploadFile, Query, Depends, Request
 )
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel
 from jose import jwt, JWTError
@@ -19,6 +21,11 @@ from typing import Optional
 from fastapi import Header, HTTPException
 
 from fastapi import APIRouter, UploadFile, HTTPException
+
+from app import db, async_db, uploads, importer, jobqueue, regions
+from app.metrics import router as metrics_router
+
+# -----------------------
 # Config
 # -----------------------
 SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-change-me")
@@ -27,16 +34,6 @@ ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get("ACCESS_TOKEN_EXPIRE_MINUTES",
 ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "supersecret123")
 API_ALLOWED_ORIGINS = os.environ.get("API_ALLOWED_ORIGINS", "http://localhost:5173,http://localhost:3000")
 
-# DATABASE_URL support: full URI or libpq-style build from parts
-DATABASE_URL = os.environ.get("DATABASE_URL")
-if not DATABASE_URL:
-    pg_host = os.environ.get("PGHOST", os.environ.get("DB_HOST", "db"))
-    pg_port = os.environ.get("PGPORT", os.environ.get("DB_PORT", "5432"))
-    pg_db = os.environ.get("PGDATABASE", os.environ.get("DB_NAME", "gis"))
-    pg_user = os.environ.get("PGUSER", os.environ.get("DB_USER", "postgres"))
-    pg_pass = os.environ.get("PGPASSWORD", os.environ.get("DB_PASS", "postgres"))
-    DATABASE_URL = f"host={pg_host} dbname={pg_db} user={pg_user} password={pg_pass} port={pg_port}"
-
 # -----------------------
 # FastAPI init
 # -----------------------
@@ -52,12 +49,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.include_router(metrics_router)
+
 # -----------------------
 # DB helper
 # -----------------------
+@app.on_event("startup")
+async def open_db_pool():
+    db.init_pool()
+    if async_db.DB_ASYNC:
+        await async_db.init_pool()
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    if async_db.DB_ASYNC:
+        await async_db.close_pool()
+    db.close_pool()
+
 def get_conn():
-    # psycopg2.connect supports both URI and libpq-style DSN passed above
-    return psycopg2.connect(DATABASE_URL)
+    # borrow a connection from the shared pool; hand it back with put_conn()
+    return db.get_pool().getconn()
+
+def put_conn(conn):
+    db.get_pool().putconn(conn)
 
 # -----------------------
 # Models
@@ -109,7 +123,7 @@ def get_user_from_db(username: str) -> Optional[User]:
         return None
     finally:
         if conn:
-            conn.close()
+            put_conn(conn)
 
 def verify_password(username: str, plain_password: str) -> bool:
     conn = None
@@ -127,7 +141,7 @@ def verify_password(username: str, plain_password: str) -> bool:
         return False
     finally:
         if conn:
-            conn.close()
+            put_conn(conn)
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
     credentials_exception = HTTPException(status_code=401, detail="Could not validate credentials")
@@ -198,34 +212,32 @@ def login_form(username: str = Form(...), password: str = Form(...)):
 def health():
     return {"status": "ok"}
 
+@app.get("/api/v1/db/pool")
+def db_pool_stats():
+    return {"mode": "async" if async_db.DB_ASYNC else "sync",
+            "sync": db.get_pool().stats(),
+            "async": async_db.stats()}
+
 # -----------------------
 # Public data endpoints
 # -----------------------
 @app.get("/api/v1/regions")
-def regions_list(limit: int = Query(500, ge=1, le=2000)):
-    conn = None
+async def regions_list(limit: int = Query(500, ge=1, le=2000),
+                       zoom: Optional[int] = Query(None, ge=0, le=24),
+                       tolerance: Optional[float] = Query(None, ge=0)):
+    # features are pre-rendered JSON in regions_simplified; they are joined into
+    # the array as-is, never parsed here. The whole (LIMITed) body is read before
+    # responding, so a DB error is a 500, not a 200 with a truncated document.
     try:
-        conn = get_conn()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        cur.execute(
-            "SELECT gid, name, ST_AsGeoJSON(geom) AS geojson FROM public.regions ORDER BY name LIMIT %s",
-            (limit,)
-        )
-        rows = cur.fetchall()
-        cur.close()
-        return [{"gid": r["gid"], "name": r["name"], "geojson": json.loads(r["geojson"])} for r in rows]
+        rows = await async_db.fetch_all(regions.SIMPLIFIED_SQL, (regions.request_tolerance(zoom, tolerance), limit))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            conn.close()
+    body = "[" + ",".join(r["feature"] for r in rows) + "]"
+    return Response(content=body.encode("utf-8"), media_type="application/json")
 
 @app.get("/api/v1/top-regions")
-def top_regions(limit: int = Query(20, ge=1, le=200), date_from: Optional[str] = None, date_to: Optional[str] = None):
-    conn = None
+async def top_regions(limit: int = Query(20, ge=1, le=200), date_from: Optional[str] = None, date_to: Optional[str] = None):
     try:
-        conn = get_conn()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         where = []
         params = []
         if date_from:
@@ -244,9 +256,7 @@ def top_regions(limit: int = Query(20, ge=1, le=200), date_from: Optional[str] =
             LIMIT %s
         """
         params.append(limit)
-        cur.execute(sql, tuple(params))
-        rows = cur.fetchall()
-        cur.close()
+        rows = await async_db.fetch_all(sql, tuple(params))
         results = []
         for r in rows:
             results.append({
@@ -258,12 +268,9 @@ def top_regions(limit: int = Query(20, ge=1, le=200), date_from: Optional[str] =
         return results
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            conn.close()
 
 @app.get("/api/v1/flights")
-def list_flights(
+async def list_flights(
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
     date_from: Optional[str] = None,
@@ -271,10 +278,7 @@ def list_flights(
     region_id: Optional[int] = None,
     uav_type: Optional[str] = None
 ):
-    conn = None
     try:
-        conn = get_conn()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         where = []
         params = []
         if date_from:
@@ -298,9 +302,7 @@ def list_flights(
           LIMIT %s OFFSET %s
         """
         params.extend([limit, offset])
-        cur.execute(sql, tuple(params))
-        rows = cur.fetchall()
-        cur.close()
+        rows = await async_db.fetch_all(sql, tuple(params))
         out = []
         for r in rows:
             out.append({
@@ -318,9 +320,6 @@ def list_flights(
         return out
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            conn.close()
 
 # -----------------------
 # Upload + import endpoints (admin only)
@@ -330,25 +329,75 @@ async def upload_ndjson(file: UploadFile = File(...), authorization: Optional[st
     admin_auth(authorization)  # will raise if not allowed
     dest_path = "/data/uploaded_parsed.ndjson"
     try:
-        contents = await file.read()
-        os.makedirs("/data", exist_ok=True)
-        with open(dest_path, "wb") as fh:
-            fh.write(contents)
-        return {"status": "uploaded", "path": dest_path}
+        saved = await uploads.stream_to_file(file.read, dest_path)
+        return {"status": "uploaded", "path": dest_path, "size": saved["size"], "sha256": saved["sha256"]}
+    except uploads.UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed save file: {e}")
 
+# -----------------------
+# Resumable chunked uploads (admin only): init -> PUT parts -> finalize
+# -----------------------
+def upload_http_error(e: uploads.UploadError) -> HTTPException:
+    if isinstance(e, uploads.UploadNotFound):
+        return HTTPException(status_code=404, detail=str(e))
+    if isinstance(e, uploads.UploadOffsetMismatch):
+        return HTTPException(status_code=409, detail={"error": str(e), "received": e.expected})
+    if isinstance(e, uploads.UploadTooLarge):
+        return HTTPException(status_code=413, detail=str(e))
+    return HTTPException(status_code=400, detail=str(e))
+
+@app.post("/api/v1/uploads")
+def init_chunked_upload(payload: dict = None, authorization: Optional[str] = Header(None)):
+    """payload: { "filename": "2025.ndjson", "size": <total bytes, optional> }"""
+    admin_auth(authorization)
+    payload = payload or {}
+    try:
+        return uploads.init_upload(payload.get("filename"), payload.get("size"))
+    except uploads.UploadError as e:
+        raise upload_http_error(e)
+
+@app.get("/api/v1/uploads/{upload_id}")
+def chunked_upload_status(upload_id: str, authorization: Optional[str] = Header(None)):
+    admin_auth(authorization)
+    try:
+        return uploads.upload_status(upload_id)
+    except uploads.UploadError as e:
+        raise upload_http_error(e)
+
+@app.put("/api/v1/uploads/{upload_id}")
+async def upload_part(upload_id: str, request: Request, offset: int = Query(..., ge=0),
+                      authorization: Optional[str] = Header(None)):
+    """Raw request body is appended at `offset` (must equal `received` from status)."""
+    admin_auth(authorization)
+    try:
+        return await uploads.append_part(upload_id, offset, request.stream())
+    except uploads.UploadError as e:
+        raise upload_http_error(e)
+
+@app.post("/api/v1/uploads/{upload_id}/finalize")
+def finalize_chunked_upload(upload_id: str, payload: dict = None, authorization: Optional[str] = Header(None)):
+    """payload: { "sha256": "<hex, optional>" } — verified against the assembled file."""
+    admin_auth(authorization)
+    try:
+        return uploads.finalize_upload(upload_id, (payload or {}).get("sha256"))
+    except uploads.UploadError as e:
+        raise upload_http_error(e)
+
 @app.post("/api/v1/import_from_upload")
 def import_from_upload(authorization: Optional[str] = Header(None)):
     """
-    Безопасный импорт: берет /data/uploaded_parsed.ndjson (в API контейнере),
-    построчно наполняет staging_raw, затем выполняет load_from_staging.sql (если есть).
+    Импорт загруженного файла: берет /data/uploaded_parsed.ndjson (в API контейнере),
+    потоково отправляет его в staging_raw через COPY ... FROM STDIN, затем выполняет
+    load_from_staging.sql (если есть) — всё одной транзакцией (см. app/importer.py).
+    Parquet-файл (full_runner.py --out *.parquet) распознаётся по содержимому и грузится
+    через типизированную staging_flights и load_from_staging_columns.sql.
     Это НЕ использует psql-метакоманду \COPY и поэтому безопасно для выполнения
     через psycopg2.
     """
     admin_auth(authorization)
     upload_path = "/data/uploaded_parsed.ndjson"
-    load_sql_path = "/data/load_from_staging.sql"
 
     if not os.path.exists(upload_path):
         raise HTTPException(status_code=400, detail=f"Upload file not found: {upload_path}")
@@ -356,176 +405,199 @@ def import_from_upload(authorization: Optional[str] = Header(None)):
     conn = None
     try:
         conn = get_conn()
-        cur = conn.cursor()
-        # 1) Очистим staging_raw
-        cur.execute("TRUNCATE staging_raw;")
-        conn.commit()
-
-        # 2) Вставляем построчно (каждая строка — JSON text)
-        inserted = 0
-        with open(upload_path, "r", encoding="utf-8") as fh:
-            batch = []
-            BATCH = 1000  # вставлять батчами для скорости/памяти
-            for line in fh:
-                line = line.strip()
-                if not line:
-                    continue
-                batch.append((line,))
-                if len(batch) >= BATCH:
-                    psycopg2.extras.execute_values(
-                        cur,
-                        "INSERT INTO staging_raw (raw) VALUES %s",
-                        batch,
-                        template="(%s)"
-                    )
-                    conn.commit()
-                    inserted += len(batch)
-                    batch = []
-            if batch:
-                psycopg2.extras.execute_values(
-                    cur,
-                    "INSERT INTO staging_raw (raw) VALUES %s",
-                    batch,
-                    template="(%s)"
-                )
-                conn.commit()
-                inserted += len(batch)
-
-        # 3) Выполнить SQL-трансформации (если есть файл load_from_staging.sql)
-        if os.path.exists(load_sql_path):
-            with open(load_sql_path, "r", encoding="utf-8") as fh:
-                sql = fh.read()
-            cur.execute("BEGIN;")
-            cur.execute(sql)
-            cur.execute("COMMIT;")
-            conn.commit()
-            cur.close()
-            return {"status": "imported", "inserted_rows": inserted, "note": "staging filled and load script executed"}
-        else:
-            cur.close()
-            return {"status": "copied", "inserted_rows": inserted, "note": f"{load_sql_path} not found; run load script in DB manually (or place it in /data)"}
-
+        stats = importer.import_file(conn, upload_path)
+        status = "imported" if stats["transformed"] else "copied"
+        return {"status": status, **stats}
     except HTTPException:
         raise
     except Exception as e:
-        if conn:
-            conn.rollback()
         raise HTTPException(status_code=500, detail=f"Import failed: {e}")
     finally:
         if conn:
-            conn.close()
+            put_conn(conn)
 
 
 
 # -----------------------
-# Job-based async import (BackgroundTasks)
+# Job-based import (durable queue in import_jobs, executed by `python -m app.worker`)
 # -----------------------
-def do_import_job(job_id: int, file_url: str):
-    """Background worker: copy file -> run load SQL -> update import_jobs"""
-    conn = None
+def positive_int_param(payload: dict, key: str, default):
+    """payload[key] as an int >= 1 (default when absent); HTTP 400 otherwise."""
+    value = payload.get(key)
+    if value is None or value == "":
+        return default
     try:
-        conn = get_conn()
-        cur = conn.cursor()
-        # mark running
-        cur.execute("UPDATE import_jobs SET status='running', updated_at=now() WHERE id=%s", (job_id,))
-        conn.commit()
-
-        if not os.path.exists(file_url):
-            raise Exception(f"File not found for job: {file_url}")
-
-        # Truncate staging_raw
-        cur.execute("TRUNCATE staging_raw;")
-        conn.commit()
-
-        # COPY via copy_expert (stream)
-        with open(file_url, "r", encoding="utf-8") as fh:
-            cur.copy_expert("COPY staging_raw(raw) FROM STDIN WITH (FORMAT text)", fh)
-        conn.commit()
-
-        # Execute load script if exists
-        load_sql_path = "/data/load_from_staging.sql"
-        if os.path.exists(load_sql_path):
-            with open(load_sql_path, "r", encoding="utf-8") as fh_sql:
-                sql = fh_sql.read()
-            cur.execute("BEGIN;")
-            cur.execute(sql)
-            cur.execute("COMMIT;")
-            conn.commit()
-
-        # success
-        cur.execute("UPDATE import_jobs SET status='success', updated_at=now() WHERE id=%s", (job_id,))
-        conn.commit()
-        cur.close()
-    except Exception as e:
-        if conn:
-            conn.rollback()
-            try:
-                cur.execute("UPDATE import_jobs SET status='failed', error=%s, updated_at=now() WHERE id=%s", (str(e), job_id))
-                conn.commit()
-            except Exception:
-                pass
-        print(f"[import job {job_id}] failed: {e}")
-    finally:
-        if conn:
-            conn.close()
+        n = int(value)
+    except (TypeError, ValueError):
+        n = None
+    if n is None or isinstance(value, bool) or n < 1 or (isinstance(value, float) and value != n):
+        raise HTTPException(status_code=400, detail=f"{key} must be a positive integer, got {value!r}")
+    return n
 
 @app.post("/api/v1/import")
-def start_import(payload: dict, background_tasks: BackgroundTasks, authorization: Optional[str] = Header(None)):
+async def start_import(payload: dict, authorization: Optional[str] = Header(None)):
     """
     Start import job. payload: { "file_url": "/data/uploaded_parsed.ndjson" }
-    Returns job_id. Job runs in background (FastAPI process).
+    or { "upload_id": "<id from /api/v1/uploads>" }, optional "workers": N
+    for a parallel partitioned load (default IMPORT_WORKERS) and
+    "max_attempts" (default JOB_MAX_ATTEMPTS).
+    Returns job_id. The job is queued and picked up by a worker process.
+    If a file with the same SHA-256 was already imported (or is being imported),
+    no job is created and the earlier job is returned; "force": true imports anyway.
     """
     admin_auth(authorization)
     file_url = payload.get("file_url")
+    if payload.get("upload_id"):
+        try:
+            file_url = uploads.resolve_upload(payload["upload_id"])
+        except uploads.UploadError as e:
+            raise upload_http_error(e)
     if not file_url:
-        raise HTTPException(status_code=400, detail="file_url required")
-
-    # Insert job record
-    conn = None
+        raise HTTPException(status_code=400, detail="file_url or upload_id required")
+
+    options = {}
+    workers = positive_int_param(payload, "workers", None)
+    if workers is not None:
+        options["workers"] = workers
+    force = bool(payload.get("force"))
+    if force:
+        options["force"] = True
+    max_attempts = positive_int_param(payload, "max_attempts", jobqueue.JOB_MAX_ATTEMPTS)
+
+    # hash written at upload time; files put in place otherwise are hashed by the worker
+    file_hash = uploads.read_hash(file_url)
+    if file_hash and not force:
+        try:
+            prev = await async_db.fetch_one(jobqueue.FIND_IMPORTED_SQL,
+                                            (file_hash, jobqueue.NEW_JOB, jobqueue.NEW_JOB))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed create job: {e}")
+        if prev:
+            return {"job_id": prev["id"], "status": "duplicate", "job_status": prev["status"],
+                    "file_hash": file_hash, "result": prev["result"]}
+
+    # Insert job record (status pending)
     try:
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute("INSERT INTO import_jobs (file_url, status, created_at, updated_at) VALUES (%s,'pending', now(), now()) RETURNING id", (file_url,))
-        job_id = cur.fetchone()[0]
-        conn.commit()
-        cur.close()
+        row = await async_db.fetch_one(jobqueue.ENQUEUE_SQL,
+                                       (file_url, file_hash, json.dumps(options), max_attempts))
+        job_id = row["id"]
     except Exception as e:
-        if conn:
-            conn.rollback()
         raise HTTPException(status_code=500, detail=f"Failed create job: {e}")
-    finally:
-        if conn:
-            conn.close()
 
-    # schedule background task
-    background_tasks.add_task(do_import_job, job_id, file_url)
     return {"job_id": job_id, "status": "queued"}
 
+JOB_SQL = """
+    SELECT id, file_url, file_hash, status, created_at, updated_at, error, result,
+           attempts, max_attempts, locked_by, heartbeat_at, started_at, finished_at,
+           phase, bytes_total, bytes_read, lines_loaded, rows_inserted, rows_skipped, rows_failed,
+           rows_per_sec, progress_at, progress_started_at
+    FROM import_jobs WHERE id=%s
+"""
+JOB_EVENTS_INTERVAL = float(os.environ.get("JOB_EVENTS_INTERVAL", "1"))
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+def job_view(row):
+    total, done = row["bytes_total"], row["bytes_read"]
+    return {
+        "id": row["id"],
+        "file_url": row["file_url"],
+        "file_hash": row["file_hash"],
+        "status": row["status"],
+        "created_at": _iso(row["created_at"]),
+        "updated_at": _iso(row["updated_at"]),
+        "error": row["error"],
+        "attempts": row["attempts"],
+        "max_attempts": row["max_attempts"],
+        "worker": row["locked_by"],
+        "heartbeat_at": _iso(row["heartbeat_at"]),
+        "started_at": _iso(row["started_at"]),
+        "finished_at": _iso(row["finished_at"]),
+        "result": row["result"],
+        "progress": {
+            "phase": row["phase"],
+            "bytes_total": total,
+            "bytes_read": done,
+            "percent": round(100.0 * done / total, 1) if total and done is not None else None,
+            "lines_loaded": row["lines_loaded"],
+            "rows_inserted": row["rows_inserted"],
+            "rows_skipped": row["rows_skipped"],
+            "rows_failed": row["rows_failed"],
+            "rows_per_sec": row["rows_per_sec"],
+            "eta_seconds": jobqueue.eta_seconds(row),
+            "updated_at": _iso(row["progress_at"]),
+        },
+    }
+
 @app.get("/api/v1/job/{job_id}")
-def get_job(job_id: int, authorization: Optional[str] = Header(None)):
+async def get_job(job_id: int, authorization: Optional[str] = Header(None)):
     # admin-only view: requires admin token
     admin_auth(authorization)
-    conn = None
     try:
-        conn = get_conn()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        cur.execute("SELECT id, file_url, status, created_at, updated_at, error FROM import_jobs WHERE id=%s", (job_id,))
-        row = cur.fetchone()
-        cur.close()
+        row = await async_db.fetch_one(JOB_SQL, (job_id,))
         if not row:
             raise HTTPException(status_code=404, detail="Job not found")
-        return {
-            "id": row["id"],
-            "file_url": row["file_url"],
-            "status": row["status"],
-            "created_at": row["created_at"].isoformat() if row["created_at"] else None,
-            "updated_at": row["updated_at"].isoformat() if row["updated_at"] else None,
-            "error": row["error"]
-        }
+        return job_view(row)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            conn.close()
+
+# EventSource cannot send headers and a query string ends up in access/proxy logs,
+# so ?token= only takes a short-lived token scoped to one job's events, never the admin one
+JOB_EVENTS_TOKEN_TTL = int(os.environ.get("JOB_EVENTS_TOKEN_TTL", "300"))
+JOB_EVENTS_SCOPE = "job-events"
+
+def job_events_auth(job_id: int, authorization: Optional[str], token: Optional[str]):
+    if authorization or not token:
+        admin_auth(authorization)
+        return
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired events token")
+    if payload.get("scope") != JOB_EVENTS_SCOPE or payload.get("job_id") != job_id:
+        raise HTTPException(status_code=403, detail="Token is not valid for this job's events")
+
+@app.post("/api/v1/job/{job_id}/events-token")
+async def job_events_token(job_id: int, authorization: Optional[str] = Header(None)):
+    """Admin only: a token for GET /api/v1/job/{id}/events?token=... (this job, JOB_EVENTS_TOKEN_TTL s)."""
+    admin_auth(authorization)
+    if not await async_db.fetch_one("SELECT id FROM import_jobs WHERE id=%s", (job_id,)):
+        raise HTTPException(status_code=404, detail="Job not found")
+    token = create_access_token({"scope": JOB_EVENTS_SCOPE, "job_id": job_id},
+                                datetime.timedelta(seconds=JOB_EVENTS_TOKEN_TTL))
+    return {"token": token, "expires_in": JOB_EVENTS_TOKEN_TTL}
+
+@app.get("/api/v1/job/{job_id}/events")
+async def job_events(job_id: int, authorization: Optional[str] = Header(None),
+                     token: Optional[str] = Query(None)):
+    """
+    Server-sent events with the same payload as GET /api/v1/job/{id}: one event
+    whenever the job row changes (polled every JOB_EVENTS_INTERVAL s), the stream
+    ends after success/failed. Authorization: the admin header, or for
+    EventSource ?token= from POST /api/v1/job/{id}/events-token.
+    """
+    job_events_auth(job_id, authorization, token)
+    if not await async_db.fetch_one("SELECT id FROM import_jobs WHERE id=%s", (job_id,)):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last = None
+        while True:
+            row = await async_db.fetch_one(JOB_SQL, (job_id,))
+            if not row:
+                return
+            view = job_view(row)
+            data = json.dumps(view, ensure_ascii=False)
+            if data != last:
+                yield f"event: progress\ndata: {data}\n\n"
+                last = data
+            if view["status"] in ("success", "failed"):
+                yield f"event: end\ndata: {json.dumps({'status': view['status']})}\n\n"
+                return
+            await asyncio.sleep(JOB_EVENTS_INTERVAL)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -1,13 +1,11 @@
 # metrics.py
 from fastapi import APIRouter, Query
 from fastapi.responses import JSONResponse
-import psycopg2
-import os
 import time
 
-router = APIRouter(prefix="/api/v1/metrics")
+from app import async_db
 
-DB_DSN = os.getenv("DB_DSN", "host=localhost dbname=gis user=postgres password=postgres")
+router = APIRouter(prefix="/api/v1/metrics")
 
 # Простое in-memory cache with TTL
 _cache = {}
@@ -27,7 +25,7 @@ def _set_cache(key, val):
     _cache[key] = (time.time(), val)
 
 @router.get("/regions")
-def metrics_regions(from_dt: str = Query(None), to_dt: str = Query(None), top: int = Query(10)):
+async def metrics_regions(from_dt: str = Query(None), to_dt: str = Query(None), top: int = Query(10)):
     """
     from_dt / to_dt expected as ISO strings, e.g. 2025-09-01T00:00:00Z
     """
@@ -53,11 +51,7 @@ def metrics_regions(from_dt: str = Query(None), to_dt: str = Query(None), top: i
     sql += " GROUP BY r.id, r.name ORDER BY cnt DESC LIMIT %s;"
     params.append(top)
 
-    conn = psycopg2.connect(DB_DSN)
-    cur = conn.cursor()
-    cur.execute(sql, params)
-    rows = cur.fetchall()
-    cur.close(); conn.close()
-    res = [{"region": r[0], "count": int(r[1])} for r in rows]
+    rows = await async_db.fetch_all(sql, params)
+    res = [{"region": r["name"], "count": int(r["cnt"])} for r in rows]
     _set_cache(cache_key, res)
     return JSONResponse(res)
@@ -1,11 +1,63 @@
 # parser.py
+import os
 import re
 import json
 import math
 import hashlib
 from datetime import datetime, timezone
+from functools import cached_property, lru_cache
 from typing import Optional, Tuple, Dict, Any
 
+# Version of the normalize_row() output. Bump it whenever a change can alter the
+# result for some input: rows in flights carry the version that parsed them, and
+# data/reparse_and_fill.py only re-parses rows stamped with an older one.
+PARSER_VERSION = 1
+
+# FINGERPRINT_MODE=compact: fingerprints are the first 16 bytes of the SHA-256
+# (32 hex chars, a uuid in PostgreSQL) instead of the 64-char hex digest.
+FINGERPRINT_COMPACT = os.environ.get("FINGERPRINT_MODE", "sha256").lower() == "compact"
+
+# Size of each memo cache below (coordinates / DOF+time recur across the blocks
+# of one message and across rows); 0 disables caching.
+PARSER_CACHE_SIZE = int(os.environ.get("PARSER_CACHE_SIZE", "65536"))
+
+# -----------------------
+# precompiled patterns
+# -----------------------
+def _kw(keyword: str, rest: str = '') -> re.Pattern:
+    # Same as r'\b' + keyword + rest, but starting with the literal keyword: sre
+    # only uses its fast substring scan for patterns with a literal prefix, and a
+    # leading \b turns every search into a per-character match attempt.
+    # (?<!\wKEY) right after KEY is exactly "\b before KEY" for a keyword that
+    # starts with a word character.
+    return re.compile(keyword + r'(?<!\w' + keyword + ')' + rest)
+
+_COORD_JUNK_RE = re.compile(r'[^0-9NSEWnsew]')
+_COORD_DM_RE = re.compile(r'^(\d{2,4})(\d{2})(N|S)(\d{2,3})(\d{2})(E|W)$')
+_COORD_DMS_RE = re.compile(r'^(\d{2})(\d{2})(\d{2})(N|S)(\d{3})(\d{2})(\d{2})(E|W)$')
+
+_REG_RE = _kw('REG', r'[/\s]*([A-Z0-9\-\_\,]+)')
+_SID_RE = _kw('SID/', r'(\d{4,})\b')
+_ALNUM_ID_RE = re.compile(r'\b([A-Z]{1,3}[-]?[0-9]{2,6}[A-Z0-9]{0,3})\b')
+_REG_STOP = frozenset({'TITLE', 'IDEP', 'IARR', 'ADEP', 'ARR', 'DEP'})
+_ALNUM_ID_STOP = frozenset({'TITLE', 'IDEP', 'IARR', 'ADEP', 'ARR', 'DEP', 'M0000', 'K0300'})
+
+_DOF_RE = _kw('DOF', r'[/\s]?(\d{6})\b')
+_ATD_RE = _kw('ATD', r'[\s:/-]?(\d{3,4})\b')
+_ATA_RE = _kw('ATA', r'[\s:/-]?(\d{3,4})\b')
+_HHMM_RE = re.compile(r'\b(\d{4})\b')
+_NON_DIGIT_RE = re.compile(r'\D')
+
+_ADEPZ_RE = _kw('ADEPZ', r'[\s/:]*([0-9NSEWnsew\ \-]+)')
+_ADARRZ_RE = _kw('ADARRZ', r'[\s/:]*([0-9NSEWnsew\ \-]+)')
+_DEP_COORD_RE = re.compile(r'(?:DEP|ADARR|ADEP|ADARRZ|DEP/)\s*[/:]*\s*([0-9]{4,15}[NSEWnsew0-9]*)')
+_COMPACT_TOKEN_RE = re.compile(r'([0-9]{4,15}[NSEWnsew])')
+_COORD_PAIR_RE = re.compile(r'(\d{4,6}[NSns]\d{5,7}[EWew])')
+
+_TYP_RE = _kw('TYP/', r'([A-Z0-9\-\_]+)')
+_BLA_RE = _kw('BLA', r'\b')
+_AER_RE = _kw('AER', r'\b')
+
 # -----------------------
 # helpers
 # -----------------------
@@ -23,14 +75,34 @@ def safe_get_str(d: Dict, key: str):
     v = d.get(key) if isinstance(d, dict) else None
     return safe_str(v)
 
+# Input columns of normalize_row()/normalize_batch() and the export headers
+# accepted for each, in fallback order (the first non-empty value wins).
+COLUMN_ALIASES = {
+    'SHR': ('SHR', 'Shr'),
+    'DEP': ('DEP', 'Dep'),
+    'ARR': ('ARR', 'Arr'),
+    'center': ('center', 'Центр ЕС ОрВД'),
+}
+
+def first_str(values):
+    """First non-empty safe_str() of `values`, else None."""
+    for v in values:
+        v = safe_str(v)
+        if v:
+            return v
+    return None
+
 # 1) parse compact coordinate like 5957N02905E or 440846N0430829E
 def parse_compact_coord(s: Optional[str]) -> Optional[Tuple[float, float]]:
     if not s:
         return None
-    s = re.sub(r'[^0-9NSEWnsew]', '', str(s))
+    return _parse_compact_coord(str(s))
+
+def _parse_compact_coord(s: str) -> Optional[Tuple[float, float]]:
+    s = _COORD_JUNK_RE.sub('', s)
     s = s.upper()
     # try with deg/min (no seconds): 5957N02905E or 5152N08600E
-    m = re.match(r'^(\d{2,4})(\d{2})(N|S)(\d{2,3})(\d{2})(E|W)$', s)
+    m = _COORD_DM_RE.match(s)
     if m:
         lat_part = m.group(1)
         lat_deg = int(lat_part[:-2]) if len(lat_part) > 2 else int(lat_part)
@@ -47,7 +119,7 @@ def parse_compact_coord(s: Optional[str]) -> Optional[Tuple[float, float]]:
             lon = -lon
         return (round(lat, 8), round(lon, 8))
     # try with deg/min/sec: 564630N0620220E (DDMMSSN DDDMMSSE)
-    m2 = re.match(r'^(\d{2})(\d{2})(\d{2})(N|S)(\d{3})(\d{2})(\d{2})(E|W)$', s)
+    m2 = _COORD_DMS_RE.match(s)
     if m2:
         lat = int(m2.group(1)) + int(m2.group(2))/60 + int(m2.group(3))/3600
         lon = int(m2.group(5)) + int(m2.group(6))/60 + int(m2.group(7))/3600
@@ -62,22 +134,24 @@ def parse_compact_coord(s: Optional[str]) -> Optional[Tuple[float, float]]:
 def extract_flight_id_from_text(text: Optional[str]) -> Optional[str]:
     if not text:
         return None
-    txt = text.upper()
+    return _flight_id_upper(text.upper())
+
+def _flight_id_upper(txt: str) -> Optional[str]:
     # REG/xxx or REG xxx, take first comma-separated
-    m = re.search(r'\bREG[/\s]*([A-Z0-9\-\_\,]+)', txt)
+    m = _REG_RE.search(txt)
     if m:
         v = m.group(1).split(',')[0].strip()
-        if v and v not in {'TITLE','IDEP','IARR','ADEP','ARR','DEP'}:
+        if v and v not in _REG_STOP:
             return v
     # SID (some rows contain SID/777...)
-    m2 = re.search(r'\bSID/(\d{4,})\b', txt)
+    m2 = _SID_RE.search(txt)
     if m2:
         return m2.group(1)
     # try common aircraft codes RFxxx or RA-xxx or alnum combos (fallback)
-    m3 = re.search(r'\b([A-Z]{1,3}[-]?[0-9]{2,6}[A-Z0-9]{0,3})\b', txt)
+    m3 = _ALNUM_ID_RE.search(txt)
     if m3:
         token = m3.group(1)
-        if token not in {'TITLE','IDEP','IARR','ADEP','ARR','DEP','M0000','K0300'}:
+        if token not in _ALNUM_ID_STOP:
             return token
     return None
 
@@ -85,44 +159,42 @@ def extract_flight_id_from_text(text: Optional[str]) -> Optional[str]:
 def parse_dof(txt: Optional[str]) -> Optional[str]:
     if not txt:
         return None
-    m = re.search(r'\bDOF[/\s]?(\d{6})\b', txt)
+    m = _DOF_RE.search(txt)
     if m:
         return m.group(1)
     return None
 
+def _hhmm(hhmm: str) -> Optional[str]:
+    # '705' / '0705' -> '07:05', None if out of range
+    if len(hhmm) == 3:
+        hh = int(hhmm[0]); mm = int(hhmm[1:])
+    else:
+        hh = int(hhmm[:2]); mm = int(hhmm[2:])
+    if 0 <= hh < 24 and 0 <= mm < 60:
+        return f"{hh:02d}:{mm:02d}"
+    return None
+
 def parse_time_token(txt: Optional[str]) -> Optional[str]:
     if not txt:
         return None
     # ATD 0705 or -ATD0705 etc.
-    m = re.search(r'\bATD[\s:/-]?(\d{3,4})\b', txt)
+    m = _ATD_RE.search(txt)
     if m:
-        hhmm = m.group(1)
-        if len(hhmm) == 3:
-            hh = int(hhmm[0])
-            mm = int(hhmm[1:])
-        else:
-            hh = int(hhmm[:2]); mm = int(hhmm[2:])
-        if 0 <= hh < 24 and 0 <= mm < 60:
-            return f"{hh:02d}:{mm:02d}"
-    m2 = re.search(r'\bATA[\s:/-]?(\d{3,4})\b', txt)
+        t = _hhmm(m.group(1))
+        if t:
+            return t
+    m2 = _ATA_RE.search(txt)
     if m2:
-        hhmm = m2.group(1)
-        if len(hhmm) == 3:
-            hh = int(hhmm[0]); mm = int(hhmm[1:])
-        else:
-            hh = int(hhmm[:2]); mm = int(hhmm[2:])
-        if 0 <= hh < 24 and 0 <= mm < 60:
-            return f"{hh:02d}:{mm:02d}"
+        t = _hhmm(m2.group(1))
+        if t:
+            return t
     # fallback: some rows include just time like -ZZZZ0705 line; pick 4 digits
-    m3 = re.search(r'\b(\d{4})\b', txt)
+    m3 = _HHMM_RE.search(txt)
     if m3:
-        hhmm = m3.group(1)
-        hh = int(hhmm[:2]); mm = int(hhmm[2:])
-        if 0 <= hh < 24 and 0 <= mm < 60:
-            return f"{hh:02d}:{mm:02d}"
+        return _hhmm(m3.group(1))
     return None
 
-def combine_dof_time_iso(dof6: Optional[str], hhmm: Optional[str]) -> Optional[str]:
+def _combine_dof_time_iso(dof6: Optional[str], hhmm: Optional[str]) -> Optional[str]:
     """
     dof6: DDMMYY
     hhmm: 'HH:MM'
@@ -130,7 +202,7 @@ def combine_dof_time_iso(dof6: Optional[str], hhmm: Optional[str]) -> Optional[s
     """
     if not dof6:
         return None
-    dof6 = re.sub(r'\D','', dof6)
+    dof6 = _NON_DIGIT_RE.sub('', dof6)
     if len(dof6) != 6:
         return None
     dd = int(dof6[0:2]); mm = int(dof6[2:4]); yy = int(dof6[4:6])
@@ -147,164 +219,331 @@ def combine_dof_time_iso(dof6: Optional[str], hhmm: Optional[str]) -> Optional[s
     except Exception:
         return None
 
+# -----------------------
+# memo caches for the pure token parsers
+# -----------------------
+_CACHED = {}
+
+def _cached(name: str, func):
+    if PARSER_CACHE_SIZE <= 0:
+        return func
+    wrapped = lru_cache(maxsize=PARSER_CACHE_SIZE)(func)
+    _CACHED[name] = wrapped
+    return wrapped
+
+_parse_compact_coord = _cached('parse_compact_coord', _parse_compact_coord)
+combine_dof_time_iso = _cached('combine_dof_time_iso', _combine_dof_time_iso)
+combine_dof_time_iso.__doc__ = _combine_dof_time_iso.__doc__
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counters of the parser caches (per process)."""
+    out = {}
+    for name, func in _CACHED.items():
+        info = func.cache_info()
+        calls = info.hits + info.misses
+        out[name] = {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'maxsize': info.maxsize,
+            'hit_rate': round(info.hits / calls, 4) if calls else None,
+        }
+    return out
+
+def cache_clear():
+    for func in _CACHED.values():
+        func.cache_clear()
+
 # 4) fingerprint
 def make_fingerprint(flight_id: Optional[str], start_time: Optional[str],
-                     start_lat, start_lon) -> str:
-    a = (flight_id or "") + "|" + (start_time or "") + "|" + (str(start_lat) if start_lat is not None else "") + "|" + (str(start_lon) if start_lon is not None else "")
-    return hashlib.sha256(a.encode('utf-8')).hexdigest()
+                     start_lat, start_lon, compact: bool = None) -> str:
+    """
+    SHA-256 of 'flight_id|start_time|lat|lon' as 64 hex chars, or with compact
+    (default: FINGERPRINT_MODE=compact) its first 16 bytes as 32 hex chars —
+    the uuid flights.fingerprint holds after data/fingerprint_compact.sql.
+    """
+    key = f"{flight_id or ''}|{start_time or ''}|{'' if start_lat is None else start_lat}|{'' if start_lon is None else start_lon}"
+    digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+    return digest[:32] if (FINGERPRINT_COMPACT if compact is None else compact) else digest
+
+def fingerprint_key(fp: Optional[str]) -> Optional[str]:
+    """Compact (32 hex) key of a full, compact or uuid-formatted fingerprint, as SQL flight_fingerprint() derives it."""
+    if not fp:
+        return None
+    return fp.replace('-', '')[:32].lower()
+
+# 5) coordinates: ADEPZ / ADARRZ or compact coords inside SHR or DEP lines
+def find_coord_in_text(txt: Optional[str]) -> Optional[Tuple[float, float]]:
+    """Search ADEPZ/ADARRZ and DEP/ARR with pattern like DEP/5957N02905E or ADEPZ 5957N02905E."""
+    if not txt:
+        return None
+    # ADEPZ or ADARRZ
+    m = _ADEPZ_RE.search(txt)
+    if m:
+        r = parse_compact_coord(m.group(1).strip())
+        if r:
+            return r
+    m2 = _ADARRZ_RE.search(txt)
+    if m2:
+        r = parse_compact_coord(m2.group(1).strip())
+        if r:
+            return r
+    # DEP/xxxxx or ADARR/xxxxx
+    m3 = _DEP_COORD_RE.search(txt)
+    # fallback: find first compact-looking token in text
+    if not m3:
+        m3 = _COMPACT_TOKEN_RE.search(txt)
+    if m3:
+        r = parse_compact_coord(m3.group(1))
+        if r:
+            return r
+    # fallback: inside RMK lines there might be plain coordinates like 593600N0291600E - try find any
+    for cand in _COORD_PAIR_RE.findall(txt):
+        r = parse_compact_coord(cand)
+        if r:
+            return r
+    return None
+
+# 6) uav type: TYP/ or words like BLA / AER
+def detect_uav_type(txt: Optional[str]) -> Optional[str]:
+    if not txt:
+        return None
+    return _uav_type_upper(txt.upper())
+
+def _uav_type_upper(up: str) -> Optional[str]:
+    m = _TYP_RE.search(up)
+    if m:
+        return m.group(1)
+    if _BLA_RE.search(up):
+        return 'BLA'
+    if _AER_RE.search(up):
+        return 'AER'
+    return None
 
 # -----------------------
-# main normalizer
+# block tokenizer
 # -----------------------
-def normalize_row(row: Dict[str, Any]) -> Dict[str, Any]:
+class BlockTokens:
     """
-    Input: row dict with keys like 'SHR','DEP','ARR','center' (from Excel).
-    Output: normalized dict with:
-      flight_id, uav_type, start_time (ISO), end_time, duration_seconds,
-      start_lat, start_lon, end_lat, end_lon, raw_payload (dict), fingerprint
+    Fields of one SHR/DEP/ARR block: flight_id, coord (lat, lon), dof (DDMMYY),
+    time_token ('HH:MM') and uav_type, with the same values as the helpers above.
+    The block is upper-cased once and each field is parsed on first access and
+    kept, so normalize_row() reads a field at most once and never parses the
+    ones it does not fall back to (e.g. SHR times when DEP has ATD).
     """
-    # prepare raw_payload: keep strings or None
-    raw = {
-        'SHR': safe_get_str(row, 'SHR') or safe_get_str(row, 'Shr') or None,
-        'DEP': safe_get_str(row, 'DEP') or safe_get_str(row, 'Dep') or None,
-        'ARR': safe_get_str(row, 'ARR') or safe_get_str(row, 'Arr') or None,
-        'center': safe_get_str(row, 'center') or safe_get_str(row, 'Центр ЕС ОрВД') or None
-    }
+    FIELDS = ('flight_id', 'coord', 'dof', 'time_token', 'uav_type')
 
-    # 1) flight_id
-    flight_id = None
-    for src in (raw.get('DEP'), raw.get('SHR'), raw.get('ARR')):
-        fid = extract_flight_id_from_text(src)
-        if fid:
-            flight_id = fid
-            break
+    def __init__(self, text: Optional[str]):
+        self.text = text or ''
+        self.upper = self.text.upper()
 
-    # 2) coordinates: ADEPZ / ADARRZ or compact coords inside SHR or DEP lines
-    start_lat = start_lon = end_lat = end_lon = None
+    @cached_property
+    def flight_id(self) -> Optional[str]:
+        return _flight_id_upper(self.upper) if self.text else None
+
+    @cached_property
+    def coord(self) -> Optional[Tuple[float, float]]:
+        return find_coord_in_text(self.text)
+
+    @cached_property
+    def dof(self) -> Optional[str]:
+        return parse_dof(self.text)
+
+    @cached_property
+    def time_token(self) -> Optional[str]:
+        return parse_time_token(self.text)
+
+    @cached_property
+    def uav_type(self) -> Optional[str]:
+        return _uav_type_upper(self.upper) if self.text else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+# -----------------------
+# main normalizer
+# -----------------------
+NORMALIZED_FIELDS = (
+    'flight_id', 'uav_type', 'start_time', 'end_time', 'duration_seconds',
+    'start_lat', 'start_lon', 'end_lat', 'end_lon', 'time_token', 'raw_payload', 'fingerprint',
+)
 
-    # search in DEP block for ADEPZ / compact coordinates
-    deptxt = raw.get('DEP') or ''
-    arrtxt = raw.get('ARR') or ''
-    shrtxt = raw.get('SHR') or ''
-
-    # helper to search ADEPZ/ADARRZ and DEP/ARR with pattern like DEP/5957N02905E or ADEPZ 5957N02905E
-    def find_coord_in_text(txt):
-        if not txt:
-            return None
-        # ADEPZ or ADARRZ
-        m = re.search(r'\bADEPZ[\s/:]*([0-9NSEWnsew\ \-]+)', txt)
-        if m:
-            c = m.group(1).strip()
-            r = parse_compact_coord(c)
-            if r:
-                return r
-        m2 = re.search(r'\bADARRZ[\s/:]*([0-9NSEWnsew\ \-]+)', txt)
-        if m2:
-            r = parse_compact_coord(m2.group(1).strip())
-            if r:
-                return r
-        # DEP/xxxxx or ADARR/xxxxx
-        m3 = re.search(r'(?:DEP|ADARR|ADEP|ADARRZ|DEP/)\s*[/:]*\s*([0-9]{4,15}[NSEWnsew0-9]*)', txt)
-        # fallback: find first compact-looking token in text
-        if not m3:
-            tokens = re.findall(r'([0-9]{4,15}[NSEWnsew])', txt)
-            if tokens:
-                m3 = (None, tokens[0])  # trick to return value below
-        if m3:
-            token = m3.group(1) if hasattr(m3, 'group') else m3[1]
-            r = parse_compact_coord(token)
-            if r:
-                return r
-        # fallback: inside RMK lines there might be plain coordinates like 593600N0291600E - try find any
-        found = re.findall(r'(\d{4,6}[NSns]\d{5,7}[EWew])', txt)
-        for cand in found:
-            r = parse_compact_coord(cand)
-            if r:
-                return r
+def _duration_seconds(start_time: Optional[str], end_time: Optional[str]) -> Optional[int]:
+    """Whole seconds from start_time to end_time (ISO), None if either is missing or end is earlier."""
+    if not (start_time and end_time):
         return None
+    try:
+        dt1 = datetime.fromisoformat(start_time.replace('Z','+00:00'))
+        dt2 = datetime.fromisoformat(end_time.replace('Z','+00:00'))
+        delta = (dt2 - dt1).total_seconds()
+        return int(delta) if delta >= 0 else None
+    except Exception:
+        return None
+
+def _normalize_blocks(shrtxt: str, deptxt: str, arrtxt: str, raw_payload: Dict[str, Any]) -> tuple:
+    """Parse the three text blocks; values in NORMALIZED_FIELDS order."""
+    dep = BlockTokens(deptxt)
+    arr = BlockTokens(arrtxt)
+    shr = BlockTokens(shrtxt)
 
-    dep_coord = find_coord_in_text(deptxt)
-    arr_coord = find_coord_in_text(arrtxt)
-    shr_coord = find_coord_in_text(shrtxt)
+    # 1) flight_id
+    flight_id = dep.flight_id or shr.flight_id or arr.flight_id
+
+    # 2) coordinates: ADEPZ / ADARRZ or compact coords inside SHR or DEP lines
+    start_lat = start_lon = end_lat = end_lon = None
 
-    if dep_coord:
-        start_lat, start_lon = dep_coord
-    elif shr_coord:
-        start_lat, start_lon = shr_coord
+    if dep.coord:
+        start_lat, start_lon = dep.coord
+    elif shr.coord:
+        start_lat, start_lon = shr.coord
 
-    if arr_coord:
-        end_lat, end_lon = arr_coord
-    elif shr_coord:
+    if arr.coord:
+        end_lat, end_lon = arr.coord
+    elif shr.coord:
         # if only SHR polygon or center included, use it for both start/end if needed
-        end_lat, end_lon = shr_coord
+        end_lat, end_lon = shr.coord
 
     # 3) times
-    dof = parse_dof(shrtxt) or parse_dof(deptxt) or parse_dof(arrtxt)
-    atd = parse_time_token(deptxt) or parse_time_token(shrtxt)
-    ata = parse_time_token(arrtxt) or None
+    dof = shr.dof or dep.dof or arr.dof
+    atd = dep.time_token or shr.time_token
+    ata = arr.time_token or None
 
     start_time = combine_dof_time_iso(dof, atd)
     end_time = combine_dof_time_iso(dof, ata)
 
-    # 4) uav_type: try detect TYP/ or words like BLA / AER / SHAR
-    uav_type = None
-    for block in (shrtxt, deptxt, arrtxt):
-        if not block:
-            continue
-        m = re.search(r'\bTYP/([A-Z0-9\-\_]+)', block.upper())
-        if m:
-            uav_type = m.group(1)
-            break
-        if re.search(r'\bBLA\b', block.upper()):
-            uav_type = 'BLA'
-            break
-        if re.search(r'\bAER\b', block.upper()):
-            uav_type = 'AER'
-            break
+    # 4) uav_type: TYP/ or words like BLA / AER, first block that has one
+    uav_type = shr.uav_type or dep.uav_type or arr.uav_type
 
     # 5) duration_seconds - if both times present
-    duration_seconds = None
-    if start_time and end_time:
-        try:
-            dt1 = datetime.fromisoformat(start_time.replace('Z','+00:00'))
-            dt2 = datetime.fromisoformat(end_time.replace('Z','+00:00'))
-            delta = (dt2 - dt1).total_seconds()
-            duration_seconds = int(delta) if delta >= 0 else None
-        except Exception:
-            duration_seconds = None
-
-    # 6) raw_payload keep original strings and parsed snippets
-    raw_payload = {
-        'SHR': safe_get_str(row, 'SHR'),
-        'DEP': safe_get_str(row, 'DEP'),
-        'ARR': safe_get_str(row, 'ARR'),
-        'center': safe_get_str(row, 'center')
-    }
+    duration_seconds = _duration_seconds(start_time, end_time)
 
-    # 7) fingerprint
+    # 6) fingerprint
     fingerprint = make_fingerprint(flight_id, start_time, start_lat, start_lon)
 
-    out = {
+    # ensure no NaN floats (convert to None)
+    start_lat, start_lon, end_lat, end_lon = (None if _is_nan(v) else v for v in (start_lat, start_lon, end_lat, end_lon))
+
+    return (flight_id, uav_type, start_time, end_time, duration_seconds,
+            start_lat, start_lon, end_lat, end_lon, atd, raw_payload, fingerprint)
+
+def normalize_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Input: row dict with keys like 'SHR','DEP','ARR','center' (from Excel).
+    Output: normalized dict with:
+      flight_id, uav_type, start_time (ISO), end_time, duration_seconds,
+      start_lat, start_lon, end_lat, end_lon, raw_payload (dict), fingerprint
+    """
+    # prepare raw_payload: keep strings or None
+    raw = {key: first_str(row.get(a) for a in aliases) if isinstance(row, dict) else None
+           for key, aliases in COLUMN_ALIASES.items()}
+
+    # raw_payload keeps the original strings that were parsed, under the canonical
+    # keys whichever export header they came from (Shr/Dep/Arr/...), so the row can
+    # be re-parsed from it (data/reparse_and_fill.py, app.sources for NDJSON/Parquet)
+    values = _normalize_blocks(raw.get('SHR') or '', raw.get('DEP') or '', raw.get('ARR') or '', raw)
+    return dict(zip(NORMALIZED_FIELDS, values))
+
+def _text_column(cells) -> list:
+    """first_str() of every cell, i.e. safe_str() with '' as None (non-empty str cells are passed as they are)."""
+    return [v if type(v) is str and v else safe_str(v) or None for v in cells]
+
+def _column(func, texts) -> list:
+    """func(text) for every non-empty cell of a column, None for the empty ones."""
+    return [func(t) if t else None for t in texts]
+
+def _column_or(values, func, texts) -> list:
+    """Column-wise `value or func(text)`: func only runs on the cells whose value is still empty."""
+    return [v or (func(t) if t else None) for v, t in zip(values, texts)]
+
+def normalize_batch(shr, dep, arr, center=None) -> Dict[str, list]:
+    """
+    Columnar normalize_row() for whole columns (lists, numpy arrays or pandas
+    Series of SHR/DEP/ARR/center cells; None for a missing column).
+    Returns {field: [value per row]} for NORMALIZED_FIELDS; row i equals
+    normalize_row({'SHR': shr[i], 'DEP': dep[i], 'ARR': arr[i], 'center': center[i]}).
+
+    Fields are extracted a column at a time with the precompiled patterns
+    (e.g. every DEP flight id, then SHR ids for the rows still without one),
+    so a fallback block is only parsed where _normalize_blocks() would parse
+    it, and no per-row BlockTokens / dict is built. Columns under other export
+    headers (Shr/Dep/Arr, ...) are picked by batch_columns(); app.sources
+    applies the same fallbacks to file headers.
+    """
+    columns = [c for c in (shr, dep, arr, center) if c is not None]
+    n = len(columns[0]) if columns else 0
+    if any(len(c) != n for c in columns):
+        raise ValueError("normalize_batch: columns differ in length")
+    missing = [None] * n
+    s, d, a, c = (missing if col is None else _text_column(col.tolist() if hasattr(col, 'tolist') else col)
+                  for col in (shr, dep, arr, center))
+    s_up, d_up, a_up = (_column(str.upper, col) for col in (s, d, a))
+
+    # same fallback order as _normalize_blocks()
+    flight_id = _column_or(_column_or(_column(_flight_id_upper, d_up), _flight_id_upper, s_up),
+                           _flight_id_upper, a_up)
+
+    dep_coord = _column(find_coord_in_text, d)
+    arr_coord = _column(find_coord_in_text, a)
+    # the SHR coordinate is only a fallback, for start or end
+    shr_coord = [find_coord_in_text(t) if t and not (dc and ac) else None
+                 for t, dc, ac in zip(s, dep_coord, arr_coord)]
+    start = [dc or sc for dc, sc in zip(dep_coord, shr_coord)]
+    end = [ac or sc for ac, sc in zip(arr_coord, shr_coord)]
+
+    dof = _column_or(_column_or(_column(parse_dof, s), parse_dof, d), parse_dof, a)
+    atd = _column_or(_column(parse_time_token, d), parse_time_token, s)
+    ata = _column(parse_time_token, a)
+    start_time = [combine_dof_time_iso(x, t) for x, t in zip(dof, atd)]
+    end_time = [combine_dof_time_iso(x, t) for x, t in zip(dof, ata)]
+
+    uav_type = _column_or(_column_or(_column(_uav_type_upper, s_up), _uav_type_upper, d_up),
+                          _uav_type_upper, a_up)
+
+    # x == x is False only for NaN: the same guard as in _normalize_blocks()
+    start_lat = [p[0] if p and p[0] == p[0] else None for p in start]
+    start_lon = [p[1] if p and p[1] == p[1] else None for p in start]
+    end_lat = [p[0] if p and p[0] == p[0] else None for p in end]
+    end_lon = [p[1] if p and p[1] == p[1] else None for p in end]
+
+    return {
         'flight_id': flight_id,
         'uav_type': uav_type,
         'start_time': start_time,
         'end_time': end_time,
-        'duration_seconds': duration_seconds,
+        'duration_seconds': [_duration_seconds(x, y) for x, y in zip(start_time, end_time)],
         'start_lat': start_lat,
         'start_lon': start_lon,
         'end_lat': end_lat,
         'end_lon': end_lon,
         'time_token': atd,
-        'raw_payload': raw_payload,
-        'fingerprint': fingerprint
+        'raw_payload': [{'SHR': v[0], 'DEP': v[1], 'ARR': v[2], 'center': v[3]} for v in zip(s, d, a, c)],
+        # from the coordinates before the NaN guard, as _normalize_blocks() does
+        'fingerprint': [make_fingerprint(f, t, *(p or (None, None))) for f, t, p in zip(flight_id, start_time, start)],
     }
 
-    # ensure no NaN floats (convert to None)
-    for k,v in list(out.items()):
-        if isinstance(v, float) and math.isnan(v):
-            out[k] = None
+def batch_columns(table) -> tuple:
+    """
+    (shr, dep, arr, center) arguments of normalize_batch() from a mapping of
+    columns (dict of lists, pandas DataFrame), with the header fallbacks of
+    COLUMN_ALIASES: a single matching column is passed through, several are
+    merged per row like normalize_row() does. Missing columns come back as None.
+    The merged value is what raw_payload then stores under the canonical key.
+    """
+    out = []
+    for aliases in COLUMN_ALIASES.values():
+        present = [table[a] for a in aliases if a in table]
+        if not present:
+            out.append(None)
+        elif len(present) == 1:
+            out.append(present[0])
+        else:
+            out.append([first_str(cells) for cells in zip(*present)])
+    return tuple(out)
 
-    return out
+def batch_rows(batch: Dict[str, list]):
+    """Iterate a normalize_batch() result as normalize_row()-style dicts."""
+    for values in zip(*(batch[f] for f in NORMALIZED_FIELDS)):
+        yield dict(zip(NORMALIZED_FIELDS, values))
 
 # quick test-run if invoked directly
 if __name__ == "__main__":
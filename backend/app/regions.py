@@ -0,0 +1,151 @@
+# backend/app/regions.py
+"""
+In-process region assignment: region polygons are loaded once into a shapely
+STRtree and whole batches of start/end points are resolved with one vectorized
+query each (GEOS prepares the candidate polygons), so region ids are written
+together with the row instead of by ST_Intersects passes after the import.
+
+The index is built from public.regions_subdivided (RegionIndex.from_db) or
+from a GeoJSON export of it, for parser processes that have no DB access:
+
+    python -m app.regions --export ../data/regions.geojson
+    python full_runner.py ../data/2025.xlsx --regions ../data/regions.geojson
+
+Ids are regions.gid; re-export (and re-parse) after the regions table is
+reloaded. Needs shapely >= 2 (optional: only this module imports it).
+"""
+import sys
+import json
+import argparse
+
+# pieces of regions_subdivided (data/migrations/008): small polygons keep the tree selective
+REGIONS_SQL = "SELECT gid, ST_AsBinary(geom) FROM public.regions_subdivided ORDER BY gid, id"
+EXPORT_SQL = """
+    SELECT s.gid, r.name, ST_AsGeoJSON(s.geom)
+    FROM public.regions_subdivided s JOIN public.regions r ON r.gid = s.gid
+    ORDER BY s.gid, s.id
+"""
+
+# /api/v1/regions: the coarsest regions_simplified level (data/migrations/010) not coarser than asked
+SIMPLIFIED_SQL = """
+    SELECT feature FROM public.regions_simplified
+    WHERE tolerance = (SELECT COALESCE(max(tolerance), 0) FROM public.regions_simplified WHERE tolerance <= %s)
+    ORDER BY name LIMIT %s
+"""
+TILE_SIZE = 256
+
+
+def request_tolerance(zoom=None, tolerance=None) -> float:
+    """
+    Simplification tolerance (degrees) for a map request: an explicit tolerance
+    wins, a zoom level maps to the width of one pixel of a 256px web-map tile,
+    neither means full resolution.
+    """
+    if tolerance is not None:
+        return float(tolerance)
+    if zoom is not None:
+        return 360.0 / (TILE_SIZE * 2 ** zoom)
+    return 0.0
+
+
+def _shapely():
+    try:
+        import shapely
+    except ImportError:
+        raise RuntimeError("region assignment needs shapely (pip install shapely)")
+    return shapely
+
+
+class RegionIndex:
+    """STRtree over region polygons; lookup() maps point columns to region ids."""
+
+    def __init__(self, regions):
+        """
+        regions: iterable of (gid, shapely geometry), several pieces per gid allowed;
+        on overlap the smallest gid wins.
+        """
+        shapely = _shapely()
+        pairs = sorted((int(gid), geom) for gid, geom in regions if geom is not None)
+        self.ids = [gid for gid, _ in pairs]
+        self.geoms = [geom for _, geom in pairs]
+        self.tree = shapely.STRtree(self.geoms)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_db(cls, conn, sql: str = REGIONS_SQL) -> "RegionIndex":
+        shapely = _shapely()
+        cur = conn.cursor()
+        try:
+            cur.execute(sql)
+            return cls((gid, shapely.from_wkb(bytes(wkb))) for gid, wkb in cur.fetchall())
+        finally:
+            cur.close()
+
+    @classmethod
+    def from_geojson(cls, path: str, id_field: str = "gid") -> "RegionIndex":
+        _shapely()
+        from shapely.geometry import shape
+        with open(path, "r", encoding="utf-8") as fh:
+            features = json.load(fh)["features"]
+        return cls((f["properties"][id_field], shape(f["geometry"])) for f in features)
+
+    def lookup(self, lons, lats) -> list:
+        """Region id (or None) per point; points with a missing coordinate get None."""
+        shapely = _shapely()
+        out = [None] * len(lons)
+        idx = [i for i, (x, y) in enumerate(zip(lons, lats)) if x is not None and y is not None]
+        if not idx or not self.ids:
+            return out
+        points = shapely.points([lons[i] for i in idx], [lats[i] for i in idx])
+        # pairs (point, polygon) sorted by point; polygons are in gid order, so the
+        # first pair of a point carries its smallest matching gid
+        hits = self.tree.query(points, predicate="intersects")
+        for p, g in sorted(zip(hits[0].tolist(), hits[1].tolist())):
+            i = idx[p]
+            if out[i] is None:
+                out[i] = self.ids[g]
+        return out
+
+    def assign_batch(self, batch: dict) -> dict:
+        """Add start_region_id / end_region_id columns to a parser.normalize_batch() result."""
+        batch["start_region_id"] = self.lookup(batch["start_lon"], batch["start_lat"])
+        batch["end_region_id"] = self.lookup(batch["end_lon"], batch["end_lat"])
+        return batch
+
+
+def export_geojson(conn, path: str) -> int:
+    """Write the region pieces as a GeoJSON FeatureCollection (gid, name) for RegionIndex.from_geojson."""
+    cur = conn.cursor()
+    try:
+        cur.execute(EXPORT_SQL)
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write('{"type": "FeatureCollection", "features": [\n')
+        for i, (gid, name, geometry) in enumerate(rows):
+            props = json.dumps({"gid": gid, "name": name}, ensure_ascii=False)
+            fh.write((",\n" if i else "") + f'{{"type": "Feature", "properties": {props}, "geometry": {geometry}}}')
+        fh.write("\n]}\n")
+    return len(rows)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Export public.regions for in-process region assignment")
+    ap.add_argument("--export", required=True, help="output GeoJSON path")
+    args = ap.parse_args(argv)
+
+    from app import db
+    db.init_pool()
+    try:
+        with db.connection() as conn:
+            n = export_geojson(conn, args.export)
+    finally:
+        db.close_pool()
+    print(f"exported {n} regions to {args.export}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# backend/app/sources.py
+"""
+Streaming row sources for the parser runners: the export is read row by row
+and handed out in fixed-size column batches, so memory stays flat no matter
+how many rows the yearly dump has (pd.read_excel materialises the whole sheet).
+
+Every batch is (rows, (SHR, DEP, ARR, center)) with one list per column (None
+for a column the file does not have) — the arguments of parser.normalize_batch.
+Headers are matched with parser.COLUMN_ALIASES (Shr/Dep/Arr, ...), like
+normalize_row() does for row dicts.
+
+Supported: .xlsx/.xlsm (openpyxl, read-only mode), .csv, .ndjson/.jsonl
+(one JSON object per line; parsed rows are re-read from their raw_payload),
+.parquet (parser output, app/columnar.py; re-read from raw_payload as well).
+"""
+import os
+import csv
+import json
+from typing import Iterator, Optional, Tuple
+
+from app.parser import COLUMN_ALIASES, first_str
+
+COLUMNS = tuple(COLUMN_ALIASES)
+BATCH_SIZE = 10000
+
+
+def _cell(row, i):
+    return row[i] if i < len(row) else None
+
+
+def _batches(header, rows, batch_size: int) -> Iterator[Tuple[int, tuple]]:
+    """
+    Group row tuples (in `header` order) into COLUMNS-wise lists. Each column
+    is read from the headers of its COLUMN_ALIASES that the file has; with
+    several of them, the first non-empty cell of the row wins.
+    """
+    index = {}
+    for i, name in enumerate(header):
+        if name is not None:
+            index.setdefault(name, i)
+    wanted = [[index[a] for a in aliases if a in index] or None for aliases in COLUMN_ALIASES.values()]
+    cols = [[] if i is not None else None for i in wanted]
+    n = 0
+    for row in rows:
+        for col, idx in zip(cols, wanted):
+            if col is None:
+                continue
+            if len(idx) == 1:
+                col.append(_cell(row, idx[0]))
+            else:
+                col.append(first_str(_cell(row, i) for i in idx))
+        n += 1
+        if n == batch_size:
+            yield n, tuple(cols)
+            cols = [[] if i is not None else None for i in wanted]
+            n = 0
+    if n:
+        yield n, tuple(cols)
+
+
+def iter_xlsx_batches(path: str, batch_size: int = BATCH_SIZE, sheet: Optional[str] = None):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RuntimeError("reading .xlsx needs openpyxl (pip install openpyxl)")
+    # read_only streams the sheet XML instead of building every cell object
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if sheet else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = [str(h).strip() if h is not None else None for h in header]
+        yield from _batches(header, rows, batch_size)
+    finally:
+        wb.close()
+
+
+def iter_csv_batches(path: str, batch_size: int = BATCH_SIZE, delimiter: str = ",", encoding: str = "utf-8-sig"):
+    with open(path, "r", encoding=encoding, newline="") as fh:
+        reader = csv.reader(fh, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            return
+        header = [h.strip() for h in header]
+        # empty CSV fields are missing cells, as with read_excel / openpyxl
+        rows = ([v if v != "" else None for v in row] for row in reader)
+        yield from _batches(header, rows, batch_size)
+
+
+def iter_ndjson_batches(path: str, batch_size: int = BATCH_SIZE):
+    def rows():
+        with open(path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                obj = json.loads(line)
+                src = obj.get("raw_payload") or obj
+                yield tuple(src.get(c) for c in COLUMNS)
+    yield from _batches(COLUMNS, rows(), batch_size)
+
+
+def iter_parquet_batches(path: str, batch_size: int = BATCH_SIZE):
+    from app import columnar
+
+    def rows():
+        for _, cols in columnar.iter_columns(path, ["raw_payload"], batch_size=batch_size):
+            for raw in cols["raw_payload"]:
+                src = json.loads(raw) if raw else {}
+                yield tuple(src.get(c) for c in COLUMNS)
+    yield from _batches(COLUMNS, rows(), batch_size)
+
+
+READERS = {
+    ".xlsx": iter_xlsx_batches,
+    ".xlsm": iter_xlsx_batches,
+    ".csv": iter_csv_batches,
+    ".ndjson": iter_ndjson_batches,
+    ".jsonl": iter_ndjson_batches,
+    ".parquet": iter_parquet_batches,
+}
+
+
+def iter_batches(path: str, batch_size: int = BATCH_SIZE, **kwargs):
+    """Pick the reader by file extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise ValueError(f"unsupported source format: {ext or path} (expected {', '.join(sorted(READERS))})")
+    return READERS[ext](path, batch_size, **kwargs)
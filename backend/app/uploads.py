@@ -0,0 +1,288 @@
+# backend/app/uploads.py
+"""
+Upload helpers: stream request bodies to disk in fixed-size chunks, hashing
+on the fly, so memory use does not depend on the size of the NDJSON export.
+"""
+import os
+import re
+import json
+import uuid
+import asyncio
+import hashlib
+import tempfile
+import datetime
+from contextlib import asynccontextmanager, contextmanager
+
+try:
+    import fcntl
+except ImportError:     # Windows: uploads are only serialized within one process
+    fcntl = None
+
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "/data/uploads")
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(20 * 1024 ** 3)))  # 20 GiB
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))    # 1 MiB
+HASH_SUFFIX = ".sha256"
+
+
+class UploadError(Exception):
+    """Invalid request against a resumable upload (bad size/hash, wrong state)."""
+
+
+class UploadNotFound(UploadError):
+    pass
+
+
+class UploadOffsetMismatch(UploadError):
+    def __init__(self, expected: int, got: int):
+        super().__init__(f"offset {got} does not match received size {expected}")
+        self.expected = expected
+        self.got = got
+
+
+class UploadTooLarge(UploadError):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"upload exceeds limit of {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+async def stream_to_file(read, dest_path: str, max_bytes: int = UPLOAD_MAX_BYTES,
+                         chunk_size: int = UPLOAD_CHUNK_SIZE) -> dict:
+    """
+    Copy an async byte source (`await read(n)` -> bytes, b"" at EOF; e.g.
+    UploadFile.read) to dest_path. Data goes to a uniquely named temporary file
+    in the same directory that is renamed into place only when complete, so a
+    failed or oversized upload never leaves a truncated file behind and
+    concurrent uploads to the same dest_path never share a temp file (the last
+    one to finish wins). The SHA-256 is written next to it (dest_path + ".sha256").
+    """
+    dest_dir = os.path.dirname(dest_path) or "."
+    os.makedirs(dest_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=dest_dir, prefix=os.path.basename(dest_path) + ".", suffix=".tmp")
+    os.chmod(tmp_path, 0o644)     # mkstemp creates 0600; the worker may read it as another user
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            while True:
+                chunk = await read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                # up to 20 GiB in 1 MiB writes: keep the disk off the event loop
+                await asyncio.to_thread(fh.write, chunk)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    sha256 = digest.hexdigest()
+    write_hash(dest_path, sha256)
+    return {"path": dest_path, "size": size, "sha256": sha256}
+
+
+def file_sha256(path: str, chunk_size: int = UPLOAD_CHUNK_SIZE) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_hash(path: str, sha256: str):
+    with open(path + HASH_SUFFIX, "w", encoding="utf-8") as fh:
+        fh.write(sha256 + "\n")
+
+
+def read_hash(path: str):
+    """
+    Hash recorded at upload time, or None if the file was not uploaded through
+    the API or was modified after its hash was written.
+    """
+    try:
+        if os.path.getmtime(path + HASH_SUFFIX) < os.path.getmtime(path):
+            return None
+        with open(path + HASH_SUFFIX, "r", encoding="utf-8") as fh:
+            return fh.read().strip() or None
+    except OSError:
+        return None
+
+
+# -----------------------
+# Resumable (chunked) uploads
+# -----------------------
+# Protocol:
+#   init      -> upload_id; parts are appended to <UPLOAD_DIR>/<id>.part
+#   part      -> body appended at `offset`, which must equal the bytes received so far;
+#                after a dropped connection the client asks for status and resumes there
+#   finalize  -> size/hash verified, file renamed to <UPLOAD_DIR>/<id>.ndjson
+# Metadata lives in <id>.json next to the data, so any API worker can serve any step:
+# part and finalize hold an flock on <id>.lock, which serializes them across
+# processes (two PUTs at one offset, a finalize racing an append).
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_LOCK_POLL = 0.05
+_locks = {}
+
+
+def _paths(upload_id: str, upload_dir: str):
+    if not _ID_RE.match(upload_id or ""):
+        raise UploadNotFound(f"unknown upload id: {upload_id}")
+    base = os.path.join(upload_dir, upload_id)
+    return base + ".json", base + ".part", base + ".ndjson"
+
+
+def _lock_path(upload_id: str, upload_dir: str) -> str:
+    return os.path.splitext(_paths(upload_id, upload_dir)[0])[0] + ".lock"
+
+
+@contextmanager
+def _upload_lock(upload_id: str, upload_dir: str):
+    """Exclusive inter-process lock of one upload (blocking; for sync callers)."""
+    if fcntl is None:
+        yield
+        return
+    fd = os.open(_lock_path(upload_id, upload_dir), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)    # releases the flock
+
+
+@asynccontextmanager
+async def _upload_lock_async(upload_id: str, upload_dir: str):
+    """_upload_lock() for the event loop: polls LOCK_NB instead of blocking a thread."""
+    # [asyncio.Lock, holders + waiters]; dropped by the last user so abandoned uploads do not leak
+    entry = _locks.setdefault(upload_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            if fcntl is None:
+                yield
+                return
+            fd = os.open(_lock_path(upload_id, upload_dir), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                while True:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        await asyncio.sleep(_LOCK_POLL)
+                yield
+            finally:
+                os.close(fd)
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and _locks.get(upload_id) is entry:
+            del _locks[upload_id]
+
+
+def _load_meta(upload_id: str, upload_dir: str) -> dict:
+    meta_path, part_path, final_path = _paths(upload_id, upload_dir)
+    try:
+        with open(meta_path, "r", encoding="utf-8") as fh:
+            meta = json.load(fh)
+    except OSError:
+        raise UploadNotFound(f"unknown upload id: {upload_id}")
+    data_path = final_path if meta["status"] == "complete" else part_path
+    meta["received"] = os.path.getsize(data_path) if os.path.exists(data_path) else 0
+    return meta
+
+
+def _save_meta(meta: dict, upload_dir: str):
+    meta_path = _paths(meta["upload_id"], upload_dir)[0]
+    stored = {k: v for k, v in meta.items() if k != "received"}
+    tmp = meta_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(stored, fh, ensure_ascii=False)
+    os.replace(tmp, meta_path)
+
+
+def init_upload(filename: str = None, size: int = None, upload_dir: str = UPLOAD_DIR,
+                max_bytes: int = UPLOAD_MAX_BYTES) -> dict:
+    if size is not None and (not isinstance(size, int) or isinstance(size, bool) or size < 0):
+        raise UploadError(f"size must be a non-negative integer, got {size!r}")
+    if size is not None and size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+    os.makedirs(upload_dir, exist_ok=True)
+    upload_id = uuid.uuid4().hex
+    meta = {
+        "upload_id": upload_id,
+        "filename": os.path.basename(filename) if filename else None,
+        "size": size,
+        "status": "open",
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "path": None,
+        "sha256": None,
+    }
+    open(_paths(upload_id, upload_dir)[1], "wb").close()
+    _save_meta(meta, upload_dir)
+    meta["received"] = 0
+    return meta
+
+
+def upload_status(upload_id: str, upload_dir: str = UPLOAD_DIR) -> dict:
+    return _load_meta(upload_id, upload_dir)
+
+
+async def append_part(upload_id: str, offset: int, chunks, upload_dir: str = UPLOAD_DIR,
+                      max_bytes: int = UPLOAD_MAX_BYTES) -> dict:
+    """
+    Append an async iterable of byte chunks (e.g. Request.stream()) at `offset`.
+    Whatever arrived before a disconnect stays on disk, so the client can resume
+    from the `received` value reported by upload_status().
+    """
+    _load_meta(upload_id, upload_dir)     # 404 before creating a lock file
+    async with _upload_lock_async(upload_id, upload_dir):
+        meta = _load_meta(upload_id, upload_dir)
+        if meta["status"] != "open":
+            raise UploadError(f"upload {upload_id} is already {meta['status']}")
+        if offset != meta["received"]:
+            raise UploadOffsetMismatch(meta["received"], offset)
+        limit = meta["size"] if meta["size"] is not None else max_bytes
+        received = meta["received"]
+        with open(_paths(upload_id, upload_dir)[1], "ab") as fh:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                if received + len(chunk) > limit:
+                    # bytes written before this chunk are kept; status reports them
+                    raise UploadTooLarge(limit)
+                # MiB-sized parts: keep the disk write off the event loop
+                await asyncio.to_thread(fh.write, chunk)
+                received += len(chunk)
+        meta["received"] = received
+        return meta
+
+
+def finalize_upload(upload_id: str, sha256: str = None, upload_dir: str = UPLOAD_DIR) -> dict:
+    """Verify and publish the assembled file. Blocks while a part is being appended."""
+    _load_meta(upload_id, upload_dir)     # 404 before creating a lock file
+    with _upload_lock(upload_id, upload_dir):
+        meta = _load_meta(upload_id, upload_dir)
+        if meta["status"] == "complete":
+            return meta
+        if meta["size"] is not None and meta["received"] != meta["size"]:
+            raise UploadError(f"received {meta['received']} of {meta['size']} bytes")
+        _, part_path, final_path = _paths(upload_id, upload_dir)
+        actual = file_sha256(part_path)
+        if sha256 and sha256.lower() != actual:
+            raise UploadError(f"sha256 mismatch: expected {sha256}, got {actual}")
+        os.replace(part_path, final_path)
+        write_hash(final_path, actual)
+        meta.update({"status": "complete", "path": final_path, "sha256": actual})
+        _save_meta(meta, upload_dir)
+        # whoever still waits on the old lock file sees status "complete" and stops
+        if fcntl is not None:
+            os.remove(_lock_path(upload_id, upload_dir))
+    return meta
+
+
+def resolve_upload(upload_id: str, upload_dir: str = UPLOAD_DIR) -> str:
+    """Path of a finalized upload, for /api/v1/import {"upload_id": ...}."""
+    meta = _load_meta(upload_id, upload_dir)
+    if meta["status"] != "complete":
+        raise UploadError(f"upload {upload_id} is not finalized")
+    return meta["path"]
@@ -0,0 +1,185 @@
+# backend/app/worker.py
+"""
+Standalone import worker: polls import_jobs (see app/jobqueue.py) and runs
+imports outside the API process. Scale by starting more worker processes /
+containers; each runs at most --concurrency jobs at a time.
+
+    python -m app.worker --concurrency 2
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app import db, importer, jobqueue, uploads
+
+WORKER_CONCURRENCY = int(os.environ.get("WORKER_CONCURRENCY", "1"))
+WORKER_POLL_INTERVAL = float(os.environ.get("WORKER_POLL_INTERVAL", "2"))
+
+
+def run_import_job(job: dict, max_workers: int = None):
+    """
+    Execute one claimed job: COPY + transform (same loader as the API endpoints;
+    NDJSON or Parquet, detected from the file), reporting progress. Content that an earlier job already imported is not
+    loaded again (unless options.force): the earlier job's result is returned.
+    options.workers is capped at max_workers (this job's share of the DB pool).
+    """
+    job_id = job["id"]
+    file_url = job["file_url"]
+    options = job.get("options") or {}
+    if not os.path.exists(file_url):
+        raise FileNotFoundError(f"File not found for job: {file_url}")
+
+    if not options.get("force"):
+        file_hash = job.get("file_hash")
+        if not file_hash:
+            # enqueued without a sidecar hash (file not uploaded through the API)
+            file_hash = uploads.read_hash(file_url) or uploads.file_sha256(file_url)
+            with db.connection() as conn:
+                jobqueue.set_file_hash(conn, job_id, file_hash)
+        with db.connection() as conn:
+            prev = jobqueue.find_imported(conn, file_hash, job_id=job_id)
+        if prev and prev["status"] == "success":
+            return dict(prev["result"] or {}, duplicate_of=prev["id"])
+        if prev:
+            raise jobqueue.JobDeferred(f"same content is being imported by job {prev['id']}")
+    workers = importer.clamp_workers(options.get("workers") or importer.IMPORT_WORKERS, max_workers)
+    progress = jobqueue.ProgressReporter(db.connection, job_id)
+    if workers > 1:
+        return importer.import_file_parallel(db.connection, file_url, workers=workers, job_id=job_id,
+                                             progress=progress)
+    with db.connection() as conn:
+        return importer.import_file(conn, file_url, job_id=job_id, progress=progress)
+
+
+class Worker:
+    def __init__(self, concurrency: int = WORKER_CONCURRENCY, poll_interval: float = WORKER_POLL_INTERVAL,
+                 worker_id: str = None):
+        self.concurrency = max(1, concurrency)
+        # jobs run side by side on one pool: each gets an equal share, minus the
+        # progress writer and the heartbeat/claim connections
+        self.max_import_workers = max(1, db.DB_POOL_MAX // self.concurrency - 2)
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+        self._finished = threading.Event()   # keeps heartbeats going while jobs drain on shutdown
+        self._running = set()
+        self._lock = threading.Lock()
+
+    def _log(self, msg):
+        print(f"[worker {self.worker_id}] {msg}", flush=True)
+
+    # --- job execution ---
+    def _execute(self, job: dict):
+        job_id = job["id"]
+        started = time.perf_counter()
+        try:
+            stats = run_import_job(job, self.max_import_workers)
+            with db.connection() as conn:
+                if not jobqueue.complete(conn, job_id, self.worker_id, result=stats):
+                    self._log(f"job {job_id} finished but is no longer owned by this worker")
+            self._log(f"job {job_id} done in {time.perf_counter() - started:.1f}s: {stats}")
+        except jobqueue.JobDeferred as e:
+            try:
+                with db.connection() as conn:
+                    jobqueue.defer(conn, job_id, self.worker_id, e.delay, str(e))
+            except Exception as e2:
+                self._log(f"job {job_id} could not be deferred: {e2}")
+            self._log(f"job {job_id} deferred {e.delay:.0f}s: {e}")
+        except Exception as e:
+            try:
+                with db.connection() as conn:
+                    res = jobqueue.fail(conn, job_id, self.worker_id, str(e))
+                state = res["status"] if res else "lost"
+            except Exception as e2:
+                state = f"unrecorded ({e2})"
+            self._log(f"job {job_id} attempt {job['attempts']}/{job['max_attempts']} failed -> {state}: {e}")
+        finally:
+            with self._lock:
+                self._running.discard(job_id)
+
+    # --- background loops ---
+    def _heartbeat_loop(self):
+        while not self._finished.wait(jobqueue.JOB_HEARTBEAT_INTERVAL):
+            self._heartbeat_once()
+
+    def _heartbeat_once(self):
+        with self._lock:
+            ids = list(self._running)
+        if not ids:
+            return
+        try:
+            with db.connection() as conn:
+                jobqueue.heartbeat(conn, ids, self.worker_id)
+        except Exception as e:
+            self._log(f"heartbeat failed: {e}")
+
+    def _claim(self):
+        with db.connection() as conn:
+            return jobqueue.claim(conn, self.worker_id)
+
+    def run(self, once: bool = False):
+        self._log(f"started, concurrency={self.concurrency}")
+        threading.Thread(target=self._heartbeat_loop, name="heartbeat", daemon=True).start()
+        last_recovery = 0.0
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="import") as pool:
+            while not self.stopping.is_set():
+                if time.monotonic() - last_recovery > jobqueue.JOB_STALE_AFTER / 2:
+                    try:
+                        with db.connection() as conn:
+                            n = jobqueue.recover_stale(conn)
+                        if n:
+                            self._log(f"requeued {n} stale job(s)")
+                    except Exception as e:
+                        self._log(f"stale recovery failed: {e}")
+                    last_recovery = time.monotonic()
+
+                claimed = False
+                with self._lock:
+                    free = self.concurrency - len(self._running)
+                if free > 0:
+                    try:
+                        job = self._claim()
+                    except Exception as e:
+                        self._log(f"claim failed: {e}")
+                        job = None
+                    if job:
+                        claimed = True
+                        with self._lock:
+                            self._running.add(job["id"])
+                        self._log(f"claimed job {job['id']} ({job['file_url']}), attempt {job['attempts']}")
+                        pool.submit(self._execute, job)
+                if once and not claimed:
+                    with self._lock:
+                        if not self._running:
+                            break
+                if not claimed:
+                    self.stopping.wait(self.poll_interval)
+            self._log("stopping: waiting for running jobs")
+        self._finished.set()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Import job worker")
+    ap.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY, help="max jobs run at the same time")
+    ap.add_argument("--poll-interval", type=float, default=WORKER_POLL_INTERVAL)
+    ap.add_argument("--once", action="store_true", help="exit when the queue is empty")
+    args = ap.parse_args(argv)
+
+    worker = Worker(concurrency=args.concurrency, poll_interval=args.poll_interval)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: worker.stopping.set())
+    db.init_pool()
+    try:
+        worker.run(once=args.once)
+    finally:
+        db.close_pool()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+# benchmarks/bench_flights.py
+"""
+Load test for GET /api/v1/flights in sync (DB_ASYNC=0) and async (DB_ASYNC=1) mode.
+
+Spawns one uvicorn worker per mode against the same database, fires
+--requests requests with --concurrency in flight and prints requests/sec and
+latency percentiles. Run from the backend/ folder with the DB reachable
+(DATABASE_URL / PG* env as for the API):
+
+    python benchmarks/bench_flights.py --requests 2000 --concurrency 64
+
+Use --url to benchmark an already running server (mode is then whatever it
+was started with). `--query "date_from=2025-01-01"` makes the query heavier.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    k = max(0, min(len(values) - 1, int(round(pct / 100.0 * len(values) + 0.5)) - 1))
+    return values[k]
+
+
+async def run_load(base_url, path, n_requests, concurrency):
+    latencies = []
+    errors = 0
+    counter = iter(range(n_requests))
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+        async def worker():
+            nonlocal errors
+            for _ in counter:
+                t0 = time.perf_counter()
+                try:
+                    r = await client.get(path)
+                    if r.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - t0) * 1000.0)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(n_requests / elapsed, 1) if elapsed else None,
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies), 2),
+    }
+
+
+def wait_healthy(base_url, proc, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if httpx.get(base_url + "/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    raise RuntimeError(f"{base_url} did not become healthy in {timeout}s")
+
+
+def bench_mode(mode, port, args, path):
+    env = dict(os.environ, DB_ASYNC="1" if mode == "async" else "0")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", "1", "--log-level", "warning"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_healthy(base_url, proc)
+        # warm up pools / plan cache
+        asyncio.run(run_load(base_url, path, min(50, args.requests), min(8, args.concurrency)))
+        res = asyncio.run(run_load(base_url, path, args.requests, args.concurrency))
+        res["mode"] = mode
+        return res
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--limit", type=int, default=100, help="limit= query parameter")
+    ap.add_argument("--query", default="", help="extra query string, e.g. 'uav_type=BLA'")
+    ap.add_argument("--modes", default="sync,async")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--url", help="benchmark an already running server instead of spawning uvicorn")
+    ap.add_argument("--json", action="store_true", help="print results as JSON")
+    args = ap.parse_args()
+
+    path = f"/api/v1/flights?limit={args.limit}" + (f"&{args.query}" if args.query else "")
+    results = []
+    if args.url:
+        res = asyncio.run(run_load(args.url.rstrip("/"), path, args.requests, args.concurrency))
+        res["mode"] = "external"
+        results.append(res)
+    else:
+        for i, mode in enumerate(m.strip() for m in args.modes.split(",") if m.strip()):
+            results.append(bench_mode(mode, args.port + i, args, path))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"GET {path}  requests={args.requests} concurrency={args.concurrency}")
+    print(f"{'mode':<10}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}")
+    for r in results:
+        print(f"{r['mode']:<10}{r['rps']:>10}{r['p50_ms']:>10}{r['p99_ms']:>10}{r['max_ms']:>10}{r['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
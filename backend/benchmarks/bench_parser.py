@@ -0,0 +1,212 @@
+# benchmarks/bench_parser.py
+"""
+Parser microbenchmarks with a regression gate.
+
+Runs parse_compact_coord, extract_flight_id_from_text, parse_time_token,
+normalize_row (row by row) and normalize_batch (1000-row column chunks) over a synthetic corpus shaped like the raw payloads in
+sample_parsed.json (SHR/DEP/ARR messages, repeated coordinates and dates) and
+reports rows/sec plus allocations per row (tracemalloc: blocks and bytes still
+allocated after the run, i.e. what each result costs). Run from backend/:
+
+    python benchmarks/bench_parser.py                     # report only
+    python benchmarks/bench_parser.py --save-baseline     # write parser_baseline.json
+    python benchmarks/bench_parser.py --check             # exit 1 on regression
+
+--check fails when a benchmark's rows/sec drops more than --threshold (default
+20%) below the baseline. Both runs also time a fixed pure-Python calibration
+loop, and the baseline is scaled by the ratio of the two calibration results,
+so a baseline recorded on one machine stays usable on a slower/faster one.
+Parser caches are cleared before every repeat, so numbers are cold-cache.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app import parser  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "parser_baseline.json")
+DEFAULT_THRESHOLD = 0.20
+CHUNK_ROWS = 1000
+
+
+# -----------------------
+# synthetic corpus
+# -----------------------
+def _coord(rnd):
+    if rnd.random() < 0.2:   # some messages carry DDMMSS coordinates
+        return "%02d%02d%02dN%03d%02d%02dE" % (rnd.randint(41, 69), rnd.randint(0, 59), rnd.randint(0, 59),
+                                                 rnd.randint(20, 179), rnd.randint(0, 59), rnd.randint(0, 59))
+    return "%02d%02dN%03d%02dE" % (rnd.randint(41, 69), rnd.randint(0, 59), rnd.randint(20, 179), rnd.randint(0, 59))
+
+
+def make_corpus(rows: int = 5000, seed: int = 7) -> list:
+    """Raw rows {'SHR', 'DEP', 'ARR', 'center'} with the structure of the real export."""
+    rnd = random.Random(seed)
+    coords = [_coord(rnd) for _ in range(max(8, rows // 20))]     # zones are reused by many flights
+    dofs = ["%02d%02d25" % (rnd.randint(1, 28), rnd.randint(1, 12)) for _ in range(60)]
+    types = ["BLA", "AER", "SHAR", "BLA", "BLA"]
+    out = []
+    for i in range(rows):
+        sid = str(7772000000 + rnd.randint(0, 999999))
+        reg = "RA-%05d" % rnd.randint(0, 99999) if rnd.random() < 0.5 else None
+        dep_c, arr_c = rnd.choice(coords), rnd.choice(coords)
+        dof = rnd.choice(dofs)
+        atd = "%02d%02d" % (rnd.randint(0, 23), rnd.randint(0, 59))
+        ata = "%02d%02d" % (rnd.randint(0, 23), rnd.randint(0, 59))
+        zone = " ".join(rnd.choice(coords) for _ in range(rnd.randint(0, 5)))
+        shr = (
+            f"(SHR-{rnd.choice(['ZZZZZ', '0938G', '00725'])}\n-ZZZZ{atd}\n-M0000/M0005 /ZONA {zone}/\n"
+            f"-DEP/{dep_c} DEST/{arr_c} DOF/{dof} EET/USSV0001\n"
+            f"OPR/ОПЕРАТОР ИВАН ИВАНОВИ4 {'REG/' + reg + ' ' if reg else ''}TYP/{rnd.choice(types)} "
+            f"RMK/ПОЛЕТ НА ВЫСОТЕ ДО 150 М +7 902 2 610 610\nSID/{sid})"
+        )
+        dep = f"-TITLE IDEP\n-SID {sid}\n-ADD {dof}\n-ATD {atd}\n-ADEP ZZZZ\n-ADEPZ {dep_c}\n-PAP 0"
+        arr = (f"-TITLE IARR\n-SID {sid}\n-ADA {dof}\n-ATA {ata}\n-ADARR ZZZZ\n-ADARRZ {arr_c}\n-PAP 0"
+               if rnd.random() < 0.95 else None)
+        out.append({"SHR": shr, "DEP": dep, "ARR": arr, "center": None})
+    return out
+
+
+# -----------------------
+# benchmarks
+# -----------------------
+def _chunks(corpus, size):
+    """Column dicts of `size` rows, as app.sources hands them to the runners."""
+    return [{key: [r[key] for r in corpus[i:i + size]] for key in parser.COLUMN_ALIASES}
+            for i in range(0, len(corpus), size)]
+
+
+def _normalize_chunk(columns):
+    return parser.normalize_batch(*parser.batch_columns(columns))
+
+
+def _inputs(corpus):
+    """name -> (function, items, rows the items stand for)."""
+    tokens = []
+    for r in corpus:
+        tokens.extend(t for t in r["DEP"].split() if t[:1].isdigit() and t[-1:] in "EW")
+    shr = [r["SHR"] for r in corpus]
+    dep = [r["DEP"] for r in corpus]
+    return {
+        "parse_compact_coord": (parser.parse_compact_coord, tokens, len(tokens)),
+        "extract_flight_id_from_text": (parser.extract_flight_id_from_text, shr, len(shr)),
+        "parse_time_token": (parser.parse_time_token, dep, len(dep)),
+        "normalize_row": (parser.normalize_row, corpus, len(corpus)),
+        # same rows in CHUNK_ROWS-row column batches (full_runner.parse_chunk path)
+        "normalize_batch": (_normalize_chunk, _chunks(corpus, CHUNK_ROWS), len(corpus)),
+    }
+
+
+def _time_once(func, items) -> float:
+    parser.cache_clear()
+    started = time.perf_counter()
+    for item in items:
+        func(item)
+    return time.perf_counter() - started
+
+
+def _allocations(func, items, rows) -> dict:
+    parser.cache_clear()
+    tracemalloc.start()
+    try:
+        base = tracemalloc.take_snapshot()
+        results = [func(item) for item in items]
+        stats = tracemalloc.take_snapshot().compare_to(base, "filename")
+    finally:
+        tracemalloc.stop()
+    del results
+    n = rows or 1
+    return {
+        "alloc_blocks_per_row": round(sum(s.count_diff for s in stats) / n, 2),
+        "alloc_bytes_per_row": round(sum(s.size_diff for s in stats) / n, 1),
+    }
+
+
+def calibrate(loops: int = 200000) -> float:
+    """Machine speed reference: iterations/sec of a fixed string/dict loop."""
+    best = None
+    for _ in range(3):
+        started = time.perf_counter()
+        d = {}
+        for i in range(loops):
+            s = "K%d" % (i % 97)
+            d[s] = d.get(s, 0) + len(s.upper())
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None or elapsed < best else best
+    return round(loops / best, 1)
+
+
+def run(rows: int = 5000, repeat: int = 5, seed: int = 7) -> dict:
+    corpus = make_corpus(rows, seed)
+    results = {}
+    for name, (func, items, n) in _inputs(corpus).items():
+        best = min(_time_once(func, items) for _ in range(repeat))
+        results[name] = {"items": n, "rows_per_sec": round(n / best, 1)}
+        results[name].update(_allocations(func, items, n))
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "rows": rows,
+        "seed": seed,
+        "calibration": calibrate(),
+        "benchmarks": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """Regressions as human-readable lines; empty when every benchmark is within threshold."""
+    scale = 1.0
+    if baseline.get("calibration") and current.get("calibration"):
+        scale = current["calibration"] / baseline["calibration"]
+    failures = []
+    for name, base in baseline.get("benchmarks", {}).items():
+        cur = current["benchmarks"].get(name)
+        if cur is None:
+            failures.append(f"{name}: missing from current run")
+            continue
+        expected = base["rows_per_sec"] * scale
+        if cur["rows_per_sec"] < expected * (1 - threshold):
+            failures.append(f"{name}: {cur['rows_per_sec']:.0f} rows/s < {expected:.0f} expected "
+                            f"(-{(1 - cur['rows_per_sec'] / expected) * 100:.1f}%, limit -{threshold * 100:.0f}%)")
+    return failures
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Parser microbenchmarks")
+    ap.add_argument("--rows", type=int, default=5000, help="synthetic corpus size")
+    ap.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark (best is kept)")
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    ap.add_argument("--check", action="store_true", help="exit 1 if slower than the baseline")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, 0.2 = 20%%")
+    args = ap.parse_args(argv)
+
+    report = run(args.rows, args.repeat, args.seed)
+    print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+            fh.write("\n")
+        print(f"baseline saved to {args.baseline}")
+    if args.check:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        failures = compare(report, baseline, args.threshold)
+        if failures:
+            print("REGRESSION:\n  " + "\n  ".join(failures))
+            return 1
+        print(f"OK: within {args.threshold * 100:.0f}% of baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
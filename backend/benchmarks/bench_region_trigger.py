@@ -0,0 +1,158 @@
+# benchmarks/bench_region_trigger.py
+"""
+Cost of region assignment at insert time (data/region_trigger.sql) against the
+alternatives, measured on the real regions_subdivided of the configured DB
+(app/db.py settings). Run from backend/ after migrations 008 and 009:
+
+    python benchmarks/bench_region_trigger.py --rows 100000
+
+Every mode inserts the same --rows random points inside the regions' extent
+into a temporary copy of the flights geometry columns (GiST indexes included)
+and is rolled back afterwards, so nothing is left in the database:
+
+    plain      INSERT only, no regions (the floor)
+    inline     INSERT computing region_at() in the SELECT (what load_from_staging*.sql does)
+    trigger    INSERT with trg_flights_resolve_regions on the table
+    post_pass  plain INSERT followed by one set-based UPDATE (python -m app.assign_regions)
+
+Reported per mode: best total time, microseconds per row and overhead per row
+over `plain`. The trigger only pays off when rows arrive through paths that do
+not resolve regions themselves; for the importer the inline column is the one
+to compare it with.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+MODES = ("plain", "inline", "trigger", "post_pass")
+
+EXTENT_SQL = """
+SELECT ST_XMin(e), ST_YMin(e), ST_XMax(e), ST_YMax(e)
+FROM (SELECT ST_Extent(geom) AS e FROM public.regions_subdivided) s
+"""
+
+TABLE_DDL = """
+CREATE TEMP TABLE bench_flights (
+  id bigserial PRIMARY KEY,
+  start_geom geometry(Point, 4326),
+  end_geom geometry(Point, 4326),
+  start_region_id integer,
+  end_region_id integer
+);
+CREATE INDEX ON bench_flights USING GIST (start_geom);
+CREATE INDEX ON bench_flights USING GIST (end_geom);
+"""
+
+TRIGGER_DDL = """
+CREATE TRIGGER trg_bench_resolve_regions
+  BEFORE INSERT OR UPDATE OF start_geom, end_geom ON bench_flights
+  FOR EACH ROW EXECUTE FUNCTION flights_resolve_regions()
+"""
+
+POINTS_SQL = """
+  SELECT ST_SetSRID(ST_MakePoint(%(x0)s + random() * %(dx)s, %(y0)s + random() * %(dy)s), 4326) AS s,
+         ST_SetSRID(ST_MakePoint(%(x0)s + random() * %(dx)s, %(y0)s + random() * %(dy)s), 4326) AS e
+  FROM generate_series(1, %(rows)s)
+"""
+
+INSERT_SQL = f"INSERT INTO bench_flights (start_geom, end_geom) SELECT p.s, p.e FROM ({POINTS_SQL}) p"
+INSERT_INLINE_SQL = (f"INSERT INTO bench_flights (start_geom, end_geom, start_region_id, end_region_id) "
+                     f"SELECT p.s, p.e, region_at(p.s), region_at(p.e) FROM ({POINTS_SQL}) p")
+POST_PASS_SQL = """
+UPDATE bench_flights
+SET start_region_id = region_at(start_geom), end_region_id = region_at(end_geom)
+WHERE start_region_id IS NULL OR end_region_id IS NULL
+"""
+MATCHED_SQL = "SELECT count(*) FILTER (WHERE start_region_id IS NOT NULL) FROM bench_flights"
+
+
+def _run_mode(conn, mode: str, params: dict, seed: float) -> tuple:
+    """One rolled-back run: (seconds spent on INSERT [+ UPDATE], rows with a start region)."""
+    cur = conn.cursor()
+    try:
+        cur.execute(TABLE_DDL)
+        if mode == "trigger":
+            cur.execute(TRIGGER_DDL)
+        cur.execute("SELECT setseed(%s)", (seed,))    # the same points in every mode
+        started = time.perf_counter()
+        cur.execute(INSERT_INLINE_SQL if mode == "inline" else INSERT_SQL, params)
+        if mode == "post_pass":
+            cur.execute(POST_PASS_SQL)
+        elapsed = time.perf_counter() - started
+        cur.execute(MATCHED_SQL)
+        matched = cur.fetchone()[0]
+    finally:
+        cur.close()
+        conn.rollback()
+    return elapsed, matched
+
+
+def summarize(timings: dict, rows: int) -> dict:
+    """{mode: best seconds} -> {mode: seconds, us_per_row, overhead_us_per_row (vs plain)}."""
+    n = rows or 1
+    floor = timings.get("plain")
+    out = {}
+    for mode, seconds in timings.items():
+        out[mode] = {"seconds": round(seconds, 4), "us_per_row": round(seconds / n * 1e6, 2)}
+        if floor is not None:
+            out[mode]["overhead_us_per_row"] = round((seconds - floor) / n * 1e6, 2)
+    return out
+
+
+def run(conn, rows: int = 100000, repeat: int = 3, seed: float = 0.42, modes=MODES) -> dict:
+    cur = conn.cursor()
+    cur.execute(EXTENT_SQL)
+    x0, y0, x1, y1 = cur.fetchone()
+    cur.execute("SELECT count(*) FROM public.regions_subdivided")
+    pieces = cur.fetchone()[0]
+    cur.close()
+    conn.rollback()
+    if x0 is None:
+        raise RuntimeError("regions_subdivided is empty: run SELECT refresh_regions_subdivided()")
+
+    params = {"x0": x0, "y0": y0, "dx": x1 - x0, "dy": y1 - y0, "rows": rows}
+    timings, matched = {}, {}
+    for mode in modes:
+        runs = [_run_mode(conn, mode, params, seed) for _ in range(repeat)]
+        timings[mode] = min(seconds for seconds, _ in runs)
+        matched[mode] = runs[0][1]
+    return {
+        "rows": rows,
+        "region_pieces": pieces,
+        "matched_start": matched,
+        "modes": summarize(timings, rows),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Region trigger vs inline vs post-pass insert overhead")
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--repeat", type=int, default=3, help="runs per mode (best is kept)")
+    ap.add_argument("--seed", type=float, default=0.42, help="setseed() value, -1..1")
+    ap.add_argument("--modes", default=",".join(MODES), help="comma-separated subset of " + ",".join(MODES))
+    args = ap.parse_args(argv)
+    modes = [m for m in args.modes.split(",") if m]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        ap.error(f"unknown modes: {', '.join(sorted(unknown))}")
+
+    from app import db
+    db.init_pool()
+    try:
+        with db.connection() as conn:
+            report = run(conn, args.rows, args.repeat, args.seed, modes)
+    finally:
+        db.close_pool()
+
+    print(json.dumps(report, indent=2))
+    for mode, r in report["modes"].items():
+        print(f"{mode:>10}: {r['us_per_row']:8.2f} us/row  (+{r.get('overhead_us_per_row', 0):.2f} over plain)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
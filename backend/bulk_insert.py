@@ -31,7 +31,8 @@ def bulk_insert(items):
     ON CONFLICT (fingerprint) DO NOTHING
     """
     # execute_values with template to handle geom using ST_GeomFromText
-    template = "(%s,%s,%s,%s,%s,ST_GeomFromEWKT(%s),ST_GeomFromEWKT(%s),%s,%s,%s,%s,%s,%s)"
+    # fingerprint through flight_fingerprint(): text or compact uuid column (data/fingerprint_compact.sql)
+    template = "(%s,%s,%s,%s,%s,ST_GeomFromEWKT(%s),ST_GeomFromEWKT(%s),%s,flight_fingerprint(%s),%s,%s,%s,%s)"
     execute_values(cur, sql, rows, template=template)
     conn.commit()
     cur.close()
@@ -1,12 +1,39 @@
 # full_runner.py
+"""
+Excel / CSV / NDJSON / Parquet -> parsed.ndjson или parsed.parquet.
+
+    python full_runner.py                       # один процесс
+    python full_runner.py --workers 16          # чанки парсятся пулом процессов
+    python full_runner.py ../data/2024.csv      # формат по расширению (app/sources.py)
+    python full_runner.py --out parsed.parquet  # колоночный вывод (app/columnar.py, нужен pyarrow)
+    python full_runner.py --regions ../data/regions.geojson   # сразу start/end_region_id (app/regions.py)
+
+Parquet: чанк = row group с типизированными колонками, без json.dumps на строку;
+файл в разы меньше NDJSON и грузится в БД без jsonb-разбора (app/importer.py).
+
+Файл читается потоково, чанками по --chunk строк: память не зависит от размера выгрузки.
+
+В параллельном режиме порядок строк в выходном файле тот же, что в Excel:
+результаты пишутся по мере готовности, но строго по порядку чанков, а в работе
+одновременно не больше --max-inflight чанков (память ограничена).
+"""
+import os
+import sys
 import json
 import math
-import pandas as pd
-from app.parser import normalize_row
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from app.parser import normalize_batch, batch_rows, cache_stats, PARSER_VERSION
+from app.sources import iter_batches
+from app import columnar
 
 EXCEL_PATH = "../data/2025.xlsx"   # или путь к большему файлу
 OUT_PATH = "parsed.ndjson"         # newline-delimited JSON, удобно для импорта
-CHUNK = 1000                       # размер чанка (настраивай)
+FORMATS = ("ndjson", "parquet")
+CHUNK = 10000                      # размер чанка (настраивай)
+WORKERS = int(os.environ.get("PARSE_WORKERS", "1"))
 
 def safe_convert(obj):
     # replace NaN/inf -> None in nested dicts
@@ -20,20 +47,107 @@ def safe_convert(obj):
         return [safe_convert(x) for x in obj]
     return obj
 
-def process():
-    df = pd.read_excel(EXCEL_PATH)
+_REGIONS = None   # RegionIndex этого процесса (load_regions)
+
+def load_regions(path):
+    """Индекс регионов из GeoJSON-выгрузки; вызывается один раз на процесс (initializer пула)."""
+    global _REGIONS
+    from app.regions import RegionIndex
+    _REGIONS = RegionIndex.from_geojson(path) if path else None
+
+def parse_chunk(shr, dep, arr, center, fmt="ndjson"):
+    """
+    Колонки одного чанка -> (готовый кусок NDJSON или pyarrow.Table, (pid, счётчики кэшей парсера)).
+    Выполняется и в процессах пула; счётчики у каждого процесса свои и накопительные.
+    С загруженным индексом регионов в строки добавляются start_region_id/end_region_id.
+    """
+    batch = normalize_batch(shr, dep, arr, center)
+    if _REGIONS is not None:
+        _REGIONS.assign_batch(batch)
+    if fmt == "parquet":
+        return columnar.batch_to_table(batch), (os.getpid(), cache_stats())
+    # parser_version: какая версия парсера разобрала строку (flights.parser_version)
+    extra = [f for f in ("start_region_id", "end_region_id") if f in batch]
+    text = "".join(json.dumps(dict(safe_convert(parsed), parser_version=PARSER_VERSION,
+                                   **{f: batch[f][i] for f in extra}), ensure_ascii=False) + "\n"
+                   for i, parsed in enumerate(batch_rows(batch)))
+    return text, (os.getpid(), cache_stats())
+
+def merge_cache_stats(per_process) -> dict:
+    out = {}
+    for stats in per_process:
+        for name, st in stats.items():
+            acc = out.setdefault(name, {"hits": 0, "misses": 0})
+            acc["hits"] += st["hits"]
+            acc["misses"] += st["misses"]
+    for acc in out.values():
+        calls = acc["hits"] + acc["misses"]
+        acc["hit_rate"] = round(acc["hits"] / calls, 4) if calls else None
+    return out
+
+def parsed_chunks(chunks, workers=1, max_inflight=None, fmt="ndjson", regions=None):
+    """
+    (rows, результат parse_chunk) по чанкам в исходном порядке. При workers > 1 чанки парсятся
+    пулом процессов; в работе одновременно не больше max_inflight (по умолчанию
+    2*workers) — дальше ждём самый старый чанк, так что память ограничена.
+    """
+    if workers <= 1:
+        load_regions(regions)
+        for n, cols in chunks:
+            yield n, parse_chunk(*cols, fmt=fmt)
+        return
+    max_inflight = max_inflight or 2 * workers
+    pending = deque()   # (rows, future) в порядке чанков
+    with ProcessPoolExecutor(max_workers=workers, initializer=load_regions, initargs=(regions,)) as pool:
+        for n, cols in chunks:
+            pending.append((n, pool.submit(parse_chunk, *cols, fmt=fmt)))
+            while len(pending) >= max_inflight:
+                n_done, fut = pending.popleft()
+                yield n_done, fut.result()
+        while pending:
+            n_done, fut = pending.popleft()
+            yield n_done, fut.result()
+
+def output_format(out_path, fmt=None):
+    """Явный --format или по расширению --out (.parquet -> parquet, иначе ndjson)."""
+    if fmt:
+        return fmt
+    return "parquet" if out_path.lower().endswith((".parquet", ".pq")) else "ndjson"
+
+def process(excel_path=EXCEL_PATH, out_path=OUT_PATH, chunk=CHUNK, workers=WORKERS, max_inflight=None, fmt=None,
+            regions=None):
+    fmt = output_format(out_path, fmt)
     total = 0
-    with open(OUT_PATH, "w", encoding="utf-8") as out:
-        for start in range(0, len(df), CHUNK):
-            sub = df.iloc[start:start + CHUNK]
-            for _, row in sub.iterrows():
-                row_dict = row.to_dict()
-                parsed = normalize_row(row_dict)
-                cleaned = safe_convert(parsed)
-                out.write(json.dumps(cleaned, ensure_ascii=False) + "\n")
-                total += 1
+    stats = {}   # pid -> последние счётчики кэшей этого процесса
+    if fmt == "parquet":
+        out = columnar.ParquetBatchWriter(out_path)
+        write = out.write_table
+    else:
+        out = open(out_path, "w", encoding="utf-8")
+        write = out.write
+    with out:
+        for n, (part, (pid, st)) in parsed_chunks(iter_batches(excel_path, chunk), workers, max_inflight, fmt,
+                                                            regions):
+            write(part)
+            stats[pid] = st
+            total += n
             print("Processed", total)
     print("Done. total:", total)
+    print("Parser caches:", json.dumps(merge_cache_stats(stats.values())))
+    return total
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Parse the Excel/CSV/NDJSON export into NDJSON or Parquet")
+    ap.add_argument("excel", nargs="?", default=EXCEL_PATH, help=".xlsx, .csv, .ndjson or .parquet")
+    ap.add_argument("--out", default=OUT_PATH)
+    ap.add_argument("--format", choices=FORMATS, default=None, help="default: by --out extension")
+    ap.add_argument("--chunk", type=int, default=CHUNK, help="rows per chunk")
+    ap.add_argument("--workers", type=int, default=WORKERS, help="parser processes (1 = no pool)")
+    ap.add_argument("--max-inflight", type=int, default=None, help="chunks queued/parsing at once (default 2*workers)")
+    ap.add_argument("--regions", default=None, help="regions GeoJSON (python -m app.regions --export) to assign region ids")
+    args = ap.parse_args(argv)
+    process(args.excel, args.out, chunk=args.chunk, workers=args.workers, max_inflight=args.max_inflight,
+            fmt=args.format, regions=args.regions)
 
 if __name__ == "__main__":
-    process()
+    sys.exit(main())
@@ -38,6 +38,14 @@ try:
         count = result.scalar()
         print(f"В таблице 'regions' теперь {count} записей.")
 
+        # куски полигонов для привязки точек к регионам (data/migrations/008_regions_subdivided.sql)
+        pieces = conn.execute(text("SELECT refresh_regions_subdivided();")).scalar()
+        print(f"regions_subdivided пересобрана: {pieces} кусков.")
+
+        # упрощённые геометрии для /api/v1/regions (data/migrations/010_regions_simplified.sql)
+        levels = conn.execute(text("SELECT refresh_regions_simplified();")).scalar()
+        print(f"regions_simplified пересобрана: {levels} строк.")
+
 except Exception as e:
     print("Произошла ошибка при загрузке шейпа:", e)
     sys.exit(1)
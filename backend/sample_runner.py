@@ -1,29 +1,17 @@
 # backend/sample_runner.py
 import json
-import pandas as pd
-from app.parser import normalize_row
+from app.parser import normalize_batch, batch_rows
+from app.sources import iter_batches
 
 EXCEL_PATH = "../data/2025.xlsx"   # путь к файлу Excel (от папки backend)
 N = 500                            # сколько строк взять
 
-def row_to_dict(row, df_columns):
-    # Собираем словарь и явно складываем текстовые блоки в raw_payload поля
-    d = {}
-    for c in df_columns:
-        d[c] = row[c] if c in row else None
-    # не кладём NaN в raw_payload, normalize_row сам соберёт нужное
-    return d
-
 def main():
-    df = pd.read_excel(EXCEL_PATH, dtype=object)  # читаем как объекты, чтобы не терять текст
-    n = min(N, len(df))
+    # первый чанк потокового чтения = первые N строк, остальной файл не читается
     results = []
-    for i in range(n):
-        row = df.iloc[i]
-        row_dict = row_to_dict(row, df.columns)
-        row_dict["__row_index"] = int(i)
-        parsed = normalize_row(row_dict)
-        results.append(parsed)
+    for _, cols in iter_batches(EXCEL_PATH, batch_size=N):
+        results = list(batch_rows(normalize_batch(*cols)))
+        break
 
     out_path = "sample_parsed.json"
     with open(out_path, "w", encoding="utf-8") as f:
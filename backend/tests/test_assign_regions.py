@@ -0,0 +1,47 @@
+# tests/test_assign_regions.py
+from app import assign_regions
+
+
+class _Conn:
+    """Answers the keyset query from a list of ids and the UPDATE with fixed counts."""
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.commits = 0
+        self.ranges = []
+        self._row = None
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params):
+        if sql == assign_regions.NEXT_RANGE_SQL:
+            lo, limit = params
+            after = [i for i in self.ids if i > lo][:limit]
+            self._row = (after[-1] if after else None,)
+        else:
+            self.ranges.append((params["lo"], params["hi"]))
+            self._row = (3, 2, 1, 1, 2, 0)
+
+    def fetchone(self):
+        return self._row
+
+    def commit(self):
+        self.commits += 1
+
+    def close(self):
+        pass
+
+
+def test_assign_walks_keyset_ranges_and_records_state(tmp_path):
+    state = str(tmp_path / "assign.state")
+    conn = _Conn([1, 2, 5, 9, 10])
+    totals = assign_regions.assign(conn, 0, batch=2, state_path=state, log=lambda *_: None)
+    assert conn.ranges == [(0, 2), (2, 9), (9, 10)]
+    assert conn.commits == 3 and totals["updated"] == 6 and totals["start_nearest"] == 3
+    assert assign_regions.read_state(state) == 10
+
+    # restart: nothing after the stored id
+    conn = _Conn([1, 2, 5, 9, 10])
+    totals = assign_regions.assign(conn, assign_regions.read_state(state), batch=2, log=lambda *_: None)
+    assert conn.ranges == [] and totals["last_id"] == 10
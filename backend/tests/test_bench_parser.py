@@ -0,0 +1,26 @@
+# tests/test_bench_parser.py
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+import bench_parser  # noqa: E402
+from app import parser  # noqa: E402
+
+
+def test_synthetic_corpus_parses_like_real_rows():
+    corpus = bench_parser.make_corpus(50, seed=1)
+    assert corpus == bench_parser.make_corpus(50, seed=1)      # deterministic
+    for row in corpus:
+        rec = parser.normalize_row(row)
+        assert rec["start_lat"] is not None and rec["start_time"] is not None
+        assert rec["flight_id"]
+
+
+def test_compare_scales_baseline_by_calibration():
+    baseline = {"calibration": 100.0, "benchmarks": {"a": {"rows_per_sec": 1000.0}, "b": {"rows_per_sec": 50.0}}}
+    # half as fast machine: 450 rows/s is within 20% of the scaled 500
+    current = {"calibration": 50.0, "benchmarks": {"a": {"rows_per_sec": 450.0}, "b": {"rows_per_sec": 10.0}}}
+    failures = bench_parser.compare(current, baseline, threshold=0.2)
+    assert len(failures) == 1 and failures[0].startswith("b:")
+    assert bench_parser.compare({"calibration": 100.0, "benchmarks": {}}, baseline) != []
@@ -0,0 +1,15 @@
+# tests/test_bench_region_trigger.py
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+
+import bench_region_trigger  # noqa: E402
+
+
+def test_summarize_reports_overhead_over_plain_insert():
+    out = bench_region_trigger.summarize({"plain": 1.0, "trigger": 3.5, "post_pass": 2.0}, rows=100000)
+    assert out["plain"] == {"seconds": 1.0, "us_per_row": 10.0, "overhead_us_per_row": 0.0}
+    assert out["trigger"]["overhead_us_per_row"] == 25.0
+    assert out["post_pass"]["us_per_row"] == 20.0
+    assert "overhead_us_per_row" not in bench_region_trigger.summarize({"trigger": 1.0}, 10)["trigger"]
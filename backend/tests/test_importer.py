@@ -0,0 +1,98 @@
+# tests/test_importer.py
+import io
+import json
+import struct
+
+import pytest
+
+from app.importer import NdjsonCopyStream
+
+
+def _drain(stream, size=7):
+    out = b""
+    while True:
+        chunk = stream.read(size)
+        if not chunk:
+            return out
+        out += chunk
+
+
+def test_csv_stream_passes_json_verbatim_and_skips_blank_lines():
+    src = b'{"a": "x\\ny"}\n\n{"b": 1}\r\n'
+    s = NdjsonCopyStream(io.BytesIO(src), fmt="csv")
+    assert _drain(s) == b'{"a": "x\\ny"}\n{"b": 1}\n'
+    assert s.rows == 2 and s.lines == 3 and s.bytes_read == len(src)
+
+
+def test_binary_stream_frames_jsonb_tuples():
+    s = NdjsonCopyStream(io.BytesIO(b'{"a":1}\n'), fmt="binary")
+    data = _drain(s)
+    header = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+    assert data.startswith(header)
+    body = data[len(header):]
+    assert body == struct.pack("!hi", 1, 8) + b"\x01" + b'{"a":1}' + struct.pack("!h", -1)
+
+
+def test_validation_counts_bad_lines():
+    bad = []
+    s = NdjsonCopyStream(io.BytesIO(b'{"a":1}\nnot json\n[1,2]\n'), fmt="csv", validate=True,
+                         on_bad_line=lambda n, line: bad.append(n))
+    assert _drain(s) == b'{"a":1}\n'
+    assert s.bad_lines == 2 and bad == [2, 3]
+
+
+def test_split_ranges_align_to_lines(tmp_path):
+    from app.importer import split_ranges, RangeReader
+    lines = [(b'{"n": %d, "pad": "%s"}\n' % (i, b"x" * (i % 13))) for i in range(200)]
+    path = tmp_path / "f.ndjson"
+    path.write_bytes(b"".join(lines))
+
+    for parts in (1, 3, 8, 500):
+        ranges = split_ranges(str(path), parts)
+        assert ranges[0][0] == 0 and ranges[-1][1] == path.stat().st_size
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        got = []
+        with open(path, "rb") as fh:
+            for start, end in ranges:
+                r = RangeReader(fh, start, end)
+                for line in iter(r.readline, b""):
+                    got.append(line)
+        assert got == lines
+
+
+def test_parquet_stream_emits_typed_copy_text(tmp_path):
+    pytest.importorskip("pyarrow")
+    from app import columnar, importer
+    from app.parser import normalize_batch
+
+    batch = normalize_batch(
+        ["(SHR-ZZZZZ\n-ZZZZ0705\n-DEP/5957N02905E DOF/250201 TYP/SHAR\nSID/7772187998)", None],
+        ["-TITLE IDEP\n-SID 7772187998\n-ATD 0705", "-ATD 1200"],
+        [None, "-ADARRZ 5957N02905E"],
+    )
+    path = str(tmp_path / "parsed.parquet")
+    with columnar.ParquetBatchWriter(path) as w:
+        w.write_batch(batch)
+        w.write_batch(batch)
+    assert columnar.is_parquet(path) and not columnar.is_parquet(__file__)
+    assert importer.split_row_groups(path, 4) == [[0], [1]]
+
+    s = importer.ParquetCopyStream(path, row_groups=[1])
+    lines = _drain(s, size=50).decode("utf-8").splitlines()
+    assert s.rows == 2 and s.bytes_read == s.bytes_total > 0
+    first = dict(zip(importer.STAGING_COLUMNS, lines[0].split("\t")))
+    assert first["flight_id"] == "7772187998" and first["uav_type"] == "SHAR"
+    assert first["start_time"] == "2001-02-25T07:05:00+00:00" and first["duration_seconds"] == "\\N"
+    assert first["start_lat"] == "59.95" and first["parser_version"] == str(columnar.PARSER_VERSION)
+    # raw_payload JSON keeps its escapes; COPY text escaping doubles the backslash
+    assert json.loads(first["raw_payload"].replace("\\\\", "\\"))["SHR"].startswith("(SHR-ZZZZZ\n")
+    assert dict(zip(importer.STAGING_COLUMNS, lines[1].split("\t")))["flight_id"] == "\\N"
+
+
+def test_parallel_workers_are_capped_by_the_pool(monkeypatch):
+    from app import importer
+    monkeypatch.setattr(importer, "IMPORT_MAX_WORKERS", 8)
+    assert importer.clamp_workers(16) == 8
+    assert importer.clamp_workers(16, limit=3) == 3
+    assert importer.clamp_workers("4") == 4
+    assert importer.clamp_workers(0) == 1
@@ -0,0 +1,89 @@
+# tests/test_jobqueue.py
+import io
+import datetime
+import contextlib
+
+from app.importer import NdjsonCopyStream
+from app.jobqueue import ProgressReporter, eta_seconds
+
+
+class _Cursor:
+    def __init__(self, writes):
+        self.writes = writes
+
+    def execute(self, sql, params):
+        self.writes.append(params)
+
+    def close(self):
+        pass
+
+
+class _Conn:
+    def __init__(self, writes):
+        self.writes = writes
+
+    def cursor(self):
+        return _Cursor(self.writes)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def _reporter(clock):
+    writes = []
+
+    @contextlib.contextmanager
+    def connection():
+        yield _Conn(writes)
+
+    return ProgressReporter(connection, job_id=7, interval=2, clock=lambda: clock[0]), writes
+
+
+def test_progress_writes_are_throttled_and_phases_forced():
+    clock = [0.0]
+    rep, writes = _reporter(clock)
+    rep.start(bytes_total=100)
+    assert len(writes) == 1 and writes[0]["phase"] == "copy" and writes[0]["id"] == 7
+    assert writes[0]["restart"] is True
+
+    rep.add(bytes_read=10, lines_loaded=2)
+    clock[0] = 1.0
+    rep.add(bytes_read=10, lines_loaded=2)
+    assert len(writes) == 1                      # within the interval
+
+    clock[0] = 2.5
+    rep.add(bytes_read=5, lines_loaded=1)
+    assert len(writes) == 2
+    assert writes[-1]["bytes_read"] == 25 and writes[-1]["lines_loaded"] == 5
+    assert writes[-1]["rows_per_sec"] == 2.0
+    assert writes[-1]["restart"] is False        # progress_started_at is stamped once per start()
+
+    rep.set_phase("transform")
+    assert len(writes) == 3 and writes[-1]["phase"] == "transform"
+
+
+def test_copy_stream_reports_deltas():
+    clock = [0.0]
+    rep, _ = _reporter(clock)
+    rep.start(bytes_total=None)
+    src = b'{"a":1}\nbad\n{"b":2}\n'
+    s = NdjsonCopyStream(io.BytesIO(src), fmt="csv", validate=True, progress=rep)
+    while s.read(4):
+        pass
+    snap = rep.snapshot()
+    assert snap["bytes_read"] == len(src)
+    assert snap["lines_loaded"] == 2 and snap["rows_failed"] == 1
+
+
+def test_eta_from_byte_rate():
+    started = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+    now = started + datetime.timedelta(seconds=10)
+    job = {"status": "running", "bytes_total": 1000, "bytes_read": 250, "progress_started_at": started,
+           "started_at": started - datetime.timedelta(seconds=50)}   # hashing before the first read
+    assert eta_seconds(job, now) == 30.0
+    assert eta_seconds(dict(job, progress_started_at=None), now) is None
+    assert eta_seconds(dict(job, bytes_read=1000), now) is None
+    assert eta_seconds(dict(job, status="success"), now) is None
@@ -1,5 +1,12 @@
 # tests/test_parser.py
-from app.parser import parse_compact_coord, extract_flight_id_from_text, normalize_row
+import os
+import json
+
+from app.parser import (
+    parse_compact_coord, extract_flight_id_from_text, normalize_row, parse_time_token, BlockTokens,
+    normalize_batch, batch_rows, NORMALIZED_FIELDS, combine_dof_time_iso, cache_stats, cache_clear,
+    PARSER_VERSION, batch_columns,
+)
 
 def test_parse_compact_coord_basic():
     r = parse_compact_coord("5957N02905E")
@@ -17,3 +24,75 @@ def test_normalize_row_minimal():
     out = normalize_row(row)
     assert out['flight_id'] is not None
     assert out['start_lat'] is not None
+
+def test_normalize_row_matches_sample_corpus():
+    # sample_parsed.json holds normalize_row() output of the original regex parser
+    path = os.path.join(os.path.dirname(__file__), '..', 'sample_parsed.json')
+    with open(path, encoding='utf-8') as fh:
+        expected = json.load(fh)
+    for row in expected:
+        got = normalize_row(row['raw_payload'])
+        assert json.dumps(got, ensure_ascii=False, sort_keys=True) == json.dumps(row, ensure_ascii=False, sort_keys=True)
+
+def test_keywords_need_word_boundary():
+    assert parse_time_token("XATD 0705 -ATA 1712") == "17:12"
+    assert parse_time_token("ATD0705") == "07:05"
+    b = BlockTokens("-REG/RA-0938G TYP/AER DOF/250111 ATD 2599 ATA 1000")
+    assert b.as_dict() == {'flight_id': 'RA-0938G', 'coord': None, 'dof': '250111',
+                           'time_token': '10:00', 'uav_type': 'AER'}
+
+def test_normalize_batch_matches_rows():
+    rows = [
+        {'SHR': "(SHR-ZZZZZ\n-DOF/250101\nSID/777111)", 'DEP': "-ATD 0705 -ADEPZ 5957N02905E", 'ARR': None},
+        {'SHR': float('nan'), 'DEP': None, 'ARR': "-ATA 1712 -ADARRZ 5646N06202E", 'center': 'X'},
+        {'SHR': '', 'DEP': '', 'ARR': ''},
+    ]
+    col = lambda k: [r.get(k) for r in rows]
+    batch = normalize_batch(col('SHR'), col('DEP'), col('ARR'), col('center'))
+    assert set(batch) == set(NORMALIZED_FIELDS) and all(len(v) == 3 for v in batch.values())
+    assert list(batch_rows(batch)) == [normalize_row(r) for r in rows]
+    assert normalize_batch(col('SHR'), col('DEP'), col('ARR'))['raw_payload'][1]['center'] is None
+
+def test_parser_caches_count_hits():
+    cache_clear()
+    assert parse_compact_coord("5528N03726E") == parse_compact_coord("5528N03726E")
+    assert combine_dof_time_iso("250201", "07:05") == "2001-02-25T07:05:00Z"
+    assert combine_dof_time_iso("250201", "07:05") == "2001-02-25T07:05:00Z"
+    stats = cache_stats()
+    assert stats['parse_compact_coord']['hits'] == 1 and stats['parse_compact_coord']['misses'] == 1
+    assert stats['combine_dof_time_iso']['hit_rate'] == 0.5
+    assert parse_compact_coord(None) is None and parse_compact_coord(5528) is None
+
+
+def test_runner_output_is_stamped_with_parser_version():
+    import full_runner
+    text, _ = full_runner.parse_chunk(['(SHR-ZZZZZ\nDOF/250201)'], ['-ATD 0705'], None, None)
+    assert json.loads(text)['parser_version'] == PARSER_VERSION
+
+
+def test_compact_fingerprint_is_prefix_of_full_digest():
+    from app.parser import make_fingerprint, fingerprint_key
+    full = make_fingerprint('7772187998', '2025-02-01T07:05:00Z', 59.95, 29.08333333, compact=False)
+    compact = make_fingerprint('7772187998', '2025-02-01T07:05:00Z', 59.95, 29.08333333, compact=True)
+    assert len(full) == 64 and compact == full[:32]
+    # what flight_fingerprint() stores in a uuid column, and how psycopg2 reads it back
+    as_uuid = '-'.join((compact[:8], compact[8:12], compact[12:16], compact[16:20], compact[20:]))
+    assert fingerprint_key(full) == fingerprint_key(compact) == fingerprint_key(as_uuid.upper()) == compact
+    assert make_fingerprint(None, None, None, None, compact=False) == make_fingerprint('', '', None, None, compact=False)
+
+def test_batch_columns_fall_back_to_export_headers_like_normalize_row():
+    rows = [
+        {'Shr': "(SHR-ZZZZZ\n-DOF/250101\nSID/777111)", 'Dep': "-ATD 0705 -ADEPZ 5957N02905E", 'SHR': None},
+        {'Shr': "(SHR-X)", 'SHR': "(SHR-ZZZZZ\n-DOF/250102\nSID/777222)", 'Arr': "-ATA 1712"},
+    ]
+    table = {k: [r.get(k) for r in rows] for k in ('SHR', 'Shr', 'Dep', 'Arr')}
+    shr, dep, arr, center = batch_columns(table)
+    assert center is None and dep is table['Dep']              # a single matching header is passed through
+    batch = normalize_batch(shr, dep, arr, center)
+    expected = [normalize_row(r) for r in rows]
+    assert batch['flight_id'] == [e['flight_id'] for e in expected] == ['777111', '777222']
+    assert batch['start_lat'] == [e['start_lat'] for e in expected]
+    # raw_payload holds the parsed text under the canonical keys, in both paths
+    assert batch['raw_payload'] == [e['raw_payload'] for e in expected]
+    assert expected[0]['raw_payload'] == {'SHR': rows[0]['Shr'], 'DEP': rows[0]['Dep'], 'ARR': None, 'center': None}
+    assert list(batch_rows(batch)) == expected
@@ -0,0 +1,43 @@
+# tests/test_regions.py
+import json
+
+import pytest
+
+shapely = pytest.importorskip("shapely")
+from shapely.geometry import box  # noqa: E402
+
+from app.regions import RegionIndex  # noqa: E402
+
+
+def test_lookup_picks_containing_region_smallest_gid_on_overlap():
+    index = RegionIndex([(7, box(0, 0, 10, 10)), (3, box(5, 5, 20, 20)), (9, None)])
+    assert len(index) == 2
+    lons = [1.0, 6.0, 15.0, 50.0, None, 10.0]
+    lats = [1.0, 6.0, 15.0, 50.0, 1.0, 2.0]
+    # boundary points intersect, like ST_Intersects in load_from_staging.sql
+    assert index.lookup(lons, lats) == [7, 3, 3, None, None, 7]
+
+
+def test_geojson_export_feeds_the_runner(tmp_path):
+    import full_runner
+    path = tmp_path / "regions.geojson"
+    features = [{"type": "Feature", "properties": {"gid": 42, "name": "X"},
+                 "geometry": {"type": "Polygon", "coordinates": [[[29, 59], [30, 59], [30, 61], [29, 61], [29, 59]]]}}]
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}), encoding="utf-8")
+
+    full_runner.load_regions(str(path))
+    try:
+        text, _ = full_runner.parse_chunk(['(SHR-ZZZZZ\n-DEP/5957N02905E DOF/250201)', None],
+                                          ['-ATD 0705', '-ADEPZ 4409N04308E'], None, None)
+    finally:
+        full_runner.load_regions(None)
+    rows = [json.loads(line) for line in text.splitlines()]
+    assert [(r["start_region_id"], r["end_region_id"]) for r in rows] == [(42, 42), (None, None)]
+
+
+def test_request_tolerance_follows_zoom_unless_given():
+    from app.regions import request_tolerance
+    assert request_tolerance() == 0.0
+    assert request_tolerance(zoom=0) == 360.0 / 256
+    assert request_tolerance(zoom=10) == request_tolerance(zoom=9) / 2
+    assert request_tolerance(zoom=3, tolerance=0.01) == 0.01
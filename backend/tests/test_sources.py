@@ -0,0 +1,76 @@
+# tests/test_sources.py
+import json
+
+import pytest
+
+from app import sources
+
+
+def test_csv_batches_are_columnar_and_bounded(tmp_path):
+    path = tmp_path / "dump.csv"
+    lines = ["SHR,DEP,extra"] + [f'"(SHR-{i}\nDOF/250101)",-ATD 07{i:02d},x' for i in range(5)] + [",,"]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    batches = list(sources.iter_batches(str(path), batch_size=2))
+    assert [n for n, _ in batches] == [2, 2, 2]
+    shr, dep, arr, center = batches[0][1]
+    assert shr == ["(SHR-0\nDOF/250101)", "(SHR-1\nDOF/250101)"]
+    assert dep == ["-ATD 0700", "-ATD 0701"]
+    assert arr is None and center is None           # columns the file does not have
+    assert batches[-1][1][0] == ["(SHR-4\nDOF/250101)", None]
+
+
+def test_ndjson_batches_read_raw_payload(tmp_path):
+    path = tmp_path / "parsed.ndjson"
+    rows = [{"flight_id": "X", "raw_payload": {"SHR": "a", "DEP": "b", "ARR": None, "center": "c"}},
+            {"SHR": "d"}]
+    path.write_text("\n".join(json.dumps(r) for r in rows) + "\n\n", encoding="utf-8")
+    (n, cols), = sources.iter_batches(str(path), batch_size=10)
+    assert n == 2
+    assert cols == (["a", "d"], ["b", None], [None, None], ["c", None])
+
+
+def test_unknown_extension():
+    with pytest.raises(ValueError):
+        sources.iter_batches("dump.xls")
+
+
+def test_parquet_batches_read_raw_payload(tmp_path):
+    pytest.importorskip("pyarrow")
+    from app import columnar
+    from app.parser import normalize_batch
+
+    path = str(tmp_path / "parsed.parquet")
+    with columnar.ParquetBatchWriter(path) as w:
+        w.write_batch(normalize_batch(["(SHR-1)", "(SHR-2)"], ["-ATD 0705", None], None, ["c", None]))
+    (n, cols), = sources.iter_batches(path, batch_size=10)
+    assert n == 2
+    assert cols == (["(SHR-1)", "(SHR-2)"], ["-ATD 0705", None], [None, None], ["c", None])
+
+
+def test_alias_headers_feed_the_parser(tmp_path):
+    from app.parser import normalize_batch, normalize_row
+
+    shr = "(SHR-ZZZZZ\nDEP/5957N02905E DOF/250101\nSID/777111)"
+    path = tmp_path / "dump.csv"
+    path.write_text(f'Shr,Dep,Arr\n"{shr}",-ATD 0705,-ATA 0810\n', encoding="utf-8")
+    (n, cols), = sources.iter_batches(str(path))
+    assert cols == ([shr], ["-ATD 0705"], ["-ATA 0810"], None)
+    out = normalize_batch(*cols)
+    expected = normalize_row({"Shr": shr, "Dep": "-ATD 0705", "Arr": "-ATA 0810"})
+    assert out["flight_id"] == [expected["flight_id"]] == ["777111"]
+    assert out["start_lat"] == [expected["start_lat"]] and out["start_lat"][0] is not None
+
+
+def test_xlsx_alias_headers(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(["Shr", "SHR", "Dep", "Центр ЕС ОрВД"])
+    ws.append(["(SHR-A)", None, "-ATD 0705", "Москва"])
+    ws.append(["(SHR-B)", "(SHR-C)", None, None])
+    path = str(tmp_path / "dump.xlsx")
+    wb.save(path)
+    (n, cols), = sources.iter_batches(path)
+    # SHR is preferred, Shr fills its empty cells (normalize_row's order)
+    assert cols == (["(SHR-A)", "(SHR-C)"], ["-ATD 0705", None], None, ["Москва", None])
@@ -0,0 +1,158 @@
+# tests/test_uploads.py
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+
+from app import uploads
+
+
+def _reader(data: bytes):
+    buf = io.BytesIO(data)
+
+    async def read(n):
+        return buf.read(n)
+    return read
+
+
+def test_stream_to_file_hashes_in_chunks(tmp_path):
+    data = b'{"flight_id": "1"}\n' * 1000
+    dest = str(tmp_path / "up.ndjson")
+    res = asyncio.run(uploads.stream_to_file(_reader(data), dest, chunk_size=64))
+    assert res["size"] == len(data)
+    assert res["sha256"] == hashlib.sha256(data).hexdigest()
+    assert open(dest, "rb").read() == data
+    assert uploads.read_hash(dest) == res["sha256"]
+
+
+def test_stream_to_file_enforces_max_size(tmp_path):
+    dest = tmp_path / "big.ndjson"
+    with pytest.raises(uploads.UploadTooLarge):
+        asyncio.run(uploads.stream_to_file(_reader(b"x" * 100), str(dest), max_bytes=10, chunk_size=8))
+    assert not dest.exists()
+    assert os.listdir(tmp_path) == []               # temp file removed too
+
+
+def test_concurrent_uploads_to_one_path_do_not_share_a_temp_file(tmp_path):
+    dest = str(tmp_path / "up.ndjson")
+    started = []
+
+    def reader(data):
+        buf = io.BytesIO(data)
+
+        async def read(n):
+            started.append(data[:1])
+            await asyncio.sleep(0)      # interleave the two uploads chunk by chunk
+            return buf.read(n)
+        return read
+
+    async def both():
+        return await asyncio.gather(uploads.stream_to_file(reader(b"a" * 64), dest, chunk_size=8),
+                                    uploads.stream_to_file(reader(b"b" * 64), dest, chunk_size=8))
+
+    first, second = asyncio.run(both())
+    assert set(started) == {b"a", b"b"}
+    assert open(dest, "rb").read() in (b"a" * 64, b"b" * 64)     # one whole upload, never a mix
+    assert first["size"] == second["size"] == 64
+    assert sorted(os.listdir(tmp_path)) == ["up.ndjson", "up.ndjson.sha256"]
+
+
+async def _chunks(*parts):
+    for p in parts:
+        yield p
+
+
+def test_resumable_upload_roundtrip(tmp_path):
+    d = str(tmp_path)
+    data = b"line1\nline2\nline3\n"
+    meta = uploads.init_upload("export.ndjson", size=len(data), upload_dir=d)
+    uid = meta["upload_id"]
+
+    asyncio.run(uploads.append_part(uid, 0, _chunks(data[:5], data[5:8]), upload_dir=d))
+    assert uploads.upload_status(uid, upload_dir=d)["received"] == 8
+
+    # a retry from a stale offset is rejected with the offset to resume from
+    with pytest.raises(uploads.UploadOffsetMismatch) as exc:
+        asyncio.run(uploads.append_part(uid, 0, _chunks(data), upload_dir=d))
+    assert exc.value.expected == 8
+
+    asyncio.run(uploads.append_part(uid, 8, _chunks(data[8:]), upload_dir=d))
+    done = uploads.finalize_upload(uid, hashlib.sha256(data).hexdigest(), upload_dir=d)
+    assert done["status"] == "complete"
+    assert open(done["path"], "rb").read() == data
+    assert uploads.resolve_upload(uid, upload_dir=d) == done["path"]
+
+
+def test_finalize_rejects_incomplete_or_corrupt(tmp_path):
+    d = str(tmp_path)
+    uid = uploads.init_upload(size=4, upload_dir=d)["upload_id"]
+    asyncio.run(uploads.append_part(uid, 0, _chunks(b"ab"), upload_dir=d))
+    with pytest.raises(uploads.UploadError):
+        uploads.finalize_upload(uid, upload_dir=d)
+    asyncio.run(uploads.append_part(uid, 2, _chunks(b"cd"), upload_dir=d))
+    with pytest.raises(uploads.UploadError):
+        uploads.finalize_upload(uid, sha256="0" * 64, upload_dir=d)
+    with pytest.raises(uploads.UploadError):
+        uploads.resolve_upload(uid, upload_dir=d)
+
+
+def test_unknown_upload_id(tmp_path):
+    with pytest.raises(uploads.UploadNotFound):
+        uploads.upload_status("../../etc/passwd", upload_dir=str(tmp_path))
+
+
+def test_read_hash_ignores_stale_sidecar(tmp_path):
+    dest = tmp_path / "f.ndjson"
+    dest.write_bytes(b"{}\n")
+    uploads.write_hash(str(dest), "abc")
+    assert uploads.read_hash(str(dest)) == "abc"
+    sidecar = str(dest) + uploads.HASH_SUFFIX
+    os.utime(sidecar, (1, 1))                 # file changed after the hash was recorded
+    assert uploads.read_hash(str(dest)) is None
+
+
+def test_parts_wait_for_the_upload_lock_of_another_process(tmp_path):
+    fcntl = pytest.importorskip("fcntl")
+    d = str(tmp_path)
+    uid = uploads.init_upload(size=4, upload_dir=d)["upload_id"]
+    # an flock on a separate open file description, as another uvicorn worker would hold
+    fd = os.open(uploads._lock_path(uid, d), os.O_RDWR | os.O_CREAT)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+
+    async def scenario():
+        first = asyncio.ensure_future(uploads.append_part(uid, 0, _chunks(b"ab"), upload_dir=d))
+        second = asyncio.ensure_future(uploads.append_part(uid, 0, _chunks(b"xy"), upload_dir=d))
+        await asyncio.sleep(0.2)
+        assert not first.done() and not second.done()
+        assert uploads.upload_status(uid, upload_dir=d)["received"] == 0
+        os.close(fd)
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    first, second = asyncio.run(scenario())
+    # same offset: exactly one append wins, the other is told where to resume
+    assert first["received"] == 2 and isinstance(second, uploads.UploadOffsetMismatch)
+    assert open(os.path.join(d, uid + ".part"), "rb").read() == b"ab"
+
+    asyncio.run(uploads.append_part(uid, 2, _chunks(b"cd"), upload_dir=d))
+    assert uploads.finalize_upload(uid, upload_dir=d)["status"] == "complete"
+    assert not os.path.exists(uploads._lock_path(uid, d))
+
+
+def test_init_rejects_non_integer_size(tmp_path):
+    for size in ("10", 1.5, True, -1):
+        with pytest.raises(uploads.UploadError) as exc:
+            uploads.init_upload(size=size, upload_dir=str(tmp_path))
+        assert not isinstance(exc.value, uploads.UploadTooLarge)
+    with pytest.raises(uploads.UploadTooLarge):
+        uploads.init_upload(size=11, upload_dir=str(tmp_path), max_bytes=10)
+
+
+def test_part_locks_are_released_after_each_append(tmp_path):
+    d = str(tmp_path)
+    uid = uploads.init_upload(size=4, upload_dir=d)["upload_id"]
+    asyncio.run(uploads.append_part(uid, 0, _chunks(b"ab"), upload_dir=d))
+    with pytest.raises(uploads.UploadOffsetMismatch):
+        asyncio.run(uploads.append_part(uid, 0, _chunks(b"ab"), upload_dir=d))
+    assert uid not in uploads._locks          # an abandoned upload keeps no lock object
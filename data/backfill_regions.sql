@@ -0,0 +1,43 @@
+-- Обслуживание: геометрия и привязка к регионам по ВСЕЙ таблице flights.
+-- Для импорта не нужен (load_from_staging.sql заполняет это для новых строк сам);
+-- запускать вручную для старых строк, например после перезагрузки regions:
+--   docker compose exec db psql -U postgres -d gis -f /data/backfill_regions.sql
+
+-- 1) Обновляем геометрию для записей, где она не сформировалась
+UPDATE flights
+SET start_geom = ST_SetSRID(ST_Point(start_lon, start_lat),4326)
+WHERE start_geom IS NULL AND start_lat IS NOT NULL AND start_lon IS NOT NULL;
+
+UPDATE flights
+SET end_geom = ST_SetSRID(ST_Point(end_lon, end_lat),4326)
+WHERE end_geom IS NULL AND end_lat IS NOT NULL AND end_lon IS NOT NULL;
+
+-- 2) Привязка к регионам через ST_Intersects по кускам regions_subdivided (при перекрытии — меньший gid)
+UPDATE flights f
+SET start_region_id = m.gid
+FROM (
+  SELECT t.id, min(r.gid) AS gid
+  FROM flights t
+  JOIN regions_subdivided r ON ST_Intersects(r.geom, t.start_geom)
+  WHERE t.start_region_id IS NULL AND t.start_geom IS NOT NULL
+  GROUP BY t.id
+) m
+WHERE f.id = m.id;
+
+UPDATE flights f
+SET end_region_id = m.gid
+FROM (
+  SELECT t.id, min(r.gid) AS gid
+  FROM flights t
+  JOIN regions_subdivided r ON ST_Intersects(r.geom, t.end_geom)
+  WHERE t.end_region_id IS NULL AND t.end_geom IS NOT NULL
+  GROUP BY t.id
+) m
+WHERE f.id = m.id;
+
+-- 3) Быстрая проверка
+SELECT COUNT(*) AS total_flights FROM flights;
+SELECT COUNT(*) AS with_start_geom FROM flights WHERE start_geom IS NOT NULL;
+SELECT COUNT(*) AS with_end_geom FROM flights WHERE end_geom IS NOT NULL;
+SELECT COUNT(*) AS with_start_region FROM flights WHERE start_region_id IS NOT NULL;
+SELECT COUNT(*) AS with_end_region FROM flights WHERE end_region_id IS NOT NULL;
@@ -1,5 +1,8 @@
+-- Ближайший регион для точек, не попавших ни в один полигон (1000 строк за запуск).
+-- KNN (<->) по GiST-индексу кусков regions_subdivided: расстояние считается до небольшого
+-- куска, а не до всего мультиполигона.
 WITH to_update AS (
-  SELECT id
+  SELECT id, start_geom
   FROM flights
   WHERE start_geom IS NOT NULL AND start_region_id IS NULL
   LIMIT 1000
@@ -10,7 +13,7 @@ FROM (
   SELECT t.id, r.gid
   FROM to_update t
   JOIN LATERAL (
-    SELECT gid FROM public.regions ORDER BY geom <-> (SELECT geom FROM flights WHERE id = t.id) LIMIT 1
+    SELECT gid FROM public.regions_subdivided ORDER BY geom <-> t.start_geom, gid LIMIT 1
   ) r ON true
 ) sub
 WHERE f.id = sub.id;
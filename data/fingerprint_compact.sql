@@ -0,0 +1,22 @@
+-- Компактный fingerprint (разово, по желанию): flights.fingerprint TEXT (64 hex SHA-256)
+-- -> uuid из первых 16 байт того же SHA-256. Индекс по колонке в 2+ раза меньше,
+-- сравнения при ON CONFLICT / дедупликации — 16 байт вместо строки.
+-- Новые файлы можно сразу разбирать с FINGERPRINT_MODE=compact (32 hex), но
+-- flight_fingerprint() принимает и полные 64-символьные значения старых выгрузок.
+-- Индексы на fingerprint ALTER TYPE перестраивает сам. Требует migrations/007.
+--
+--   docker compose exec db psql -U postgres -d gis -f /data/fingerprint_compact.sql
+BEGIN;
+
+ALTER TABLE flights ALTER COLUMN fingerprint TYPE uuid
+  USING CASE WHEN fingerprint ~* '^[0-9a-f]{32}' THEN left(fingerprint, 32)::uuid END;
+
+DROP FUNCTION IF EXISTS flight_fingerprint(text);
+CREATE FUNCTION flight_fingerprint(fp text) RETURNS uuid
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$
+  SELECT CASE WHEN replace(fp, '-', '') ~* '^[0-9a-f]{32}' THEN left(replace(fp, '-', ''), 32)::uuid END
+$$;
+
+COMMIT;
+
+-- вернуть обратно нельзя: полные 64-символьные значения восстанавливаются только повторным разбором
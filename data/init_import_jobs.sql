@@ -6,5 +6,30 @@ CREATE TABLE IF NOT EXISTS import_jobs (
   created_at timestamptz DEFAULT now(),
   updated_at timestamptz DEFAULT now(),
   error text,
-  file_hash text
+  file_hash text,           -- SHA-256 содержимого (migrations/004_import_jobs_dedup.sql)
+  result jsonb,             -- статистика загрузчика успешной задачи
+  -- очередь (см. backend/app/jobqueue.py, migrations/002_import_jobs_queue.sql)
+  attempts integer NOT NULL DEFAULT 0,
+  max_attempts integer NOT NULL DEFAULT 3,
+  run_after timestamptz NOT NULL DEFAULT now(),
+  locked_by text,
+  heartbeat_at timestamptz,
+  started_at timestamptz,
+  finished_at timestamptz,
+  options jsonb NOT NULL DEFAULT '{}'::jsonb,
+  -- прогресс (migrations/003_import_jobs_progress.sql)
+  phase text,
+  bytes_total bigint,
+  bytes_read bigint,
+  lines_loaded bigint,
+  rows_inserted bigint,
+  rows_skipped bigint,
+  rows_failed bigint,
+  rows_per_sec double precision,
+  progress_at timestamptz,
+  progress_started_at timestamptz -- начало чтения файла (migrations/011_import_jobs_progress_started.sql)
 );
+
+CREATE INDEX IF NOT EXISTS idx_import_jobs_pending ON import_jobs (run_after, id) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_import_jobs_running ON import_jobs (heartbeat_at) WHERE status = 'running';
+CREATE INDEX IF NOT EXISTS idx_import_jobs_file_hash ON import_jobs (file_hash) WHERE file_hash IS NOT NULL;
@@ -1,80 +1,87 @@
--- 1) Создаем staging таблицу, если еще нет
-CREATE TABLE IF NOT EXISTS staging_raw (
-    raw jsonb
-);
+-- staging_raw -> flights. Выполняется ПОСЛЕ заполнения staging_raw:
+--   * из API: app/importer.py (COPY ... FROM STDIN + этот скрипт в одной транзакции);
+--   * вручную: load_staging.sql (\COPY через psql), затем этот файл.
+-- staging_raw здесь НЕ очищается (это делает загрузчик перед COPY) и не создаётся
+-- (см. schema.sql): при параллельном импорте каждое соединение подставляет
+-- свою временную staging_raw, и скрипт работает только с её строками.
+--
+-- Скрипт трогает только строки текущего импорта: геометрия и регионы считаются
+-- прямо в INSERT, полных проходов UPDATE по flights больше нет (старые строки
+-- без регионов/геометрии добиваются отдельно: backfill_regions.sql).
+-- Новые строки помечаются import_job_id из настройки сессии app.import_job_id
+-- (её ставит загрузчик; при ручном запуске остаётся NULL).
 
--- 2) Очищаем staging
-TRUNCATE staging_raw;
-
--- 3) ВНИМАНИЕ: для psycopg2 НЕ использовать \COPY.
--- Если хочешь вставить файл напрямую, делай это через Python (import_from_upload),
--- либо через psql:
---   docker compose exec db psql -U postgres -d gis -c "\COPY staging_raw(raw) FROM '/data/parsed.ndjson';"
-
--- 4) Вставка в flights с игнорированием дубликатов flight_id + start_time
-INSERT INTO flights (
-    flight_id,
-    uav_type,
-    start_time,
-    end_time,
-    duration_seconds,
-    start_geom,
-    end_geom,
-    start_lat,
-    start_lon,
-    end_lat,
-    end_lon,
-    fingerprint,
-    raw_payload
+-- 1) Вставка в flights с игнорированием дубликатов flight_id + start_time
+WITH src AS (
+    SELECT
+        (raw->>'flight_id')::text AS flight_id,
+        (raw->>'uav_type')::text AS uav_type,
+        CASE WHEN raw->>'start_time' IS NOT NULL THEN (raw->>'start_time')::timestamptz ELSE NULL END AS start_time,
+        CASE WHEN raw->>'end_time' IS NOT NULL THEN (raw->>'end_time')::timestamptz ELSE NULL END AS end_time,
+        CASE WHEN raw->>'duration_seconds' IS NOT NULL THEN (raw->>'duration_seconds')::int ELSE NULL END AS duration_seconds,
+        CASE WHEN raw->>'start_lon' IS NOT NULL AND raw->>'start_lat' IS NOT NULL
+             THEN ST_SetSRID(ST_Point((raw->>'start_lon')::double precision, (raw->>'start_lat')::double precision),4326)
+             ELSE NULL END AS start_geom,
+        CASE WHEN raw->>'end_lon' IS NOT NULL AND raw->>'end_lat' IS NOT NULL
+             THEN ST_SetSRID(ST_Point((raw->>'end_lon')::double precision, (raw->>'end_lat')::double precision),4326)
+             ELSE NULL END AS end_geom,
+        CASE WHEN raw->>'start_lat' IS NOT NULL THEN (raw->>'start_lat')::double precision ELSE NULL END AS start_lat,
+        CASE WHEN raw->>'start_lon' IS NOT NULL THEN (raw->>'start_lon')::double precision ELSE NULL END AS start_lon,
+        CASE WHEN raw->>'end_lat' IS NOT NULL THEN (raw->>'end_lat')::double precision ELSE NULL END AS end_lat,
+        CASE WHEN raw->>'end_lon' IS NOT NULL THEN (raw->>'end_lon')::double precision ELSE NULL END AS end_lon,
+        flight_fingerprint(raw->>'fingerprint') AS fingerprint,
+        NULLIF(raw->>'parser_version', '')::smallint AS parser_version,
+        NULLIF(raw->>'start_region_id', '')::int AS start_region_id,
+        NULLIF(raw->>'end_region_id', '')::int AS end_region_id,
+        raw AS raw_payload
+    FROM staging_raw
+),
+ins AS (
+    INSERT INTO flights (
+        flight_id,
+        uav_type,
+        start_time,
+        end_time,
+        duration_seconds,
+        start_geom,
+        end_geom,
+        start_lat,
+        start_lon,
+        end_lat,
+        end_lon,
+        fingerprint,
+        raw_payload,
+        parser_version,
+        start_region_id,
+        end_region_id,
+        import_job_id
+    )
+    SELECT
+        s.flight_id,
+        s.uav_type,
+        s.start_time,
+        s.end_time,
+        s.duration_seconds,
+        s.start_geom,
+        s.end_geom,
+        s.start_lat,
+        s.start_lon,
+        s.end_lat,
+        s.end_lon,
+        s.fingerprint,
+        s.raw_payload,
+        s.parser_version,
+        -- 2) Привязка к регионам: id уже посчитаны парсером (full_runner.py --regions, app/regions.py),
+        --    иначе ST_Intersects по кускам regions_subdivided (GiST); COALESCE не выполняет подзапрос, если id есть
+--    при перекрытии/точке на общей границе — меньший gid, как везде (app/regions.py, assign_regions, region_at)
+        COALESCE(s.start_region_id,
+                 (SELECT min(r.gid) FROM regions_subdivided r WHERE s.start_geom IS NOT NULL AND ST_Intersects(r.geom, s.start_geom))),
+        COALESCE(s.end_region_id,
+                 (SELECT min(r.gid) FROM regions_subdivided r WHERE s.end_geom IS NOT NULL AND ST_Intersects(r.geom, s.end_geom))),
+        NULLIF(current_setting('app.import_job_id', true), '')::int
+    FROM src s
+    ON CONFLICT (flight_id, start_time) DO NOTHING
+    RETURNING id
 )
-SELECT
-    (raw->>'flight_id')::text AS flight_id,
-    (raw->>'uav_type')::text AS uav_type,
-    CASE WHEN raw->>'start_time' IS NOT NULL THEN (raw->>'start_time')::timestamptz ELSE NULL END AS start_time,
-    CASE WHEN raw->>'end_time' IS NOT NULL THEN (raw->>'end_time')::timestamptz ELSE NULL END AS end_time,
-    CASE WHEN raw->>'duration_seconds' IS NOT NULL THEN (raw->>'duration_seconds')::int ELSE NULL END AS duration_seconds,
-    CASE WHEN raw->>'start_lon' IS NOT NULL AND raw->>'start_lat' IS NOT NULL
-         THEN ST_SetSRID(ST_Point((raw->>'start_lon')::double precision, (raw->>'start_lat')::double precision),4326)
-         ELSE NULL END AS start_geom,
-    CASE WHEN raw->>'end_lon' IS NOT NULL AND raw->>'end_lat' IS NOT NULL
-         THEN ST_SetSRID(ST_Point((raw->>'end_lon')::double precision, (raw->>'end_lat')::double precision),4326)
-         ELSE NULL END AS end_geom,
-    CASE WHEN raw->>'start_lat' IS NOT NULL THEN (raw->>'start_lat')::double precision ELSE NULL END AS start_lat,
-    CASE WHEN raw->>'start_lon' IS NOT NULL THEN (raw->>'start_lon')::double precision ELSE NULL END AS start_lon,
-    CASE WHEN raw->>'end_lat' IS NOT NULL THEN (raw->>'end_lat')::double precision ELSE NULL END AS end_lat,
-    CASE WHEN raw->>'end_lon' IS NOT NULL THEN (raw->>'end_lon')::double precision ELSE NULL END AS end_lon,
-    (raw->>'fingerprint')::text AS fingerprint,
-    raw AS raw_payload
-FROM staging_raw
-ON CONFLICT (flight_id, start_time) DO NOTHING;
-
--- 5) Обновляем геометрию для записей, где она не сформировалась
-UPDATE flights
-SET start_geom = ST_SetSRID(ST_Point(start_lon, start_lat),4326)
-WHERE start_geom IS NULL AND start_lat IS NOT NULL AND start_lon IS NOT NULL;
-
-UPDATE flights
-SET end_geom = ST_SetSRID(ST_Point(end_lon, end_lat),4326)
-WHERE end_geom IS NULL AND end_lat IS NOT NULL AND end_lon IS NOT NULL;
-
--- 6) Привязка к регионам через ST_Within
-UPDATE flights f
-SET start_region_id = r.gid
-FROM regions r
-WHERE f.start_region_id IS NULL
-  AND f.start_geom IS NOT NULL
-  AND ST_Intersects(r.geom, f.start_geom);
-
-UPDATE flights f
-SET end_region_id = r.gid
-FROM regions r
-WHERE f.end_region_id IS NULL
-  AND f.end_geom IS NOT NULL
-  AND ST_Intersects(r.geom, f.end_geom);
-
--- 7) Быстрая проверка
-SELECT COUNT(*) AS total_flights FROM flights;
-SELECT COUNT(*) AS with_start_geom FROM flights WHERE start_geom IS NOT NULL;
-SELECT COUNT(*) AS with_end_geom FROM flights WHERE end_geom IS NOT NULL;
-SELECT COUNT(*) AS with_start_region FROM flights WHERE start_region_id IS NOT NULL;
-SELECT COUNT(*) AS with_end_region FROM flights WHERE end_region_id IS NOT NULL;
+-- 3) Итог импорта: сколько строк вставлено и диапазон новых id
+SELECT COUNT(*) AS inserted, MIN(id) AS first_id, MAX(id) AS last_id FROM ins;
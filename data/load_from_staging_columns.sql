@@ -0,0 +1,60 @@
+-- staging_flights -> flights: вариант load_from_staging.sql для Parquet-выгрузки парсера
+-- (full_runner.py --out parsed.parquet). staging_flights — временная таблица с уже
+-- типизированными колонками (её создаёт и заполняет app/importer.py через COPY),
+-- поэтому из jsonb здесь ничего не разбирается: raw_payload только сохраняется.
+-- Регионы (id из парсера или ST_Intersects), import_job_id и итоговый SELECT — как в load_from_staging.sql.
+
+WITH src AS (
+    SELECT
+        s.*,
+        CASE WHEN s.start_lon IS NOT NULL AND s.start_lat IS NOT NULL
+             THEN ST_SetSRID(ST_Point(s.start_lon, s.start_lat), 4326) ELSE NULL END AS start_geom,
+        CASE WHEN s.end_lon IS NOT NULL AND s.end_lat IS NOT NULL
+             THEN ST_SetSRID(ST_Point(s.end_lon, s.end_lat), 4326) ELSE NULL END AS end_geom
+    FROM staging_flights s
+),
+ins AS (
+    INSERT INTO flights (
+        flight_id,
+        uav_type,
+        start_time,
+        end_time,
+        duration_seconds,
+        start_geom,
+        end_geom,
+        start_lat,
+        start_lon,
+        end_lat,
+        end_lon,
+        fingerprint,
+        raw_payload,
+        parser_version,
+        start_region_id,
+        end_region_id,
+        import_job_id
+    )
+    SELECT
+        s.flight_id,
+        s.uav_type,
+        s.start_time,
+        s.end_time,
+        s.duration_seconds,
+        s.start_geom,
+        s.end_geom,
+        s.start_lat,
+        s.start_lon,
+        s.end_lat,
+        s.end_lon,
+        flight_fingerprint(s.fingerprint),
+        s.raw_payload,
+        s.parser_version,
+        COALESCE(s.start_region_id,
+                 (SELECT min(r.gid) FROM regions_subdivided r WHERE s.start_geom IS NOT NULL AND ST_Intersects(r.geom, s.start_geom))),
+        COALESCE(s.end_region_id,
+                 (SELECT min(r.gid) FROM regions_subdivided r WHERE s.end_geom IS NOT NULL AND ST_Intersects(r.geom, s.end_geom))),
+        NULLIF(current_setting('app.import_job_id', true), '')::int
+    FROM src s
+    ON CONFLICT (flight_id, start_time) DO NOTHING
+    RETURNING id
+)
+SELECT COUNT(*) AS inserted, MIN(id) AS first_id, MAX(id) AS last_id FROM ins;
@@ -0,0 +1,4 @@
+-- Метка импорта на строках flights: какой import_jobs.id их вставил.
+-- Нужна, чтобы пост-обработка импорта трогала только новые строки.
+ALTER TABLE flights ADD COLUMN IF NOT EXISTS import_job_id INTEGER;
+CREATE INDEX IF NOT EXISTS idx_flights_import_job_id ON flights (import_job_id) WHERE import_job_id IS NOT NULL;
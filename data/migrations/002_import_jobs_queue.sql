@@ -0,0 +1,15 @@
+-- Очередь импорта на import_jobs: задачи берут отдельные процессы-воркеры
+-- (python -m app.worker) через FOR UPDATE SKIP LOCKED, с повторами и heartbeat.
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS max_attempts INTEGER NOT NULL DEFAULT 3;
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS run_after timestamptz NOT NULL DEFAULT now();
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS locked_by text;
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS heartbeat_at timestamptz;
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS started_at timestamptz;
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS finished_at timestamptz;
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS options jsonb NOT NULL DEFAULT '{}'::jsonb;
+
+-- выборка следующей задачи воркером
+CREATE INDEX IF NOT EXISTS idx_import_jobs_pending ON import_jobs (run_after, id) WHERE status = 'pending';
+-- поиск зависших задач (recover_stale)
+CREATE INDEX IF NOT EXISTS idx_import_jobs_running ON import_jobs (heartbeat_at) WHERE status = 'running';
@@ -0,0 +1,12 @@
+-- Прогресс импорта в import_jobs: пишется загрузчиком по ходу работы
+-- (jobqueue.ProgressReporter, отдельным соединением), читается GET /api/v1/job/{id}
+-- и SSE-потоком /api/v1/job/{id}/events.
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS phase text;            -- queued, copy | load, transform, commit, done
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS bytes_total bigint;
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS bytes_read bigint;
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS lines_loaded bigint;   -- строк попало в staging_raw
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS rows_inserted bigint;  -- вставлено во flights
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS rows_skipped bigint;   -- дубликаты (ON CONFLICT)
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS rows_failed bigint;    -- битые строки (IMPORT_VALIDATE_JSON=1)
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS rows_per_sec double precision;
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS progress_at timestamptz;
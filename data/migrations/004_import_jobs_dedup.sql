@@ -0,0 +1,5 @@
+-- Повторный импорт того же файла: import_jobs.file_hash (SHA-256 содержимого)
+-- заполняется при постановке задачи/воркером, итог загрузки хранится в result,
+-- задача с уже импортированным содержимым сразу возвращает прежний результат.
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS result jsonb;
+CREATE INDEX IF NOT EXISTS idx_import_jobs_file_hash ON import_jobs (file_hash) WHERE file_hash IS NOT NULL;
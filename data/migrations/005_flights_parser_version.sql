@@ -0,0 +1,5 @@
+-- Версия парсера (app.parser.PARSER_VERSION), разобравшего строку flights.
+-- NULL — строка загружена до появления версии и считается разобранной версией 0.
+-- data/reparse_and_fill.py повторно разбирает только строки со старой версией.
+ALTER TABLE flights ADD COLUMN IF NOT EXISTS parser_version SMALLINT;
+CREATE INDEX IF NOT EXISTS idx_flights_parser_version ON flights ((COALESCE(parser_version, 0)));
@@ -0,0 +1,3 @@
+-- Индекс по flights.fingerprint: reparse_and_fill.py снимает конфликты fingerprint
+-- одним join-ом пачки с flights (вместо NOT EXISTS на каждую строку).
+CREATE INDEX IF NOT EXISTS idx_flights_fingerprint ON flights (fingerprint);
@@ -0,0 +1,6 @@
+-- flight_fingerprint(text): значение fingerprint парсера -> значение колонки flights.fingerprint.
+-- Все загрузчики пишут fingerprint через эту функцию. Пока колонка TEXT — это тождество;
+-- data/fingerprint_compact.sql переводит колонку в uuid (первые 16 байт SHA-256)
+-- и заменяет функцию, загрузчики при этом не меняются.
+CREATE OR REPLACE FUNCTION flight_fingerprint(fp text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ SELECT fp $$;
@@ -0,0 +1,30 @@
+-- regions_subdivided: полигоны regions, порезанные ST_Subdivide на куски не больше
+-- max_vertices вершин, с GiST-индексом. Точка-в-полигоне проверяется против небольшого
+-- куска, а не всего мультиполигона региона (тысячи вершин), и bbox кусков плотнее —
+-- индекс отсекает почти всё. Все запросы привязки к регионам ходят сюда; id — regions.gid.
+-- Пересобирается refresh_regions_subdivided() (её вызывает backend/load_shapefile.py).
+CREATE TABLE IF NOT EXISTS regions_subdivided (
+  id bigserial PRIMARY KEY,
+  gid integer NOT NULL,
+  geom geometry(Geometry, 4326) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_regions_subdivided_geom ON regions_subdivided USING GIST (geom);
+CREATE INDEX IF NOT EXISTS idx_regions_subdivided_gid ON regions_subdivided (gid);
+
+CREATE OR REPLACE FUNCTION refresh_regions_subdivided(max_vertices integer DEFAULT 256) RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+  n integer;
+BEGIN
+  TRUNCATE regions_subdivided;
+  INSERT INTO regions_subdivided (gid, geom)
+  SELECT r.gid, ST_Subdivide(ST_MakeValid(r.geom), max_vertices)
+  FROM public.regions r
+  WHERE r.geom IS NOT NULL;
+  GET DIAGNOSTICS n = ROW_COUNT;
+  ANALYZE regions_subdivided;
+  RETURN n;
+END
+$$;
+
+SELECT refresh_regions_subdivided();
@@ -0,0 +1,29 @@
+-- region_at(point): gid региона, в который попадает точка (по regions_subdivided,
+-- при перекрытии — меньший gid, как в app/regions.py и app/assign_regions.py), иначе NULL.
+-- flights_resolve_regions(): триггерная функция, проставляет start_region_id/end_region_id
+-- в том же INSERT/UPDATE, если id не передан, а геометрия есть (или изменилась).
+-- Сам триггер не создаётся: включается по желанию data/region_trigger.sql
+-- (замер накладных расходов — backend/benchmarks/bench_region_trigger.py).
+CREATE OR REPLACE FUNCTION region_at(pt geometry) RETURNS integer
+LANGUAGE sql STABLE PARALLEL SAFE AS $$
+  SELECT min(r.gid) FROM public.regions_subdivided r WHERE ST_Intersects(r.geom, pt)
+$$;
+
+CREATE OR REPLACE FUNCTION flights_resolve_regions() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF NEW.start_geom IS NOT NULL AND (
+       NEW.start_region_id IS NULL
+       OR (TG_OP = 'UPDATE' AND NEW.start_geom IS DISTINCT FROM OLD.start_geom
+           AND NEW.start_region_id IS NOT DISTINCT FROM OLD.start_region_id)) THEN
+    NEW.start_region_id := region_at(NEW.start_geom);
+  END IF;
+  IF NEW.end_geom IS NOT NULL AND (
+       NEW.end_region_id IS NULL
+       OR (TG_OP = 'UPDATE' AND NEW.end_geom IS DISTINCT FROM OLD.end_geom
+           AND NEW.end_region_id IS NOT DISTINCT FROM OLD.end_region_id)) THEN
+    NEW.end_region_id := region_at(NEW.end_geom);
+  END IF;
+  RETURN NEW;
+END
+$$;
@@ -0,0 +1,43 @@
+-- regions_simplified: регионы, упрощённые ST_SimplifyPreserveTopology на нескольких допусках
+-- (в градусах; 0 — исходная геометрия), с готовым JSON-элементом ответа /api/v1/regions
+-- ({"gid", "name", "geojson"}) в колонке feature. API выбирает уровень по zoom/tolerance и
+-- отдаёт эти строки как есть — без ST_AsGeoJSON на запрос и без json.loads/dumps в Python.
+-- Число знаков координат в GeoJSON соответствует допуску уровня.
+-- Регионы упрощаются независимо, на грубых уровнях у соседей возможны щели/наложения по границе.
+-- Пересобирается refresh_regions_simplified() (её вызывает backend/load_shapefile.py).
+CREATE TABLE IF NOT EXISTS regions_simplified (
+  tolerance double precision NOT NULL,
+  gid integer NOT NULL,
+  name text,
+  feature text NOT NULL,
+  PRIMARY KEY (tolerance, gid)
+);
+CREATE INDEX IF NOT EXISTS idx_regions_simplified_name ON regions_simplified (tolerance, name);
+
+CREATE OR REPLACE FUNCTION refresh_regions_simplified(
+  tolerances double precision[] DEFAULT ARRAY[0, 0.0005, 0.002, 0.01, 0.05, 0.2]
+) RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+  n integer;
+BEGIN
+  TRUNCATE regions_simplified;
+  INSERT INTO regions_simplified (tolerance, gid, name, feature)
+  SELECT t.tol, r.gid, r.name,
+         json_build_object(
+           'gid', r.gid,
+           'name', r.name,
+           'geojson', ST_AsGeoJSON(
+              CASE WHEN t.tol > 0 THEN ST_SimplifyPreserveTopology(r.geom, t.tol) ELSE r.geom END,
+              CASE WHEN t.tol > 0 THEN greatest(1, ceil(-log(t.tol))::int + 1) ELSE 9 END)::json
+         )::text
+  FROM public.regions r
+  CROSS JOIN unnest(tolerances) AS t(tol)
+  WHERE r.geom IS NOT NULL;
+  GET DIAGNOSTICS n = ROW_COUNT;
+  ANALYZE regions_simplified;
+  RETURN n;
+END
+$$;
+
+SELECT refresh_regions_simplified();
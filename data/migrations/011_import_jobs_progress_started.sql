@@ -0,0 +1,4 @@
+-- Момент начала чтения файла текущей попыткой (jobqueue.ProgressReporter.start).
+-- started_at ставит claim(), до подсчёта SHA-256 файла воркером, поэтому оценка
+-- eta_seconds по started_at учитывала бы хэширование как время загрузки.
+ALTER TABLE import_jobs ADD COLUMN IF NOT EXISTS progress_started_at timestamptz;
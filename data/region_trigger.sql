@@ -0,0 +1,15 @@
+-- Привязка к регионам триггером (по желанию): start_region_id/end_region_id заполняются
+-- в том же INSERT/UPDATE, что пишет start_geom/end_geom, — новые строки сразу видны в
+-- /api/v1/top-regions, даже если их вставил не load_from_staging*.sql (bulk_insert.py,
+-- ручные INSERT, reparse_and_fill.py). Цена — поиск по GiST на каждую строку без id;
+-- сравнить с проходом python -m app.assign_regions: backend/benchmarks/bench_region_trigger.py.
+-- Если id уже передан (загрузчики считают его сами), триггер его не трогает.
+-- Требует migrations/008 и 009.
+--
+--   docker compose exec db psql -U postgres -d gis -f /data/region_trigger.sql
+--
+-- Выключить:  DROP TRIGGER IF EXISTS trg_flights_resolve_regions ON flights;
+DROP TRIGGER IF EXISTS trg_flights_resolve_regions ON flights;
+CREATE TRIGGER trg_flights_resolve_regions
+  BEFORE INSERT OR UPDATE OF start_geom, end_geom ON flights
+  FOR EACH ROW EXECUTE FUNCTION flights_resolve_regions();
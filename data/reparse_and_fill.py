@@ -1,23 +1,49 @@
 # data/reparse_and_fill.py
+"""
+Повторный разбор raw_payload строк flights текущим парсером.
+
+Берутся только строки, разобранные более старой версией парсера
+(flights.parser_version < app.parser.PARSER_VERSION, NULL = 0), и по умолчанию
+только те, где нет start_geom/end_geom; --all — все строки старой версии.
+Каждой обработанной строке ставится текущая версия, даже если значения не
+изменились: неразбираемые строки не перебираются при каждом запуске, а только
+после следующего изменения парсера.
+
+    python reparse_and_fill.py              # обновить
+    python reparse_and_fill.py --dry-run    # только посчитать, сколько строк изменится
+    python reparse_and_fill.py --workers 8 --batch 10000
+
+Конвейер: строки читаются серверным курсором (по id), пачки разбираются пулом
+процессов (в работе не больше 2*workers пачек), а запись идёт в отдельном потоке
+через одно постоянное соединение: COPY пачки во временную таблицу, конфликты
+fingerprint снимаются одним запросом на всю пачку, затем один UPDATE ... FROM.
+Каждая пачка коммитится сама: прерванный запуск можно просто повторить.
+"""
+import io
 import json
 import math
+import time
+import argparse
+import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Any, List, Tuple, Optional
 import psycopg2
-from psycopg2.extras import execute_values
 import sys
 import os
 import traceback
 
-DSN = "host=host.docker.internal dbname=gis user=postgres password=postgres port=5432"
-BATCH = 500
+DSN = os.environ.get("REPARSE_DSN", "host=host.docker.internal dbname=gis user=postgres password=postgres port=5432")
+BATCH = int(os.environ.get("REPARSE_BATCH", "5000"))
+WORKERS = int(os.environ.get("REPARSE_WORKERS", str(os.cpu_count() or 1)))
 ERROR_LOG = os.path.join(os.path.dirname(__file__), "reparse_errors.log")
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
 try:
-    from app.parser import normalize_row
+    from app.parser import normalize_row, fingerprint_key, PARSER_VERSION
 except Exception:
     try:
-        from parser import normalize_row
+        from parser import normalize_row, fingerprint_key, PARSER_VERSION
     except Exception as e:
         print("Не удалось импортировать normalize_row из parser. Проверь путь. Ошибка:", e)
         raise
@@ -52,130 +78,281 @@ def log_error(msg: str):
     except Exception:
         pass
 
-def process_batch(rows: List[Tuple[int, str]]) -> int:
-    updates = []
-    for id_, raw_text in rows:
-        try:
-            if not raw_text:
-                raw_obj = {}
-            else:
-                raw_obj = json.loads(raw_text) if isinstance(raw_text, str) else raw_text
-                if not isinstance(raw_obj, dict):
-                    raw_obj = {}
-        except Exception as e:
-            log_error(f"[PARSE_JSON_ERROR] id={id_} err={e} snippet={str(raw_text)[:300]}")
-            raw_obj = {}
+SELECT_SQL = """
+    SELECT id, raw_payload::text, start_lat, start_lon, end_lat, end_lon, start_time, end_time, fingerprint
+    FROM flights
+    WHERE COALESCE(parser_version, 0) < %(version)s
+      AND (%(all)s OR start_geom IS NULL OR end_geom IS NULL)
+    ORDER BY id
+"""
 
-        sample_row = {
-            'SHR': raw_obj.get('SHR') if isinstance(raw_obj, dict) else None,
-            'DEP': raw_obj.get('DEP') if isinstance(raw_obj, dict) else None,
-            'ARR': raw_obj.get('ARR') if isinstance(raw_obj, dict) else None,
-            'center': raw_obj.get('center') if isinstance(raw_obj, dict) else None
-        }
+# поля, которые UPDATE может поменять; stored-значения идут в том же порядке после id, raw_payload
+CHANGE_FIELDS = ('start_lat', 'start_lon', 'end_lat', 'end_lon', 'start_time', 'end_time', 'fingerprint')
 
-        try:
-            parsed = normalize_row(sample_row) or {}
-        except Exception as e:
-            msg = f"[NORMALIZE_ERROR] id={id_} err={e} row_snippet={str(sample_row)[:400]}"
-            print(msg)
-            log_error(msg)
-            log_error(traceback.format_exc())
-            parsed = {}
+def as_datetime(v: Optional[str]) -> Optional[datetime.datetime]:
+    if not v:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(v.replace('Z', '+00:00'))
+    except ValueError:
+        return None
 
-        start_lat = as_float(parsed.get('start_lat'))
-        start_lon = as_float(parsed.get('start_lon'))
-        end_lat = as_float(parsed.get('end_lat'))
-        end_lon = as_float(parsed.get('end_lon'))
-        start_time = as_text_or_none(parsed.get('start_time'))
-        end_time = as_text_or_none(parsed.get('end_time'))
-        fingerprint = as_text_or_none(parsed.get('fingerprint'))
+def changed_fields(stored: tuple, new: tuple) -> List[str]:
+    """Какие поля UPDATE действительно изменит: новое значение есть (COALESCE) и отличается от старого."""
+    out = []
+    for name, old, value in zip(CHANGE_FIELDS, stored, new):
+        if value is None:
+            continue
+        if name in ('start_time', 'end_time'):
+            value = as_datetime(value)
+            if value is None:
+                continue
+        if isinstance(value, float) and old is not None:
+            if abs(value - float(old)) > 1e-9:
+                out.append(name)
+        elif name == 'fingerprint':
+            # колонка может быть uuid (fingerprint_compact.sql): сравниваем 16-байтные ключи
+            if fingerprint_key(value) != fingerprint_key(str(old) if old is not None else None):
+                out.append(name)
+        elif value != old:
+            out.append(name)
+    return out
 
-        updates.append((start_lat, start_lon, end_lat, end_lon, start_time, end_time, fingerprint, id_))
+def reparse(id_: int, raw_text) -> tuple:
+    """raw_payload -> значения CHANGE_FIELDS текущего парсера."""
+    try:
+        if not raw_text:
+            raw_obj = {}
+        else:
+            raw_obj = json.loads(raw_text) if isinstance(raw_text, str) else raw_text
+            if not isinstance(raw_obj, dict):
+                raw_obj = {}
+    except Exception as e:
+        log_error(f"[PARSE_JSON_ERROR] id={id_} err={e} snippet={str(raw_text)[:300]}")
+        raw_obj = {}
 
-    if not updates:
-        return 0
+    # NDJSON-импорт хранит всю разобранную строку, исходные блоки — во вложенном raw_payload
+    if isinstance(raw_obj.get('raw_payload'), dict):
+        raw_obj = raw_obj['raw_payload']
+    sample_row = {
+        'SHR': raw_obj.get('SHR'),
+        'DEP': raw_obj.get('DEP'),
+        'ARR': raw_obj.get('ARR'),
+        'center': raw_obj.get('center')
+    }
 
-    conn = None
-    cur = None
     try:
-        conn = psycopg2.connect(DSN)
-        cur = conn.cursor()
-        # ВАЖНО: здесь мы записываем fingerprint только если в таблице flights
-        # ещё нет строки с таким fingerprint. Иначе оставляем старый fingerprint.
-        sql = """
-        WITH v(start_lat, start_lon, end_lat, end_lon, start_time, end_time, fingerprint, id) AS (VALUES %s)
-        UPDATE flights f
-        SET
-          start_lat = COALESCE(NULLIF(v.start_lat, '')::double precision, f.start_lat),
-          start_lon = COALESCE(NULLIF(v.start_lon, '')::double precision, f.start_lon),
-          end_lat = COALESCE(NULLIF(v.end_lat, '')::double precision, f.end_lat),
-          end_lon = COALESCE(NULLIF(v.end_lon, '')::double precision, f.end_lon),
-          start_time = COALESCE(NULLIF(v.start_time, '')::timestamptz, f.start_time),
-          end_time = COALESCE(NULLIF(v.end_time, '')::timestamptz, f.end_time),
-          fingerprint = CASE
-                          WHEN v.fingerprint IS NULL THEN f.fingerprint
-                          WHEN NOT EXISTS (SELECT 1 FROM flights f2 WHERE f2.fingerprint = v.fingerprint) THEN v.fingerprint
-                          ELSE f.fingerprint
-                        END,
-          start_geom = CASE
-                         WHEN v.start_lat IS NOT NULL AND v.start_lon IS NOT NULL
-                         THEN ST_SetSRID(ST_MakePoint((v.start_lon)::double precision, (v.start_lat)::double precision), 4326)
-                         ELSE f.start_geom
-                       END,
-          end_geom = CASE
-                       WHEN v.end_lat IS NOT NULL AND v.end_lon IS NOT NULL
-                       THEN ST_SetSRID(ST_MakePoint((v.end_lon)::double precision, (v.end_lat)::double precision), 4326)
-                       ELSE f.end_geom
-                     END
-        FROM v
-        WHERE f.id = v.id;
-        """
-        execute_values(cur, sql, updates, template="(%s,%s,%s,%s,%s,%s,%s,%s)")
-        conn.commit()
-        return len(updates)
+        parsed = normalize_row(sample_row) or {}
     except Exception as e:
-        if conn:
-            conn.rollback()
-        msg = f"[ERROR] process_batch failed: {e}"
+        msg = f"[NORMALIZE_ERROR] id={id_} err={e} row_snippet={str(sample_row)[:400]}"
         print(msg)
         log_error(msg)
         log_error(traceback.format_exc())
-        return 0
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
+        parsed = {}
+
+    return (
+        as_float(parsed.get('start_lat')),
+        as_float(parsed.get('start_lon')),
+        as_float(parsed.get('end_lat')),
+        as_float(parsed.get('end_lon')),
+        as_text_or_none(parsed.get('start_time')),
+        as_text_or_none(parsed.get('end_time')),
+        as_text_or_none(parsed.get('fingerprint')),
+    )
+
+def new_stats() -> dict:
+    return {'scanned': 0, 'changed': 0, 'fields': {}}
+
+def merge_stats(total: dict, part: dict):
+    total['scanned'] += part['scanned']
+    total['changed'] += part['changed']
+    for name, n in part['fields'].items():
+        total['fields'][name] = total['fields'].get(name, 0) + n
+
+def parse_batch(rows: List[tuple]) -> Tuple[list, dict]:
+    """
+    rows: (id, raw_payload, *stored CHANGE_FIELDS) -> (строки для записи, статистика изменений).
+    Выполняется в процессах пула.
+    """
+    updates = []
+    stats = new_stats()
+    for id_, raw_text, *stored in rows:
+        values = reparse(id_, raw_text)
+        changed = changed_fields(tuple(stored), values)
+        stats['scanned'] += 1
+        if changed:
+            stats['changed'] += 1
+            for name in changed:
+                stats['fields'][name] = stats['fields'].get(name, 0) + 1
+        updates.append(values + (PARSER_VERSION, id_))
+    return updates, stats
+
+def parsed_batches(batches, workers: int = 1, max_inflight: int = None):
+    """Результаты parse_batch в исходном порядке; при workers > 1 — пулом процессов, не больше max_inflight пачек в работе."""
+    if workers <= 1:
+        for rows in batches:
+            yield parse_batch(rows)
+        return
+    max_inflight = max_inflight or 2 * workers
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for rows in batches:
+            pending.append(pool.submit(parse_batch, rows))
+            while len(pending) >= max_inflight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+# -----------------------
+# writer: одно соединение на весь запуск
+# -----------------------
+UPDATE_COLUMNS = CHANGE_FIELDS + ('parser_version', 'id')
+
+STAGE_DDL = """
+CREATE TEMP TABLE reparse_updates (
+  start_lat double precision, start_lon double precision, end_lat double precision, end_lon double precision,
+  start_time timestamptz, end_time timestamptz, fingerprint text, parser_version smallint, id int
+) ON COMMIT DELETE ROWS
+"""
+
+# fingerprint пишем только если в flights ещё нет другой строки с таким fingerprint
+# и он первый (по id) среди строк пачки; иначе строка сохраняет старый.
+# Один hash/merge join пачки с индексом flights.fingerprint вместо подзапроса на каждую строку.
+RESOLVE_FINGERPRINTS_SQL = """
+UPDATE reparse_updates u SET fingerprint = NULL
+FROM (
+  SELECT u.id FROM reparse_updates u
+  JOIN flights f ON f.fingerprint = flight_fingerprint(u.fingerprint) AND f.id <> u.id
+  UNION
+  SELECT d.id FROM (
+    SELECT id, row_number() OVER (PARTITION BY flight_fingerprint(fingerprint) ORDER BY id) AS rn
+    FROM reparse_updates WHERE fingerprint IS NOT NULL
+  ) d WHERE d.rn > 1
+) c
+WHERE u.id = c.id
+"""
+
+UPDATE_SQL = """
+UPDATE flights f
+SET
+  start_lat = COALESCE(v.start_lat, f.start_lat),
+  start_lon = COALESCE(v.start_lon, f.start_lon),
+  end_lat = COALESCE(v.end_lat, f.end_lat),
+  end_lon = COALESCE(v.end_lon, f.end_lon),
+  start_time = COALESCE(v.start_time, f.start_time),
+  end_time = COALESCE(v.end_time, f.end_time),
+  fingerprint = COALESCE(flight_fingerprint(v.fingerprint), f.fingerprint),
+  start_geom = CASE
+                 WHEN v.start_lat IS NOT NULL AND v.start_lon IS NOT NULL
+                 THEN ST_SetSRID(ST_MakePoint(v.start_lon, v.start_lat), 4326)
+                 ELSE f.start_geom
+               END,
+  end_geom = CASE
+               WHEN v.end_lat IS NOT NULL AND v.end_lon IS NOT NULL
+               THEN ST_SetSRID(ST_MakePoint(v.end_lon, v.end_lat), 4326)
+               ELSE f.end_geom
+             END,
+  parser_version = v.parser_version
+FROM reparse_updates v
+WHERE f.id = v.id
+"""
 
-def stream_rows_and_update():
+def copy_text(updates: list) -> io.StringIO:
+    # значения — числа, ISO-время и hex, экранировать в COPY text нечего
+    return io.StringIO("".join(
+        "\t".join("\\N" if v is None else str(v) for v in row) + "\n" for row in updates))
+
+class Writer:
+    """Постоянное соединение для записи пачек; ошибка пачки логируется, её строки подберёт следующий запуск."""
+
+    def __init__(self, dsn: str = DSN):
+        self.conn = psycopg2.connect(dsn)
+        self.cur = self.conn.cursor()
+        self.cur.execute(STAGE_DDL)
+        self.conn.commit()
+
+    def write(self, updates: list) -> int:
+        try:
+            self.cur.copy_expert(f"COPY reparse_updates ({', '.join(UPDATE_COLUMNS)}) FROM STDIN", copy_text(updates))
+            self.cur.execute(RESOLVE_FINGERPRINTS_SQL)
+            self.cur.execute(UPDATE_SQL)
+            n = self.cur.rowcount
+            self.conn.commit()
+            return n
+        except Exception as e:
+            self.conn.rollback()
+            msg = f"[ERROR] write batch of {len(updates)} failed: {e}"
+            print(msg)
+            log_error(msg)
+            log_error(traceback.format_exc())
+            return 0
+
+    def close(self):
+        self.cur.close()
+        self.conn.close()
+
+def read_batches(cur, batch: int):
+    while True:
+        rows = cur.fetchmany(batch)
+        if not rows:
+            return
+        yield rows
+
+def stream_rows_and_update(dry_run: bool = False, all_rows: bool = False, workers: int = WORKERS,
+                           batch: int = BATCH, dsn: str = DSN) -> dict:
     conn = None
     cur = None
+    writer = None
     total_updated = 0
+    stats = new_stats()
+    started = time.perf_counter()
     try:
-        conn = psycopg2.connect(DSN)
-        cur = conn.cursor(name='cur_missing')
-        cur.execute("SELECT id, raw_payload::text FROM flights WHERE start_geom IS NULL OR end_geom IS NULL;")
-        batch = []
-        for row in cur:
-            batch.append(row)
-            if len(batch) >= BATCH:
-                n = process_batch(batch)
-                total_updated += n
-                print(f"[INFO] Updated {total_updated} rows so far")
-                batch = []
-        if batch:
-            n = process_batch(batch)
-            total_updated += n
-        print("[DONE] total updated:", total_updated)
+        conn = psycopg2.connect(dsn)
+        cur = conn.cursor(name='cur_reparse')
+        cur.itersize = batch
+        cur.execute(SELECT_SQL, {'version': PARSER_VERSION, 'all': all_rows})
+        writer = None if dry_run else Writer(dsn)
+        # запись пачки N идёт в своём потоке, пока пул разбирает следующие
+        with ThreadPoolExecutor(max_workers=1) as write_pool:
+            pending = None
+            for updates, part in parsed_batches(read_batches(cur, batch), workers):
+                merge_stats(stats, part)
+                if writer is not None:
+                    if pending is not None:
+                        total_updated += pending.result()
+                    pending = write_pool.submit(writer.write, updates)
+                elapsed = time.perf_counter() - started
+                print(f"[INFO] scanned {stats['scanned']}, changed {stats['changed']}, "
+                      f"updated {total_updated}, {stats['scanned'] / elapsed:.0f} rows/s")
+            if pending is not None:
+                total_updated += pending.result()
+        elapsed = time.perf_counter() - started
+        stats.update(parser_version=PARSER_VERSION, updated=total_updated, seconds=round(elapsed, 1),
+                     rows_per_sec=round(stats['scanned'] / elapsed, 1) if elapsed > 0 else None)
+        print("[DRY-RUN]" if dry_run else "[DONE]", json.dumps(stats, ensure_ascii=False))
     except Exception as e:
         print("[ERROR] stream_rows_and_update:", e)
         log_error("[ERROR] stream_rows_and_update: " + str(e) + "\n" + traceback.format_exc())
     finally:
+        if writer:
+            writer.close()
         if cur:
             cur.close()
         if conn:
             conn.close()
+    return stats
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Re-parse flights stamped with an older parser version")
+    ap.add_argument("--dry-run", action="store_true", help="only report how many rows would change")
+    ap.add_argument("--all", action="store_true", help="not only rows without start_geom/end_geom")
+    ap.add_argument("--workers", type=int, default=WORKERS, help="parser processes (1 = no pool)")
+    ap.add_argument("--batch", type=int, default=BATCH, help="rows per batch / transaction")
+    ap.add_argument("--dsn", default=DSN)
+    args = ap.parse_args(argv)
+    print(f"Start reparse_and_fill.py — BATCH = {args.batch}, WORKERS = {args.workers}, PARSER_VERSION = {PARSER_VERSION}")
+    stream_rows_and_update(dry_run=args.dry_run, all_rows=args.all, workers=args.workers, batch=args.batch,
+                           dsn=args.dsn)
 
 if __name__ == "__main__":
-    print("Start reparse_and_fill.py — BATCH =", BATCH)
-    stream_rows_and_update()
+    main()
@@ -17,8 +17,10 @@ CREATE TABLE flights (
   end_geom geometry(Point, 4326),
   start_region_id INTEGER,
   end_region_id INTEGER,
-  fingerprint TEXT,
+  fingerprint TEXT,          -- или uuid после fingerprint_compact.sql; писать через flight_fingerprint()
   raw_payload JSONB,
+  import_job_id INTEGER,
+  parser_version SMALLINT,   -- app.parser.PARSER_VERSION (migrations/005_flights_parser_version.sql)
   created_at TIMESTAMP DEFAULT now()
 );
 
@@ -26,4 +28,63 @@ CREATE INDEX idx_flights_start_geom ON flights USING GIST (start_geom);
 CREATE INDEX idx_flights_end_geom ON flights USING GIST (end_geom);
 CREATE INDEX idx_regions_geom ON regions USING GIST (geom);
 
+-- regions, порезанные ST_Subdivide, для привязки точек к регионам
+-- (migrations/008_regions_subdivided.sql: там же refresh_regions_subdivided())
+CREATE TABLE IF NOT EXISTS regions_subdivided (
+  id bigserial PRIMARY KEY,
+  gid integer NOT NULL,
+  geom geometry(Geometry, 4326) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_regions_subdivided_geom ON regions_subdivided USING GIST (geom);
+CREATE INDEX IF NOT EXISTS idx_regions_subdivided_gid ON regions_subdivided (gid);
+
+-- упрощённые регионы с готовым JSON для /api/v1/regions
+-- (migrations/010_regions_simplified.sql: там же refresh_regions_simplified())
+CREATE TABLE IF NOT EXISTS regions_simplified (
+  tolerance double precision NOT NULL,
+  gid integer NOT NULL,
+  name text,
+  feature text NOT NULL,
+  PRIMARY KEY (tolerance, gid)
+);
+CREATE INDEX IF NOT EXISTS idx_regions_simplified_name ON regions_simplified (tolerance, name);
+
 CREATE UNIQUE INDEX IF NOT EXISTS uq_flight_flightid_time ON flights (flight_id, start_time);
+CREATE INDEX IF NOT EXISTS idx_flights_import_job_id ON flights (import_job_id) WHERE import_job_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_flights_parser_version ON flights ((COALESCE(parser_version, 0)));
+CREATE INDEX IF NOT EXISTS idx_flights_fingerprint ON flights (fingerprint);
+
+-- сырые NDJSON-строки перед переносом в flights (load_from_staging.sql)
+CREATE TABLE IF NOT EXISTS staging_raw (
+  raw JSONB
+);
+
+-- регион точки и триггерная функция привязки (migrations/009_flights_region_trigger.sql;
+-- сам триггер — по желанию, data/region_trigger.sql)
+CREATE OR REPLACE FUNCTION region_at(pt geometry) RETURNS integer
+LANGUAGE sql STABLE PARALLEL SAFE AS $$
+  SELECT min(r.gid) FROM public.regions_subdivided r WHERE ST_Intersects(r.geom, pt)
+$$;
+
+CREATE OR REPLACE FUNCTION flights_resolve_regions() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF NEW.start_geom IS NOT NULL AND (
+       NEW.start_region_id IS NULL
+       OR (TG_OP = 'UPDATE' AND NEW.start_geom IS DISTINCT FROM OLD.start_geom
+           AND NEW.start_region_id IS NOT DISTINCT FROM OLD.start_region_id)) THEN
+    NEW.start_region_id := region_at(NEW.start_geom);
+  END IF;
+  IF NEW.end_geom IS NOT NULL AND (
+       NEW.end_region_id IS NULL
+       OR (TG_OP = 'UPDATE' AND NEW.end_geom IS DISTINCT FROM OLD.end_geom
+           AND NEW.end_region_id IS NOT DISTINCT FROM OLD.end_region_id)) THEN
+    NEW.end_region_id := region_at(NEW.end_geom);
+  END IF;
+  RETURN NEW;
+END
+$$;
+
+-- fingerprint парсера -> значение flights.fingerprint (migrations/007_flight_fingerprint_fn.sql)
+CREATE OR REPLACE FUNCTION flight_fingerprint(fp text) RETURNS text
+LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ SELECT fp $$;
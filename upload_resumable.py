@@ -0,0 +1,71 @@
+# upload_resumable.py
+# Загрузка большого NDJSON кусками с докачкой после обрыва связи:
+#   python upload_resumable.py data/parsed.ndjson [--part-mb 64] [--import]
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+import requests
+
+BASE = os.environ.get("API_BASE", "http://localhost:8000")
+TOKEN = os.environ.get("TOKEN", "supersecret123")
+H = {"Authorization": f"Bearer {TOKEN}"}
+
+
+def sha256_of(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("path")
+    ap.add_argument("--part-mb", type=int, default=64)
+    ap.add_argument("--upload-id", help="resume an earlier upload")
+    ap.add_argument("--import", dest="start_import", action="store_true", help="start /api/v1/import after finalize")
+    args = ap.parse_args()
+
+    size = os.path.getsize(args.path)
+    if args.upload_id:
+        upload_id = args.upload_id
+    else:
+        r = requests.post(f"{BASE}/api/v1/uploads", headers=H,
+                          json={"filename": os.path.basename(args.path), "size": size})
+        r.raise_for_status()
+        upload_id = r.json()["upload_id"]
+    print("upload_id:", upload_id)
+
+    part = args.part_mb * 1024 * 1024
+    with open(args.path, "rb") as fh:
+        while True:
+            offset = requests.get(f"{BASE}/api/v1/uploads/{upload_id}", headers=H).json()["received"]
+            if offset >= size:
+                break
+            fh.seek(offset)
+            data = fh.read(part)
+            try:
+                r = requests.put(f"{BASE}/api/v1/uploads/{upload_id}", headers=H,
+                                 params={"offset": offset}, data=data, timeout=600)
+                if r.status_code not in (200, 409):
+                    r.raise_for_status()
+                print(f"{min(offset + len(data), size)}/{size} bytes")
+            except requests.RequestException as e:
+                print("part failed, resuming:", e, file=sys.stderr)
+                time.sleep(3)
+
+    r = requests.post(f"{BASE}/api/v1/uploads/{upload_id}/finalize", headers=H, json={"sha256": sha256_of(args.path)})
+    r.raise_for_status()
+    print("finalized:", r.json())
+
+    if args.start_import:
+        r = requests.post(f"{BASE}/api/v1/import", headers=H, json={"upload_id": upload_id})
+        print(r.status_code, r.text)
+
+
+if __name__ == "__main__":
+    main()